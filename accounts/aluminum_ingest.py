@@ -0,0 +1,225 @@
+import uuid
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connection, transaction
+
+from .geometry import coerce_opening, compute_openings, opening_geometry
+from .glass_pricing import load_glass_prices, pane_price
+from .material_totals import rebuild_aluminum_totals
+from .materials_cache import touch_project
+from .models import Project, Room, Glass, Window, WindowFrame, WindowSash, Door, DoorFrame, DoorSash
+
+
+# DecimalField(max_digits=7, decimal_places=2) on frames, sashes and glass
+MAX_DIMENSION = 10 ** 5
+
+CENT = Decimal('0.01')
+
+
+def parse_aluminum_post(post_data, files):
+    """
+    Read the add-aluminum form into a list of rooms, each with its raw items.
+    Numbers are kept as posted so a bad value only fails its own item later.
+    """
+    rooms = []
+    room_count = int(post_data.get("room_count", 0))
+
+    for i in range(room_count):
+        room = {
+            "name": post_data.get(f"room_name_{i}", f"Room {i}"),
+            "file": files.get(f"room_file_{i}"),
+            "items": [],
+        }
+
+        item_count = int(post_data.get(f"item_count_{i}", 0))
+        for j in range(item_count):
+            prefix = f"{i}_{j}"
+            room["items"].append({
+                "type": post_data.get(f"item_type_{prefix}"),
+                "subtype": post_data.get(f"subtype_{prefix}"),
+                "aluminum_type": post_data.get(f"aluminum_type_{prefix}"),
+                "glass_type": post_data.get(f"glass_type_{prefix}"),
+                "sash_count": post_data.get(f"number_of_sashs_{prefix}", 2),
+                "heights": [
+                    post_data.get(f"height_left_{prefix}", 0),
+                    post_data.get(f"height_middle_{prefix}", 0),
+                    post_data.get(f"height_right_{prefix}", 0),
+                ],
+                "widths": [
+                    post_data.get(f"width_top_{prefix}", 0),
+                    post_data.get(f"width_middle_{prefix}", 0),
+                    post_data.get(f"width_bottom_{prefix}", 0),
+                ],
+            })
+
+        rooms.append(room)
+
+    return rooms
+
+
+def check_geometry(geometry):
+    # One out-of-range value would otherwise abort the whole batch insert
+    for part in ("frame", "sash", "glass"):
+        for name, value in geometry[part].items():
+            if value is not None and abs(value) >= MAX_DIMENSION:
+                raise ValueError(f"{part} {name} {value:.2f} cm is out of range")
+
+
+def stored_geometry(geometry):
+    """
+    ``geometry`` with its sizes rounded to the two places the columns keep.
+    MySQL rounds a DECIMAL(7, 2) on write, SQLite keeps whatever it is sent,
+    so without this SQL sums and row reads disagree on SQLite.
+    """
+    for part in ("frame", "sash", "glass"):
+        geometry[part] = {
+            name: None if value is None else Decimal(repr(value)).quantize(CENT, ROUND_HALF_UP)
+            for name, value in geometry[part].items()
+        }
+    return geometry
+
+
+def _bulk_insert(model, objs, key=None, newest=None):
+    """
+    bulk_create ``objs`` in one INSERT and give each its primary key.
+    Backends that can return rows (PostgreSQL, SQLite 3.35+, MariaDB 10.5+)
+    set them already. Plain MySQL does not, so the rows are read back in one
+    query: by ``key``, a field set on every object, or as the newest rows of
+    ``newest``, a queryset the caller keeps other writers out of. Rows
+    sharing a value come back in insert order, which is auto-increment order.
+
+    No batch_size is passed: MySQL takes each table in one statement, and
+    the form field limit (DATA_UPLOAD_MAX_NUMBER_FIELDS) keeps it well under
+    max_allowed_packet. SQLite still splits every 999 parameters.
+    """
+    model.objects.bulk_create(objs)
+    if not objs or objs[0].pk is not None:
+        return objs
+
+    if key is None:
+        pks = reversed(list(newest.order_by('-pk').values_list('pk', flat=True)[:len(objs)]))
+        for obj, pk in zip(objs, pks):
+            obj.pk = pk
+        return objs
+
+    pks = defaultdict(list)
+    rows = model.objects.filter(**{f"{key}__in": {getattr(obj, key) for obj in objs}})
+    # Newest first, so pop() hands out the lowest pk of each value first
+    for value, pk in rows.order_by('-pk').values_list(key, 'pk'):
+        pks[value].append(pk)
+    for obj in objs:
+        obj.pk = pks[getattr(obj, key)].pop()
+    return objs
+
+
+def ingest_aluminum_items(project, rooms):
+    """
+    Create the rooms, windows, doors, frames, sashes and glass of a parsed
+    add-aluminum form with one bulk write per table, inside one transaction.
+
+    Items whose dimensions can't be computed are skipped and reported in
+    ``errors`` as {"room", "item", "error"}; the rest of the form is saved.
+    """
+    # Panes have no natural key and no project; this marks the panes of this form
+    batch = uuid.uuid4().hex
+    room_objs = [Room(name=room["name"], project=project, blueprint=room["file"]) for room in rooms]
+
+    # Compute every opening in memory, in one batch, before touching the database
+    valid = []
+    errors = []
+    for room, room_data in zip(room_objs, rooms):
+        for j, item in enumerate(room_data["items"]):
+            try:
+                if not item["glass_type"]:
+                    raise ValueError("Missing glass_type")
+                valid.append((room, j, item, coerce_opening(item)))
+            except Exception as e:
+                errors.append({"room": room.name, "item": j, "error": str(e)})
+
+    arrays = compute_openings([opening for _, _, _, opening in valid])
+    planned = []
+    for k, (room, j, item, _) in enumerate(valid):
+        geometry = opening_geometry(arrays, k)
+        try:
+            check_geometry(geometry)
+            planned.append((room, j, item, stored_geometry(geometry)))
+        except ValueError as e:
+            errors.append({"room": room.name, "item": j, "error": str(e)})
+
+    windows, window_frames, window_sashes = [], [], []
+    doors, door_frames, door_sashes = [], [], []
+    glasses = []
+
+    # bulk_create skips Glass.save(), so price the panes here from one price lookup
+    glass_prices = load_glass_prices(project.contractor_id)
+
+    with transaction.atomic():
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Rooms are read back as the project's newest, so no other form may add any meanwhile
+            Project.objects.select_for_update().only('pk').get(pk=project.pk)
+        _bulk_insert(Room, room_objs, newest=Room.objects.filter(project=project))
+
+        for room, j, item, geometry in planned:
+            sash = geometry["sash"]
+            glass = geometry["glass"]
+            sash_glasses = [
+                Glass(
+                    glass_type=item["glass_type"], height=glass["height"], width=glass["width"],
+                    ingest_batch=batch,
+                )
+                for _ in range(geometry["sash_count"])
+            ]
+            for pane in sash_glasses:
+                pane.price = pane_price(pane, glass_prices)
+            glasses.extend(sash_glasses)
+
+            if item["type"] == 'window':
+                window = Window(
+                    room=room,
+                    project=project,
+                    window_type=item["subtype"],
+                    aluminum_type=item["aluminum_type"],
+                    number_of_sashs=geometry["sash_count"],
+                    window_number=f"W-{project.id}-{room.id}-{j}"
+                )
+                windows.append(window)
+                window_frames.append(WindowFrame(window=window, **geometry["frame"]))
+                window_sashes.extend(
+                    WindowSash(window=window, glass=g, **sash) for g in sash_glasses
+                )
+            else:
+                door = Door(
+                    room=room,
+                    project=project,
+                    door_type=item["subtype"],
+                    aluminum_type=item["aluminum_type"],
+                    number_of_sashs=geometry["sash_count"],
+                    door_number=f"D-{project.id}-{room.id}-{j}"
+                )
+                doors.append(door)
+                door_frames.append(DoorFrame(door=door, **geometry["frame"]))
+                door_sashes.extend(
+                    DoorSash(door=door, glass=g, **sash) for g in sash_glasses
+                )
+
+        _bulk_insert(Window, windows, 'window_number')
+        _bulk_insert(Door, doors, 'door_number')
+        _bulk_insert(Glass, glasses, 'ingest_batch')
+
+        # Nothing references frames or sashes, so these never need pks back
+        WindowFrame.objects.bulk_create(window_frames)
+        WindowSash.objects.bulk_create(window_sashes)
+        DoorFrame.objects.bulk_create(door_frames)
+        DoorSash.objects.bulk_create(door_sashes)
+
+        # bulk_create sends no signals, so refresh the project totals here
+        rebuild_aluminum_totals(project.id)
+        touch_project(project.id)
+
+    return {
+        "rooms": room_objs,
+        "windows": windows,
+        "doors": doors,
+        "errors": errors,
+    }
@@ -1,14 +1,14 @@
-from django.db.models import Sum
+from django.db import IntegrityError
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .models import CustomUser, Company, Attendance, Project
+from .models import CustomUser, Company, Project
 from django.contrib.auth import authenticate, get_user_model
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.authtoken.models import Token
 import json
-from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth import get_user_model
 from accounts.forms import MessageForm
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
@@ -19,6 +19,17 @@ from accounts.models import Message
 from django.shortcuts import get_object_or_404
 
 from .views import sliding_window_materials
+from .material_totals import ALUMINUM_FIELDS, get_aluminum_totals
+from .materials import aluminum_profile_totals
+from .materials_cache import cached_materials
+from .glass_nesting import project_glass_nesting
+from .drywall_layout import project_board_layout
+from .framing import project_framing
+from .rollup import company_materials, write_rollup_csv
+from .geometry import coerce_opening, compute_openings, load_profile_constants, opening_geometry
+from .token_auth import remember_token, token_user
+from .clock import attendance_date, attendance_page, clock_in, clock_out, month_totals
+from .clock_sync import MAX_EVENTS, sync_clock_events
 
 User = get_user_model()
 
@@ -63,6 +74,7 @@ def worker_login_api(request):
             user = authenticate(username=username, password=password)
             if user is not None and user.user_type == 'worker':
                 token, created = Token.objects.get_or_create(user=user)
+                remember_token(token.key, user)
                 return JsonResponse({
                     'status': 'success',
                     'token': token.key,
@@ -119,50 +131,44 @@ def worker_home_api(request):
         if not token_key:
             return JsonResponse({'status': 'error', 'message': 'Token required'}, status=400)
 
-        try:
-            token = Token.objects.get(key=token_key)
-            user = token.user
-
-            if user.user_type != 'worker':
-                return JsonResponse({'status': 'error', 'message': 'User is not a worker'}, status=403)
-
-            now = timezone.now()
-            monthly_attendance = Attendance.objects.filter(
-                user=user,
-                date__year=now.year,
-                date__month=now.month
-            ).order_by('-date')
+        user = token_user(token_key)
+        if user is None:
+            return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=401)
 
-            total_days = monthly_attendance.filter(flag=2).count()
-            total_hours = monthly_attendance.filter(flag=2).aggregate(
-                total=Sum('total_hours')
-            )['total'] or 0
+        if user.user_type != 'worker':
+            return JsonResponse({'status': 'error', 'message': 'User is not a worker'}, status=403)
 
-            attendance_list = [
+        today = attendance_date()
+        total_days, total_hours = month_totals(user.id, today.year, today.month)
+        response = {
+            'status': 'success',
+            'total_days': total_days,
+            'total_hours': round(total_hours, 2),
+        }
+
+        # The days themselves only when asked for: ?attendances=1 or ?page=N, newest first
+        page = request.GET.get('page', '')
+        if request.GET.get('attendances') or page:
+            page = int(page) if page.isdigit() and int(page) > 0 else 1
+            attendances, has_next = attendance_page(user.id, page)
+            response['attendances'] = [
                 {
                     'date': a.date.strftime('%Y-%m-%d'),
                     'clock_in': a.clock_in.strftime('%H:%M') if a.clock_in else None,
-                    'clock_in_latitude': a.clock_in_latitude if hasattr(a, 'clock_in_latitude') else None,
-                    'clock_in_longitude': a.clock_in_longitude if hasattr(a, 'clock_in_longitude') else None,
+                    'clock_in_latitude': a.clock_in_latitude,
+                    'clock_in_longitude': a.clock_in_longitude,
                     'clock_out': a.clock_out.strftime('%H:%M') if a.clock_out else None,
-                    'clock_out_latitude': a.clock_out_latitude if hasattr(a, 'clock_out_latitude') else None,
-                    'clock_out_longitude': a.clock_out_longitude if hasattr(a, 'clock_out_longitude') else None,
+                    'clock_out_latitude': a.clock_out_latitude,
+                    'clock_out_longitude': a.clock_out_longitude,
                     'total_hours': a.total_hours,
                     'flag': a.flag,
                 }
-                for a in monthly_attendance
+                for a in attendances
             ]
+            response['page'] = page
+            response['has_next'] = has_next
 
-
-            return JsonResponse({
-                'status': 'success',
-                'total_days': total_days,
-                'total_hours': round(total_hours, 2),
-                'attendances': attendance_list,
-            })
-
-        except Token.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=401)
+        return JsonResponse(response)
 
     return JsonResponse({'status': 'error', 'message': 'GET request required'}, status=405)
 
@@ -176,40 +182,24 @@ def clock_in_api(request):
         if not token_key:
             return JsonResponse({'status': 'error', 'message': 'Token required'}, status=400)
 
-        try:
-            token = Token.objects.get(key=token_key)
-            user = token.user
-
-            if user.user_type != 'worker':
-                return JsonResponse({'status': 'error', 'message': 'User is not a worker'}, status=403)
-
-            today = timezone.now().date()
-            last_attendance = Attendance.objects.filter(user=user).order_by('-date').first()
-
-            if last_attendance and last_attendance.date == today and last_attendance.clock_in:
-                return JsonResponse({'status': 'error', 'message': 'You have already clocked in today'}, status=400)
+        user = token_user(token_key)
+        if user is None:
+            return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=401)
 
-            attendance, created = Attendance.objects.get_or_create(user=user, date=today)
+        if user.user_type != 'worker':
+            return JsonResponse({'status': 'error', 'message': 'User is not a worker'}, status=403)
 
-            if created or not attendance.clock_in:
-                attendance.clock_in = timezone.now()
-                attendance.clock_in_latitude = lat if lat else None
-                attendance.clock_in_longitude = lon if lon else None
-                attendance.flag = 1
-                attendance.save()
+        attendance, error = clock_in(user.id, lat, lon)
+        if error:
+            return JsonResponse({'status': 'error', 'message': error}, status=400)
 
-                return JsonResponse({
-                    'status': 'success',
-                    'message': f'Clocked in at {attendance.clock_in.strftime("%H:%M:%S")}',
-                    'clock_in_time': attendance.clock_in.strftime('%H:%M:%S'),
-                    'latitude': attendance.clock_in_latitude,
-                    'longitude': attendance.clock_in_longitude
-                })
-            else:
-                return JsonResponse({'status': 'error', 'message': 'You have already clocked in today'}, status=400)
-
-        except Token.DoesNotExist:
-            return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=401)
+        return JsonResponse({
+            'status': 'success',
+            'message': f'Clocked in at {attendance.clock_in.strftime("%H:%M:%S")}',
+            'clock_in_time': attendance.clock_in.strftime('%H:%M:%S'),
+            'latitude': attendance.clock_in_latitude,
+            'longitude': attendance.clock_in_longitude
+        })
 
     return JsonResponse({'status': 'error', 'message': 'POST request required'}, status=405)
 
@@ -226,6 +216,8 @@ def clock_out_api(request):
 
     # Accept token/lat/lon from JSON body or form-data
     data = _get_json(request)
+    if not isinstance(data, dict):
+        return JsonResponse({'status': 'error', 'message': 'JSON object required'}, status=400)
     token_key = data.get('token') or request.POST.get('token') or request.GET.get('token')
     lat = data.get('latitude') or request.POST.get('latitude')
     lon = data.get('longitude') or request.POST.get('longitude')
@@ -233,49 +225,64 @@ def clock_out_api(request):
     if not token_key:
         return JsonResponse({'status': 'error', 'message': 'Token required'}, status=400)
 
-    try:
-        token = Token.objects.get(key=token_key)
-        user = token.user
-    except Token.DoesNotExist:
+    user = token_user(token_key)
+    if user is None:
         return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=401)
 
-    if getattr(user, 'user_type', None) != 'worker':
+    if user.user_type != 'worker':
         return JsonResponse({'status': 'error', 'message': 'User is not a worker'}, status=403)
 
-    now = timezone.now()
-    today = now.date()
+    attendance, error = clock_out(user.id, lat, lon)
+    if error:
+        return JsonResponse({'status': 'error', 'message': error}, status=400)
 
-    try:
-        attendance = Attendance.objects.get(user=user, date=today)
-    except Attendance.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'You must clock in before clocking out.'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Clocked out successfully.',
+        'date': str(attendance.date),
+        'clock_in_time': attendance.clock_in.strftime('%H:%M:%S') if attendance.clock_in else None,
+        'clock_out_time': attendance.clock_out.strftime('%H:%M:%S'),
+        'clock_out_latitude': attendance.clock_out_latitude,
+        'clock_out_longitude': attendance.clock_out_longitude,
+        'total_hours': attendance.total_hours,
+        'flag': attendance.flag
+    })
 
-    if attendance.flag == 1:  # clocked in, not out yet
-        attendance.clock_out = now
-        attendance.clock_out_latitude = lat if lat else None
-        attendance.clock_out_longitude = lon if lon else None
+@csrf_exempt
+def clock_sync_api(request):
+    # Clock events the worker app queued while offline, sent in one batch
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST request required'}, status=405)
 
-        duration = now - attendance.clock_in
-        attendance.total_hours = round(duration.total_seconds() / 3600, 2)
-        attendance.flag = 2
-        attendance.save()
+    data = _get_json(request)
+    if not isinstance(data, dict):
+        return JsonResponse({'status': 'error', 'message': 'JSON object required'}, status=400)
+    auth_header = request.headers.get('Authorization') or ''
+    token_key = data.get('token') or (auth_header.split(" ")[1] if auth_header.startswith("Token ") else None)
 
-        return JsonResponse({
-            'status': 'success',
-            'message': 'Clocked out successfully.',
-            'date': str(today),
-            'clock_in_time': attendance.clock_in.strftime('%H:%M:%S') if attendance.clock_in else None,
-            'clock_out_time': attendance.clock_out.strftime('%H:%M:%S'),
-            'clock_out_latitude': attendance.clock_out_latitude,
-            'clock_out_longitude': attendance.clock_out_longitude,
-            'total_hours': attendance.total_hours,
-            'flag': attendance.flag
-        })
+    if not token_key:
+        return JsonResponse({'status': 'error', 'message': 'Token required'}, status=400)
+
+    user = token_user(token_key)
+    if user is None:
+        return JsonResponse({'status': 'error', 'message': 'Invalid token'}, status=401)
 
-    elif attendance.flag == 2:
-        return JsonResponse({'status': 'error', 'message': 'You have already clocked out today.'}, status=400)
-    else:
-        return JsonResponse({'status': 'error', 'message': 'Cannot clock out without clocking in.'}, status=400)
+    if user.user_type != 'worker':
+        return JsonResponse({'status': 'error', 'message': 'User is not a worker'}, status=403)
+
+    events = data.get('events')
+    if not isinstance(events, list):
+        return JsonResponse({'status': 'error', 'message': 'events list required'}, status=400)
+    if len(events) > MAX_EVENTS:
+        return JsonResponse({'status': 'error', 'message': f'At most {MAX_EVENTS} events per sync'}, status=400)
+
+    try:
+        results = sync_clock_events(user.id, events)
+    except IntegrityError:
+        # The same events synced at the same moment from another request; the retry sees them
+        return JsonResponse({'status': 'error', 'message': 'Sync in progress, retry'}, status=409)
+
+    return JsonResponse({'status': 'success', 'results': results})
 
 @api_view(['POST'])
 @authentication_classes([TokenAuthentication])
@@ -409,14 +416,151 @@ def worker_work_page_api(request):
     project_id = request.GET.get('project_id')
     selected_project = None
     aluminum_data = None
+    aluminum_totals = None
+    profile_totals = None
 
     if project_id:
         selected_project = get_object_or_404(Project, id=project_id, workers=user)
-        aluminum_data = sliding_window_materials(project_id)
+        # ?mode=summary skips the per-item tables and cutting plan,
+        # ?mode=cut_list sends merged piece lines instead of a row per window and sash
+        mode = request.GET.get('mode')
+        if mode != 'summary':
+            aluminum_data = cached_materials(
+                selected_project.id, 'aluminum', lambda: sliding_window_materials(selected_project.id)
+            )
+            if mode == 'cut_list':
+                aluminum_data = {
+                    key: value for key, value in aluminum_data.items()
+                    if key not in ('frame_data', 'sash_data', 'cutting_plan')
+                }
+        profile_totals = cached_materials(
+            selected_project.id, 'profile_totals', lambda: aluminum_profile_totals(selected_project.id)
+        )
+        summary = get_aluminum_totals(selected_project.id)
+        aluminum_totals = {field: getattr(summary, field) for field in ALUMINUM_FIELDS}
 
     return Response({
         'status': 'success',
         'projects': list(projects),
         'selected_project': selected_project.id if selected_project else None,
-        'aluminum_data': aluminum_data
-    })
\ No newline at end of file
+        'aluminum_data': aluminum_data,
+        'aluminum_totals': aluminum_totals,
+        'profile_totals': profile_totals
+    })
+
+
+@api_view(['POST'])
+def aluminum_preview_api(request):
+    # Frame, sash and glass sizes for a batch of openings, nothing is saved
+    if request.user.user_type != 'contractor':
+        return Response({'status': 'error', 'message': 'You are not allowed here'}, status=403)
+
+    items = request.data.get('items')
+    if not isinstance(items, list):
+        return Response({'status': 'error', 'message': 'items list required'}, status=400)
+
+    openings = []
+    positions = []
+    errors = []
+    for k, item in enumerate(items):
+        try:
+            openings.append(coerce_opening(item))
+            positions.append(k)
+        except Exception as e:
+            errors.append({'item': k, 'error': str(e)})
+
+    constants = load_profile_constants()
+    arrays = compute_openings(openings, constants)
+
+    return Response({
+        'status': 'success',
+        'constants_version': constants['version'],
+        'items': [
+            {'item': k, **opening_geometry(arrays, n)}
+            for n, k in enumerate(positions)
+        ],
+        'errors': errors,
+    })
+
+
+@api_view(['GET'])
+def glass_nesting_api(request, project_id):
+    # Stock sheet layout of the project's glass, one plan per glass type
+    if request.user.user_type != 'contractor':
+        return Response({'status': 'error', 'message': 'You are not allowed here'}, status=403)
+
+    project = get_object_or_404(Project, id=project_id, contractor=request.user)
+    plans = cached_materials(project.id, 'glass_nesting', lambda: project_glass_nesting(project.id))
+
+    return Response({
+        'status': 'success',
+        'project_number': project.project_number,
+        'plans': plans,
+    })
+
+
+@api_view(['GET'])
+def drywall_layout_api(request, project_id):
+    # Board plan of the project's walls and ceilings; ?by_room=1 keeps offcuts inside each room
+    if request.user.user_type != 'contractor':
+        return Response({'status': 'error', 'message': 'You are not allowed here'}, status=403)
+
+    project = get_object_or_404(Project, id=project_id, contractor=request.user)
+    by_room = request.GET.get('by_room') == '1'
+    plans = cached_materials(
+        project.id, 'drywall_layout_rooms' if by_room else 'drywall_layout',
+        lambda: project_board_layout(project.id, by_room=by_room)
+    )
+
+    return Response({
+        'status': 'success',
+        'project_number': project.project_number,
+        'plans': plans,
+    })
+
+
+@api_view(['GET'])
+def framing_api(request, project_id):
+    # Stud and track cutting plan of the project, one plan per profile and thickness
+    if request.user.user_type != 'contractor':
+        return Response({'status': 'error', 'message': 'You are not allowed here'}, status=403)
+
+    project = get_object_or_404(Project, id=project_id, contractor=request.user)
+    plans = cached_materials(project.id, 'drywall_framing', lambda: project_framing(project.id))
+
+    return Response({
+        'status': 'success',
+        'project_number': project.project_number,
+        'plans': plans,
+    })
+
+
+@api_view(['GET'])
+def company_materials_api(request):
+    # Materials of every project of the contractor's company; ?since=YYYY-MM-DD, ?output=csv
+    if request.user.user_type != 'contractor':
+        return Response({'status': 'error', 'message': 'You are not allowed here'}, status=403)
+
+    company = Company.objects.filter(contractor=request.user).first()
+    if company is None:
+        return Response({'status': 'error', 'message': 'You have no company yet'}, status=404)
+
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_date(request.GET['since'])
+        except ValueError:
+            # Well formed but not a real day, e.g. 2024-02-30
+            since = None
+        if since is None:
+            return Response({'status': 'error', 'message': 'since must be YYYY-MM-DD'}, status=400)
+
+    rollup = company_materials(company, since)
+
+    if request.GET.get('output') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="materials_{company.code}.csv"'
+        write_rollup_csv(rollup, response)
+        return response
+
+    return Response({'status': 'success', **rollup})
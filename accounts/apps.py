@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import signals  # connects the material totals handlers
+        from . import token_auth  # connects the token cache handlers
+        from .pdf_fonts import register_fonts
+
+        register_fonts()
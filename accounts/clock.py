@@ -0,0 +1,153 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Attendance, AttendanceMonth
+
+
+COORDINATE_PLACES = Decimal('0.000001')
+
+# Attendance days per page when a client lists them
+ATTENDANCE_PAGE_SIZE = 31
+
+
+def coordinate(value, limit):
+    """A latitude (limit 90) or longitude (limit 180) as stored, or None when missing or invalid."""
+    if value in (None, ''):
+        return None
+    try:
+        value = Decimal(str(value)).quantize(COORDINATE_PLACES)
+    except (InvalidOperation, ValueError):
+        return None
+    return value if abs(value) <= limit else None
+
+
+def attendance_date(moment=None):
+    """
+    The attendance day of ``moment`` (now by default): its date in
+    TIME_ZONE, so a shift started after local midnight counts for the new
+    day. Attendance.date defaults to the same day, and the months and
+    "today" checks all go through here.
+    """
+    return timezone.localdate(moment)
+
+
+def add_to_month(user_id, day, days, hours):
+    """Add completed days and hours to the AttendanceMonth of ``day``, creating it on the first clock-out."""
+    months = AttendanceMonth.objects.filter(user_id=user_id, year=day.year, month=day.month)
+    if months.update(total_days=F('total_days') + days, total_hours=F('total_hours') + hours):
+        return
+    try:
+        with transaction.atomic():
+            AttendanceMonth.objects.create(
+                user_id=user_id, year=day.year, month=day.month, total_days=days, total_hours=hours
+            )
+    except IntegrityError:
+        # Another clock-out created it first
+        months.update(total_days=F('total_days') + days, total_hours=F('total_hours') + hours)
+
+
+def month_totals(user_id, year, month):
+    """(completed days, hours) of a worker's month, in one lookup on the (user, year, month) index."""
+    totals = AttendanceMonth.objects.filter(user_id=user_id, year=year, month=month).values_list(
+        'total_days', 'total_hours'
+    ).first()
+    return totals or (0, 0)
+
+
+def attendance_page(user_id, page):
+    """One page (from 1) of a worker's attendance days, newest first, and whether more follow."""
+    start = (page - 1) * ATTENDANCE_PAGE_SIZE
+    days = list(Attendance.objects.filter(user_id=user_id).order_by('-date')[start:start + ATTENDANCE_PAGE_SIZE + 1])
+    return days[:ATTENDANCE_PAGE_SIZE], len(days) > ATTENDANCE_PAGE_SIZE
+
+
+def attendance_month_rows(user_ids=None):
+    """AttendanceMonth rows (unsaved) counted from the completed Attendance days themselves."""
+    attendances = Attendance.objects.filter(flag=2)
+    if user_ids is not None:
+        attendances = attendances.filter(user_id__in=user_ids)
+    return [
+        AttendanceMonth(
+            user_id=row['user_id'], year=row['date__year'], month=row['date__month'],
+            total_days=row['days'], total_hours=row['hours'] or 0,
+        )
+        for row in attendances.values('user_id', 'date__year', 'date__month').annotate(
+            days=Count('id'), hours=Sum('total_hours')
+        ).order_by('user_id', 'date__year', 'date__month')
+    ]
+
+
+def clock_in(user_id, latitude=None, longitude=None, moment=None):
+    """
+    Clock a worker in for the day of ``moment`` (now by default). Returns
+    (attendance, None), or (None, message) when that day is clocked in
+    already.
+
+    Nothing is read first. The INSERT is turned down by the unique
+    (user, date) index when the day has a row; then one conditional UPDATE
+    fills a row without a clock-in. Two taps at once give one clock-in and
+    one "already clocked in".
+    """
+    moment = moment or timezone.now()
+    attendance = Attendance(
+        user_id=user_id,
+        date=attendance_date(moment),
+        clock_in=moment,
+        clock_in_latitude=coordinate(latitude, 90),
+        clock_in_longitude=coordinate(longitude, 180),
+        flag=1,
+    )
+    try:
+        with transaction.atomic():
+            attendance.save(force_insert=True)
+        return attendance, None
+    except IntegrityError:
+        pass
+
+    filled = Attendance.objects.filter(user_id=user_id, date=attendance.date, clock_in__isnull=True).update(
+        clock_in=moment,
+        clock_in_latitude=attendance.clock_in_latitude,
+        clock_in_longitude=attendance.clock_in_longitude,
+        flag=1,
+    )
+    if filled:
+        return attendance, None
+    return None, "You have already clocked in today"
+
+
+def clock_out(user_id, latitude=None, longitude=None, moment=None):
+    """
+    Clock a worker out for the day of ``moment`` (now by default). Returns
+    (attendance, None) or (None, message).
+
+    The hours worked need the clock-in time, so the day's row is read
+    locked (select_for_update) and updated in the same transaction; a
+    second tap waits and then finds the day clocked out. The day and its
+    hours are added to the worker's AttendanceMonth in that transaction.
+    """
+    moment = moment or timezone.now()
+    with transaction.atomic():
+        attendance = Attendance.objects.select_for_update().filter(
+            user_id=user_id, date=attendance_date(moment)
+        ).first()
+
+        if attendance is None:
+            return None, "You must clock in before clocking out."
+        if attendance.flag == 2:
+            return None, "You have already clocked out today."
+        if attendance.flag != 1:
+            return None, "Cannot clock out without clocking in."
+
+        attendance.clock_out = moment
+        attendance.clock_out_latitude = coordinate(latitude, 90)
+        attendance.clock_out_longitude = coordinate(longitude, 180)
+        attendance.total_hours = round((moment - attendance.clock_in).total_seconds() / 3600, 2)
+        attendance.flag = 2
+        attendance.save(update_fields=[
+            'clock_out', 'clock_out_latitude', 'clock_out_longitude', 'total_hours', 'flag',
+        ])
+        add_to_month(user_id, attendance.date, 1, attendance.total_hours)
+    return attendance, None
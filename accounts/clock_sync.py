@@ -0,0 +1,160 @@
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .clock import add_to_month, attendance_date, coordinate
+from .models import Attendance, ClockEvent
+
+
+# Events accepted in one sync request
+MAX_EVENTS = 500
+
+# Device clocks may run a little ahead of the server
+FUTURE_TOLERANCE = datetime.timedelta(minutes=5)
+
+def parse_clock_event(data, now):
+    """
+    A queued event from the worker app as a dict, or an error message.
+    Events are {"key", "type": "clock_in"|"clock_out", "timestamp": ISO 8601,
+    "latitude", "longitude"}; a timestamp without offset is server local time.
+    """
+    if not isinstance(data, dict):
+        return "Event must be an object"
+
+    key = str(data.get('key') or '').strip()
+    if not key or len(key) > 64:
+        return "Event key required (up to 64 characters)"
+
+    kind = data.get('type')
+    if kind not in dict(ClockEvent.KINDS):
+        return "Event type must be clock_in or clock_out"
+
+    moment = parse_datetime(str(data.get('timestamp') or ''))
+    if moment is None:
+        return "Event timestamp must be ISO 8601"
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    if moment > now + FUTURE_TOLERANCE:
+        return "Event timestamp is in the future"
+
+    return {
+        'key': key,
+        'kind': kind,
+        'time': moment,
+        'latitude': coordinate(data.get('latitude'), 90),
+        'longitude': coordinate(data.get('longitude'), 180),
+    }
+
+
+def _apply(event, rows, user_id):
+    # Returns an error message, or None once the event is applied to rows
+    day = attendance_date(event['time'])
+    attendance = rows.get(day)
+
+    if event['kind'] == 'clock_in':
+        if attendance is not None and attendance.clock_in:
+            return "Already clocked in that day"
+        if attendance is None:
+            attendance = rows[day] = Attendance(user_id=user_id, date=day)
+        attendance.clock_in = event['time']
+        attendance.clock_in_latitude = event['latitude']
+        attendance.clock_in_longitude = event['longitude']
+        attendance.flag = 1
+        return None
+
+    if attendance is None or attendance.flag == 0:
+        return "Must clock in before clocking out"
+    if attendance.flag == 2:
+        return "Already clocked out that day"
+    if event['time'] < attendance.clock_in:
+        return "Clock out is before clock in"
+    attendance.clock_out = event['time']
+    attendance.clock_out_latitude = event['latitude']
+    attendance.clock_out_longitude = event['longitude']
+    attendance.total_hours = round((event['time'] - attendance.clock_in).total_seconds() / 3600, 2)
+    attendance.flag = 2
+    return None
+
+
+def sync_clock_events(user_id, events):
+    """
+    Apply a worker's queued clock events in device-time order, in one
+    transaction. Returns one {"key", "status", "message"} per event, in the
+    order sent: "applied", "rejected" (with why) or "duplicate" for a key
+    already synced, so the app can drop all three from its queue.
+
+    A sync is a handful of queries whatever its size: the synced keys, the
+    worker's attendance rows on the days involved (locked), bulk writes
+    for new rows, changed rows and the events themselves, and one update
+    per month with clock-outs to AttendanceMonth.
+    """
+    now = timezone.now()
+    results = []
+    parsed = []
+    for data in events:
+        event = parse_clock_event(data, now)
+        if isinstance(event, str):
+            key = data.get('key') if isinstance(data, dict) else None
+            results.append({'key': key, 'status': 'rejected', 'message': event})
+        else:
+            result = {'key': event['key'], 'status': 'applied', 'message': None}
+            results.append(result)
+            parsed.append((event, result))
+
+    with transaction.atomic():
+        seen = set(ClockEvent.objects.filter(
+            user_id=user_id, key__in=[event['key'] for event, _ in parsed]
+        ).values_list('key', flat=True))
+
+        new_events = []
+        for event, result in parsed:
+            if event['key'] in seen:
+                result['status'] = 'duplicate'
+            else:
+                seen.add(event['key'])
+                new_events.append((event, result))
+        if not new_events:
+            return results
+
+        days = {attendance_date(event['time']) for event, _ in new_events}
+        rows = {
+            row.date: row
+            for row in Attendance.objects.select_for_update().filter(user_id=user_id, date__in=days)
+        }
+        existing = set(rows)
+
+        records = []
+        touched = set()
+        completed = []
+        for event, result in sorted(new_events, key=lambda pair: pair[0]['time']):
+            error = _apply(event, rows, user_id)
+            if error:
+                result['status'], result['message'] = 'rejected', error
+            else:
+                touched.add(attendance_date(event['time']))
+                if event['kind'] == 'clock_out':
+                    completed.append(rows[attendance_date(event['time'])])
+            records.append(ClockEvent(
+                user_id=user_id, key=event['key'], kind=event['kind'], device_time=event['time'],
+                latitude=event['latitude'], longitude=event['longitude'], applied=error is None,
+            ))
+
+        changed_fields = [
+            'clock_in', 'clock_out', 'total_hours', 'flag', 'clock_in_latitude', 'clock_in_longitude',
+            'clock_out_latitude', 'clock_out_longitude',
+        ]
+        Attendance.objects.bulk_create([rows[day] for day in touched - existing])
+        Attendance.objects.bulk_update([rows[day] for day in touched & existing], changed_fields)
+        ClockEvent.objects.bulk_create(records)
+
+        months = {}
+        for attendance in completed:
+            key = (attendance.date.year, attendance.date.month)
+            days, hours = months.get(key, (0, 0))
+            months[key] = (days + 1, hours + attendance.total_hours)
+        for (year, month), (days, hours) in months.items():
+            add_to_month(user_id, datetime.date(year, month, 1), days, hours)
+
+    return results
@@ -0,0 +1,85 @@
+import re
+from decimal import Decimal
+
+
+def sorted_numbers(numbers):
+    """Item numbers in natural order: W-1-2-10 after W-1-2-9."""
+    return sorted(numbers, key=lambda number: [
+        (0, int(part), '') if part.isdigit() else (1, 0, part)
+        for part in re.split(r'(\d+)', str(number))
+    ])
+
+
+def consolidate_aluminum(pieces):
+    """
+    Merge identical aluminum pieces (same aluminum_type, kind, role and
+    length to the 0.01 cm) into quantity lines, with the numbers of the
+    windows and doors they are cut for. ``pieces`` come from aluminum_pieces().
+    """
+    lines = {}
+    for piece in pieces:
+        length = round(float(piece["length"]), 2)
+        key = (piece["aluminum_type"], piece["kind"], piece["role"], length)
+        line = lines.get(key)
+        if line is None:
+            line = lines[key] = {
+                "aluminum_type": piece["aluminum_type"],
+                "kind": piece["kind"],
+                "role": piece["role"],
+                "length": length,
+                "quantity": 0,
+                "item_numbers": set(),
+            }
+        line["quantity"] += 1
+        line["item_numbers"].add(piece["item_number"])
+
+    result = sorted(
+        lines.values(),
+        key=lambda line: (str(line["aluminum_type"]), line["kind"], line["role"], -line["length"]),
+    )
+    for line in result:
+        line["item_numbers"] = sorted_numbers(line["item_numbers"])
+    return result
+
+
+def consolidate_glass(panes):
+    """
+    Merge identical panes (same glass_type, height and width) of
+    detailed_glass_materials() into quantity lines with their total area
+    and cost and the items they belong to.
+    """
+    lines = {}
+    for pane in panes:
+        key = (pane["glass_type"], pane["height"], pane["width"])
+        line = lines.get(key)
+        if line is None:
+            line = lines[key] = {
+                "glass_type": pane["glass_type"],
+                "height": pane["height"],
+                "width": pane["width"],
+                "area": pane["area"],
+                "quantity": 0,
+                "total_area": Decimal('0.00'),
+                "total_cost": Decimal('0.00'),
+                "items": set(),
+            }
+        line["quantity"] += 1
+        line["total_area"] += pane["area"]
+        line["total_cost"] += pane["cost"]
+        line["items"].add(pane["item"])
+
+    result = sorted(
+        lines.values(),
+        key=lambda line: (str(line["glass_type"]), -line["height"], -line["width"]),
+    )
+    for line in result:
+        line["items"] = sorted_numbers(line["items"])
+    return result
+
+
+def short_number_list(numbers, limit=8):
+    """'W-1, W-2, W-3 (+40 more)' for PDF cells that can't hold every number."""
+    shown = ", ".join(str(number) for number in numbers[:limit])
+    if len(numbers) > limit:
+        shown += f" (+{len(numbers) - limit} more)"
+    return shown
@@ -0,0 +1,271 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+from math import ceil
+
+
+# Stock aluminum bars are 6 meters; all lengths here are in cm
+BAR_LENGTH = 600
+DEFAULT_KERF = 0.4  # ~4 mm saw blade
+
+# Groups up to this size are solved exactly, bigger ones use best-fit decreasing
+EXACT_MAX_PIECES = 12
+
+# Lengths are packed as integers in 1/100 cm so sums never drift
+SCALE = 100
+
+FRAME_ROLES = ("top", "bottom", "side")
+SASH_ROLES = ("top_bottom", "handle_side", "side")
+
+
+def _to_units(length):
+    return int(round(float(length) * SCALE))
+
+
+def aluminum_pieces(frame_data, sash_data):
+    """
+    Turn the frame/sash rows of sliding_window_materials into single cut pieces.
+
+    Frame "side" rows hold both sides, and a sliding middle sash "side" holds
+    two interlock profiles (no handle side), so those are split back into pieces.
+    """
+    pieces = []
+
+    for frame in frame_data:
+        base = {
+            "aluminum_type": frame["aluminum_type"],
+            "kind": "frame",
+            "item_number": frame["item_number"],
+        }
+        if frame["top"]:
+            pieces.append({**base, "role": "top", "length": frame["top"]})
+        if frame["bottom"]:
+            pieces.append({**base, "role": "bottom", "length": frame["bottom"]})
+        if frame["side"]:
+            pieces.append({**base, "role": "side", "length": frame["side"] / 2})
+            pieces.append({**base, "role": "side", "length": frame["side"] / 2})
+
+    for sash in sash_data:
+        base = {
+            "aluminum_type": sash["aluminum_type"],
+            "kind": "sash",
+            "item_number": sash["item_number"],
+        }
+        if sash["top"]:
+            pieces.append({**base, "role": "top_bottom", "length": sash["top"]})
+        if sash["bottom"]:
+            pieces.append({**base, "role": "top_bottom", "length": sash["bottom"]})
+        if sash["handle_side"]:
+            pieces.append({**base, "role": "handle_side", "length": sash["handle_side"]})
+        if sash["side"]:
+            side_count = 1 if sash["handle_side"] else 2
+            for _ in range(side_count):
+                pieces.append({**base, "role": "side", "length": sash["side"] / side_count})
+
+    return pieces
+
+
+def best_fit_decreasing(sizes, capacity, order=None):
+    """
+    Pack integer sizes into bins of ``capacity``; returns a list of bins,
+    each a list of indexes into ``sizes``. Pieces go largest first unless
+    ``order`` gives the indexes in another order.
+
+    Open bins are kept sorted by free space, so each piece finds the tightest
+    bin that still fits it with one bisect: O(n log n) for the whole group.
+    """
+    if order is None:
+        order = sorted(range(len(sizes)), key=lambda k: sizes[k], reverse=True)
+    bins = []
+    free = []  # sorted (free_space, bin_index)
+
+    for k in order:
+        size = sizes[k]
+        pos = bisect_left(free, (size, -1))
+        if pos < len(free):
+            space, b = free.pop(pos)
+        else:
+            space, b = capacity, len(bins)
+            bins.append([])
+        bins[b].append(k)
+        space -= size
+        if space > 0:
+            insort(free, (space, b))
+
+    return bins
+
+
+def fill_remnants(sizes, capacities):
+    """
+    Best-fit pieces, largest first, into existing remnants of the given
+    capacities. Returns ({remnant index: [piece indexes]}, [piece indexes
+    no remnant could take]). Remnants are kept sorted by free space, so
+    each piece is placed with one bisect.
+    """
+    order = sorted(range(len(sizes)), key=lambda k: sizes[k], reverse=True)
+    free = sorted((capacity, r) for r, capacity in enumerate(capacities))
+    filled = defaultdict(list)
+    rest = []
+
+    for k in order:
+        size = sizes[k]
+        pos = bisect_left(free, (size, -1))
+        if pos == len(free):
+            rest.append(k)
+            continue
+        space, r = free.pop(pos)
+        filled[r].append(k)
+        space -= size
+        if space > 0:
+            insort(free, (space, r))
+
+    return filled, rest
+
+
+def exact_bin_packing(sizes, capacity):
+    """
+    Minimum number of bins for a small group, by depth-first search seeded
+    with the best-fit decreasing answer as the upper bound.
+    """
+    best = best_fit_decreasing(sizes, capacity)
+    lower_bound = ceil(sum(sizes) / capacity)
+    if len(best) <= lower_bound:
+        return best
+
+    order = sorted(range(len(sizes)), key=lambda k: sizes[k], reverse=True)
+    bins = []
+    spaces = []
+
+    def search(n):
+        nonlocal best
+        if len(bins) >= len(best):
+            return
+        if n == len(order):
+            best = [list(b) for b in bins]
+            return
+
+        k = order[n]
+        size = sizes[k]
+        tried = set()
+        for b in range(len(bins)):
+            # Bins with the same free space are interchangeable
+            if spaces[b] >= size and spaces[b] not in tried:
+                tried.add(spaces[b])
+                bins[b].append(k)
+                spaces[b] -= size
+                search(n + 1)
+                spaces[b] += size
+                bins[b].pop()
+                if len(best) <= lower_bound:
+                    return
+
+        if len(bins) + 1 < len(best):
+            bins.append([k])
+            spaces.append(capacity - size)
+            search(n + 1)
+            spaces.pop()
+            bins.pop()
+
+    search(0)
+    return best
+
+
+def _stock_cuts(fit, sizes, indexes, stock_units, kerf_units):
+    cuts = sorted((fit[k] for k in indexes), key=lambda p: p["length"], reverse=True)
+    used = sum(sizes[k] for k in indexes) - kerf_units
+    return {
+        "cuts": [{"length": p["length"], "item_number": p["item_number"]} for p in cuts],
+        "used": used / SCALE,
+        "remnant": (stock_units - used) / SCALE,
+    }
+
+
+def plan_cuts(pieces, bar_length=BAR_LENGTH, kerf=DEFAULT_KERF, exact=True, remnants=None):
+    """
+    Pack aluminum pieces into stock bars, one plan per
+    (aluminum_type, kind, role) group.
+
+    ``pieces`` are dicts with aluminum_type, kind, role, length (cm) and
+    item_number, as built by aluminum_pieces(). Every cut costs ``kerf`` cm
+    of blade; pieces longer than a bar are returned in ``unfit``.
+
+    ``remnants`` maps the same group keys to lists of {"id", "length"}
+    offcuts; pieces are cut from those first and only the rest opens new bars.
+    """
+    remnants = remnants or {}
+    groups = defaultdict(list)
+    for piece in pieces:
+        groups[(piece["aluminum_type"], piece["kind"], piece["role"])].append(piece)
+
+    # n pieces in a bar need n - 1 cuts, same as adding one kerf to the bar
+    kerf_units = _to_units(kerf)
+    bar_units = _to_units(bar_length)
+    capacity = bar_units + kerf_units
+
+    plans = []
+    for key, group in sorted(groups.items(), key=lambda g: [str(k) for k in g[0]]):
+        aluminum_type, kind, role = key
+        fit, unfit = [], []
+        for piece in group:
+            (fit if _to_units(piece["length"]) + kerf_units <= capacity else unfit).append(piece)
+
+        sizes = [_to_units(piece["length"]) + kerf_units for piece in fit]
+
+        # Offcuts from the yard first
+        stock = remnants.get(key, [])
+        stock_units = [_to_units(remnant["length"]) for remnant in stock]
+        filled, rest = fill_remnants(sizes, [units + kerf_units for units in stock_units])
+
+        used_remnants = []
+        for r, indexes in filled.items():
+            used_remnants.append({
+                "id": stock[r]["id"],
+                "length": stock_units[r] / SCALE,
+                **_stock_cuts(fit, sizes, indexes, stock_units[r], kerf_units),
+            })
+        used_remnants.sort(key=lambda remnant: remnant["remnant"])
+
+        rest_sizes = [sizes[k] for k in rest]
+        if exact and len(rest_sizes) <= EXACT_MAX_PIECES:
+            packed = exact_bin_packing(rest_sizes, capacity)
+        else:
+            packed = best_fit_decreasing(rest_sizes, capacity)
+
+        bars = [
+            _stock_cuts(fit, sizes, [rest[i] for i in indexes], bar_units, kerf_units)
+            for indexes in packed
+        ]
+        bars.sort(key=lambda bar: bar["remnant"])
+
+        total_length = sum(_to_units(piece["length"]) for piece in fit) / SCALE
+        stock_length = len(bars) * bar_length + sum(remnant["length"] for remnant in used_remnants)
+
+        plans.append({
+            "aluminum_type": aluminum_type,
+            "kind": kind,
+            "role": role,
+            "bar_length": bar_length,
+            "kerf": kerf,
+            "bar_count": len(bars),
+            "total_length": total_length,
+            "remnant_count": len(used_remnants),
+            "waste": round(stock_length - total_length, 2),
+            "waste_percent": round((stock_length - total_length) / stock_length * 100, 1) if stock_length else 0,
+            "bars": bars,
+            "remnants": used_remnants,
+            "unfit": unfit,
+        })
+
+    return plans
+
+
+def bars_per_role(plans, kind):
+    """
+    Bar count per role for frames or sashes, summed over aluminum types.
+    Unfit pieces need special stock and are not counted.
+    """
+    roles = FRAME_ROLES if kind == "frame" else SASH_ROLES
+    totals = {role: 0 for role in roles}
+    for plan in plans:
+        if plan["kind"] == kind:
+            totals[plan["role"]] += plan["bar_count"]
+    return totals
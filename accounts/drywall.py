@@ -0,0 +1,244 @@
+import math
+
+import numpy as np
+
+from .models import Wall, Ceiling
+
+
+def calculate_wall_materials(wall):
+    # Check if it's a wall or ceiling
+    if hasattr(wall, 'width'):  # It's a wall
+        # Convert cm to meters
+        width = float(wall.width) / 100  # Convert cm to meters
+        height = float(wall.height) / 100  # Convert cm to meters
+        area = width * height
+        layers = wall.number_of_layers
+        faces = 2 if wall.double_sided else 1
+        item_type = 'wall'
+    else:  # It's a ceiling
+        area = float(wall.area)  # Already in square meters
+        # Assume square-ish ceiling for calculation purposes
+        width = math.sqrt(area)
+        height = area / width
+        layers = 1  # Ceilings typically have 1 layer
+        faces = 1  # Ceilings are single-sided
+        item_type = 'ceiling'
+
+    board_width = 1.2  # standard gypsum board width in meters
+    board_height = float(wall.board_length)  # comes from board_length
+
+    result = {
+        'item_id': wall.id,
+        'item_type': item_type,
+        'room': wall.room.name,
+        'width': width,
+        'height': height,
+        'area': area,
+        'drywall_type': wall.get_drywall_type_display(),
+        'stud_thickness': wall.get_stud_thickness_display(),
+        'board_length': board_height,
+        'layers': layers,
+        'faces': faces,
+    }
+
+    if item_type == 'wall':
+        # Wall calculations
+        # Tracks (top + bottom)
+        track_length = width * 2
+        result['track_length'] = round(track_length, 2)
+        result['track_count'] = math.ceil(track_length / 3)  # 3m standard track lengths
+
+        # Studs
+        stud_spacing = 0.4  # 40cm spacing
+        stud_count = math.ceil(width / stud_spacing) + 1  # +1 for end stud
+
+        # Calculate how many 3m studs needed based on height
+        studs_per_height = math.ceil(height / 3)
+        total_studs = stud_count * studs_per_height
+
+        result['stud_count'] = total_studs
+        result['hangers'] = 0  # Walls don't need hangers
+
+    else:  # ceiling
+        # Ceiling calculations - your simplified method
+        # Calculate approximate length from square root of area
+        length = math.sqrt(area)
+
+        # Track length = length * 2
+        track_length = length * 2
+        result['track_length'] = round(track_length, 2)
+
+        # Track count = track_length / 3 + 1
+        result['track_count'] = math.ceil(track_length / 3) + 1
+
+        # Stud count = length / 0.4 (every 40cm)
+        stud_count = math.ceil(length / 0.4)
+
+        # Calculate how many 3m studs needed based on ceiling height (assume 2.5m standard)
+        ceiling_height = 2.5  # standard ceiling height in meters
+        studs_per_height = math.ceil(ceiling_height / 3)
+        total_studs = stud_count * studs_per_height
+
+        result['stud_count'] = total_studs
+        result['hangers'] = 0  # Not using hangers in your calculation
+
+    # Boards (same calculation for both)
+    board_area = board_width * board_height
+    board_count = math.ceil(area / board_area) * layers * faces
+    result['gypsum_boards'] = board_count
+
+    return result
+
+
+# values() columns the batch calculator reads
+WALL_FIELDS = ('id', 'room__name', 'width', 'height', 'drywall_type', 'stud_thickness',
+               'number_of_layers', 'double_sided', 'board_length')
+CEILING_FIELDS = ('id', 'room__name', 'area', 'drywall_type', 'stud_thickness', 'board_length')
+
+
+def _column(rows, field, dtype=float):
+    return np.fromiter((row[field] for row in rows), dtype=dtype, count=len(rows))
+
+
+def _choice_labels(model, field):
+    return dict(model._meta.get_field(field).flatchoices)
+
+
+def _batch_rows(model, item_type, rows, width, height, area, layers, faces, track_length,
+                track_count, stud_count, gypsum_boards):
+    # Back to the per-item dicts of calculate_wall_materials, as Python numbers
+    drywall_types = _choice_labels(model, 'drywall_type')
+    stud_thicknesses = _choice_labels(model, 'stud_thickness')
+    width, height, area, track_length = (width.tolist(), height.tolist(), area.tolist(),
+                                         track_length.tolist())
+    layers, faces, track_count, stud_count, gypsum_boards = (
+        column.astype(np.int64).tolist() for column in (layers, faces, track_count, stud_count, gypsum_boards)
+    )
+    return [
+        {
+            'item_id': row['id'],
+            'item_type': item_type,
+            'room': row['room__name'],
+            'width': width[k],
+            'height': height[k],
+            'area': area[k],
+            'drywall_type': drywall_types.get(row['drywall_type'], row['drywall_type']),
+            'stud_thickness': stud_thicknesses.get(row['stud_thickness'], row['stud_thickness']),
+            'board_length': float(row['board_length']),
+            'layers': layers[k],
+            'faces': faces[k],
+            # Python's round(), np.round can land on the other side of a half
+            'track_length': round(track_length[k], 2),
+            'track_count': track_count[k],
+            'stud_count': stud_count[k],
+            'hangers': 0,
+            'gypsum_boards': gypsum_boards[k],
+        }
+        for k, row in enumerate(rows)
+    ]
+
+
+def wall_materials_batch(rows):
+    """calculate_wall_materials() for many walls at once; ``rows`` are values(*WALL_FIELDS)."""
+    width = _column(rows, 'width') / 100
+    height = _column(rows, 'height') / 100
+    area = width * height
+    layers = _column(rows, 'number_of_layers', np.int64)
+    faces = np.where(_column(rows, 'double_sided', bool), 2, 1)
+    board_length = _column(rows, 'board_length')
+
+    track_length = width * 2
+    track_count = np.ceil(track_length / 3)
+    stud_count = (np.ceil(width / 0.4) + 1) * np.ceil(height / 3)
+    gypsum_boards = np.ceil(area / (1.2 * board_length)) * layers * faces
+
+    return _batch_rows(Wall, 'wall', rows, width, height, area, layers, faces,
+                       track_length, track_count, stud_count, gypsum_boards)
+
+
+def ceiling_materials_batch(rows):
+    """
+    calculate_wall_materials() for many ceilings at once; ``rows`` are
+    values(*CEILING_FIELDS). A zero-area ceiling gets height 0 here, where
+    the single-item function divides by zero.
+    """
+    count = len(rows)
+    area = _column(rows, 'area')
+    width = np.sqrt(area)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        height = np.where(width > 0, area / width, 0.0)
+    layers = np.ones(count, dtype=np.int64)
+    faces = np.ones(count, dtype=np.int64)
+    board_length = _column(rows, 'board_length')
+
+    track_length = width * 2
+    track_count = np.ceil(track_length / 3) + 1
+    # Studs come in 3 m pieces and ceilings are taken as 2.5 m high: one per line
+    stud_count = np.ceil(width / 0.4) * math.ceil(2.5 / 3)
+    gypsum_boards = np.ceil(area / (1.2 * board_length)) * layers * faces
+
+    return _batch_rows(Ceiling, 'ceiling', rows, width, height, area, layers, faces,
+                       track_length, track_count, stud_count, gypsum_boards)
+
+
+def project_drywall_materials(project_id):
+    """
+    calculate_wall_materials() results for every wall, then every ceiling,
+    of a project: one values() query per kind and one NumPy pass each.
+    """
+    items = []
+    for model, fields, batch, number_field in (
+        (Wall, WALL_FIELDS, wall_materials_batch, 'wall_number'),
+        (Ceiling, CEILING_FIELDS, ceiling_materials_batch, 'ceiling_number'),
+    ):
+        rows = list(model.objects.filter(room__project_id=project_id).order_by('id').values(*fields))
+        for number, data in enumerate(batch(rows), start=1):
+            data[number_field] = number
+            items.append(data)
+    return items
+
+
+def projects_drywall_totals(project_ids):
+    """
+    Gypsum boards per drywall type and board length, and 3 m stud and track
+    bars per stud thickness, over every wall and ceiling of the projects:
+    one values() query and one NumPy pass per kind.
+    """
+    boards = {}
+    framing = {}
+    for model, fields, batch in (
+        (Wall, WALL_FIELDS, wall_materials_batch),
+        (Ceiling, CEILING_FIELDS, ceiling_materials_batch),
+    ):
+        rows = list(model.objects.filter(room__project_id__in=project_ids).values(*fields))
+        for data in batch(rows):
+            board = boards.setdefault((data['drywall_type'], data['board_length']), {
+                'drywall_type': data['drywall_type'],
+                'board_length': data['board_length'],
+                'surfaces': 0,
+                'area': 0.0,
+                'gypsum_boards': 0,
+            })
+            board['surfaces'] += 1
+            board['area'] += data['area']
+            board['gypsum_boards'] += data['gypsum_boards']
+
+            profile = framing.setdefault(data['stud_thickness'], {
+                'stud_thickness': data['stud_thickness'],
+                'stud_count': 0,
+                'track_count': 0,
+                'track_length': 0.0,
+            })
+            profile['stud_count'] += data['stud_count']
+            profile['track_count'] += data['track_count']
+            profile['track_length'] += data['track_length']
+
+    for board in boards.values():
+        board['area'] = round(board['area'], 2)
+    for profile in framing.values():
+        profile['track_length'] = round(profile['track_length'], 2)
+
+    return {
+        'boards': [boards[key] for key in sorted(boards, key=lambda key: (str(key[0]), key[1]))],
+        'framing': [framing[key] for key in sorted(framing, key=str)],
+    }
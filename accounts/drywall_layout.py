@@ -0,0 +1,228 @@
+import math
+from collections import defaultdict
+
+from .cut_lists import sorted_numbers
+from .cutting import best_fit_decreasing
+from .models import Wall, Ceiling
+
+
+# Gypsum boards are 1.2 m wide; their length is the wall's board_length
+BOARD_WIDTH = 120  # cm
+
+# Lengths are packed as integers in mm
+SCALE = 10
+
+
+def _to_units(length):
+    return int(round(float(length) * SCALE))
+
+
+def load_drywall_surfaces(project_id):
+    """
+    Every wall and ceiling of a project as a surface to cover and frame, in
+    two queries. Sizes are in cm and area in m²; ``copies`` is how many times
+    the surface is boarded (layers × faces). Ceilings are taken as squares,
+    like calculate_wall_materials() does.
+    """
+    drywall_types = dict(Wall.DRYWALL_TYPES)
+    surfaces = []
+
+    walls = Wall.objects.filter(room__project_id=project_id).order_by('id').values(
+        'room_id', 'room__name', 'width', 'height', 'drywall_type', 'stud_thickness', 'number_of_layers',
+        'double_sided', 'board_length',
+    )
+    for number, row in enumerate(walls, start=1):
+        copies = row['number_of_layers'] * (2 if row['double_sided'] else 1)
+        board_length = float(row['board_length'])
+        area = float(row['width']) / 100 * float(row['height']) / 100
+        surfaces.append({
+            "item": f"Wall {number}",
+            "kind": 'wall',
+            "room_id": row['room_id'],
+            "room": row['room__name'],
+            "drywall_type": drywall_types.get(row['drywall_type'], row['drywall_type']),
+            "stud_thickness": row['stud_thickness'],
+            "board_length": board_length,
+            "width": float(row['width']),
+            "height": float(row['height']),
+            "area": area,
+            "copies": copies,
+            "estimate": math.ceil(area / (1.2 * board_length)) * copies,
+        })
+
+    ceilings = Ceiling.objects.filter(room__project_id=project_id).order_by('id').values(
+        'room_id', 'room__name', 'area', 'drywall_type', 'stud_thickness', 'board_length',
+    )
+    for number, row in enumerate(ceilings, start=1):
+        board_length = float(row['board_length'])
+        side = math.sqrt(float(row['area'])) * 100
+        surfaces.append({
+            "item": f"Ceiling {number}",
+            "kind": 'ceiling',
+            "room_id": row['room_id'],
+            "room": row['room__name'],
+            "drywall_type": drywall_types.get(row['drywall_type'], row['drywall_type']),
+            "stud_thickness": row['stud_thickness'],
+            "board_length": board_length,
+            "width": side,
+            "height": side,
+            "area": float(row['area']),
+            "copies": 1,
+            "estimate": math.ceil(float(row['area']) / (1.2 * board_length)),
+        })
+
+    return surfaces
+
+
+def surface_pieces(surface, board_width, board_length):
+    """
+    Boards run full height in columns across the surface: each column is
+    whole boards plus a top piece, and the last column is ripped narrower.
+    Returns (whole boards, [(width, height)] cut pieces), in board units.
+    """
+    width, height = _to_units(surface["width"]), _to_units(surface["height"])
+    full_columns, rip = divmod(width, board_width)
+    full_rows, top = divmod(height, board_length)
+
+    whole = full_columns * full_rows
+    pieces = []
+    if top:
+        pieces += [(board_width, top)] * full_columns
+    if rip:
+        pieces += [(rip, board_length)] * full_rows
+        if top:
+            pieces.append((rip, top))
+
+    copies = surface["copies"]
+    return whole * copies, pieces * copies
+
+
+def pack_board_pieces(pieces, board_width, board_length):
+    """
+    Cut (width, height) pieces, none bigger than a board, out of as few
+    boards as possible; returns one list of (piece index, x, y) per board.
+
+    Guillotine cuts in three 1-D stages, each a best-fit decreasing pass:
+    narrow pieces of one width are stacked into strips along the board,
+    strips are ripped side by side into full-width bands (tallest strips
+    first, so a band is as tall as its first strip), and full-width pieces
+    and bands are cross-cut out of the boards. An offcut of one surface is
+    used for any other surface in the same pass.
+    """
+    by_width = defaultdict(list)
+    wide = []
+    for k, (width, height) in enumerate(pieces):
+        (wide if width >= board_width else by_width[width]).append(k)
+
+    strips = []  # (width, height, [(piece index, y)])
+    for width, indexes in by_width.items():
+        heights = [pieces[k][1] for k in indexes]
+        for stack in best_fit_decreasing(heights, board_length):
+            y, cuts = 0, []
+            for i in stack:
+                cuts.append((indexes[i], y))
+                y += heights[i]
+            strips.append((width, y, cuts))
+
+    tallest_first = sorted(range(len(strips)), key=lambda s: strips[s][1], reverse=True)
+    bands = best_fit_decreasing([strip[0] for strip in strips], board_width, order=tallest_first)
+
+    # Segments along the board: a full-width piece or a band of strips
+    segments = [(pieces[k][1], [(k, 0, 0)]) for k in wide]
+    for band in bands:
+        x, cuts = 0, []
+        for s in band:
+            width, _, stack = strips[s]
+            cuts.extend((k, x, y) for k, y in stack)
+            x += width
+        segments.append((strips[band[0]][1], cuts))
+
+    boards = []
+    for board in best_fit_decreasing([segment[0] for segment in segments], board_length):
+        y, cuts = 0, []
+        for s in board:
+            height, segment_cuts = segments[s]
+            cuts.extend((k, x, y + dy) for k, x, dy in segment_cuts)
+            y += height
+        boards.append(cuts)
+    return boards
+
+
+def layout_boards(surfaces, by_room=False):
+    """
+    Board plan per drywall type (color) and board length, or per room too
+    with ``by_room``. Each plan has the board count (whole boards hung as
+    they come plus boards that get cut), the per-surface estimate it
+    replaces, areas in m², waste_percent and a cut list: identical board
+    patterns merged into quantity lines with the surfaces they serve.
+    """
+    groups = defaultdict(list)
+    room_names = {}
+    for surface in surfaces:
+        key = (surface["drywall_type"], surface["board_length"])
+        if by_room:
+            # Rooms of the same name are still separate rooms
+            key += (surface["room_id"],)
+            room_names[surface["room_id"]] = surface["room"]
+        groups[key].append(surface)
+
+    board_width = _to_units(BOARD_WIDTH)
+    plans = []
+    for key in sorted(groups, key=lambda key: (str(key[0]), key[1]) + (
+            (str(room_names[key[2]]), key[2]) if by_room else ())):
+        group = groups[key]
+        board_length = _to_units(key[1] * 100)
+
+        whole_boards = 0
+        pieces, items = [], []
+        for surface in group:
+            whole, cut = surface_pieces(surface, board_width, board_length)
+            whole_boards += whole
+            pieces += cut
+            items += [surface["item"]] * len(cut)
+
+        patterns = {}
+        for board in pack_board_pieces(pieces, board_width, board_length):
+            cuts = tuple(sorted((x, y) + pieces[k] for k, x, y in board))
+            line = patterns.get(cuts)
+            if line is None:
+                line = patterns[cuts] = {
+                    "cuts": [
+                        {"x": x / SCALE, "y": y / SCALE, "width": w / SCALE, "height": h / SCALE}
+                        for x, y, w, h in cuts
+                    ],
+                    "quantity": 0,
+                    "items": set(),
+                }
+            line["quantity"] += 1
+            line["items"].update(items[k] for k, _, _ in board)
+
+        cut_list = sorted(patterns.values(), key=lambda line: -line["quantity"])
+        for line in cut_list:
+            line["items"] = sorted_numbers(line["items"])
+
+        cut_boards = sum(line["quantity"] for line in cut_list)
+        board_count = whole_boards + cut_boards
+        board_area = board_count * board_width * board_length / SCALE ** 2 / 10000
+        piece_area = (whole_boards * board_width * board_length + sum(w * h for w, h in pieces)) / SCALE ** 2 / 10000
+
+        plans.append({
+            "drywall_type": key[0],
+            "board_length": key[1],
+            "room_id": key[2] if by_room else None,
+            "room": room_names[key[2]] if by_room else None,
+            "board_count": board_count,
+            "whole_boards": whole_boards,
+            "cut_boards": cut_boards,
+            "estimate": sum(surface["estimate"] for surface in group),
+            "piece_area": round(piece_area, 2),
+            "board_area": round(board_area, 2),
+            "waste_percent": round((board_area - piece_area) / board_area * 100, 1) if board_area else 0,
+            "cut_list": cut_list,
+        })
+
+    return plans
+
+
+def project_board_layout(project_id, by_room=False):
+    return layout_boards(load_drywall_surfaces(project_id), by_room)
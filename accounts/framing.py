@@ -0,0 +1,188 @@
+import math
+from collections import defaultdict
+
+from .cut_lists import sorted_numbers
+from .cutting import EXACT_MAX_PIECES, best_fit_decreasing, exact_bin_packing
+from .drywall_layout import load_drywall_surfaces
+from .models import MetalProfile
+
+
+# Stock length when none of the contractor's suppliers lists the profile, MetalProfile's default
+DEFAULT_BAR_LENGTH = 3.0  # m
+
+STUD_SPACING = 0.4  # m, as in calculate_wall_materials()
+
+# A stud or track longer than a bar is spliced: each joint laps the next bar
+# by SPLICE_OVERLAP, and no spliced piece may be shorter than MIN_PIECE_LENGTH
+SPLICE_OVERLAP = 30  # cm
+MIN_PIECE_LENGTH = 60  # cm
+
+# Shorter listed bars can't be spliced, so plans skip them
+MIN_BAR_LENGTH = (SPLICE_OVERLAP + MIN_PIECE_LENGTH) / 100  # m
+
+# Lengths are packed as integers in 1/100 cm so sums never drift
+SCALE = 100
+
+
+def _to_units(length):
+    return int(round(float(length) * SCALE))
+
+
+def load_bar_lengths(project_id):
+    """
+    Stock lengths (m) per (profile_type, size) listed in MetalProfile by the
+    suppliers the project's contractor orders from, in one query.
+    """
+    lengths = defaultdict(set)
+    profiles = MetalProfile.objects.filter(supplier__orders_received__contractor__owned_projects=project_id)
+    for profile_type, size, length in profiles.values_list(
+        'profile_type', 'size', 'length_meters'
+    ).distinct():
+        lengths[(profile_type, size)].add(float(length))
+    return {key: sorted(values) for key, values in lengths.items()}
+
+
+def framing_pieces(surface):
+    """
+    The studs and tracks of one wall or ceiling as (profile_type, length cm)
+    pieces, plus the 3 m bars per profile that calculate_wall_materials()
+    counts for it.
+
+    Walls get a track on top and bottom and a stud every 40 cm plus one at
+    the end, each as high as the wall. Ceilings are squares with two tracks
+    and a stud every 40 cm across them.
+    """
+    # Counted in meters exactly as calculate_wall_materials() does
+    if surface["kind"] == 'wall':
+        width, height = surface["width"] / 100, surface["height"] / 100
+        stud_count = math.ceil(width / STUD_SPACING) + 1
+        estimate = {'stud': stud_count * math.ceil(height / 3), 'track': math.ceil(width * 2 / 3)}
+    else:
+        width = height = math.sqrt(surface["area"])
+        stud_count = math.ceil(width / STUD_SPACING)
+        estimate = {'stud': stud_count, 'track': math.ceil(width * 2 / 3) + 1}
+
+    pieces = [('track', width * 100)] * 2 + [('stud', height * 100)] * stud_count
+    return pieces, estimate
+
+
+def splice(units, bar_units):
+    """
+    The stock one stud or track of ``units`` needs: (whole bars, [cut
+    lengths]). Up to a bar it is one cut piece. Longer, it is bars joined
+    with SPLICE_OVERLAP at every joint, the last one cut to length; a last
+    piece under MIN_PIECE_LENGTH takes the minimum from the bar before it,
+    so both can still be fixed.
+    """
+    if units <= bar_units:
+        return 0, [units]
+
+    overlap, minimum = _to_units(SPLICE_OVERLAP), _to_units(MIN_PIECE_LENGTH)
+    if bar_units <= overlap + minimum:
+        raise ValueError(f"A {bar_units / SCALE} cm bar is too short to splice")
+    joints = math.ceil((units - bar_units) / (bar_units - overlap))
+    rest = units - joints * (bar_units - overlap)
+    if rest == bar_units:
+        return joints + 1, []
+    if rest >= minimum:
+        return joints, [rest]
+    return joints - 1, [bar_units - (minimum - rest), minimum]
+
+
+def _plan_group(pieces, bar_units):
+    whole_bars = 0
+    sizes, cut_pieces = [], []
+    for units, item in pieces:
+        whole, cuts = splice(units, bar_units)
+        whole_bars += whole
+        sizes += cuts
+        cut_pieces += [item] * len(cuts)
+
+    if len(sizes) <= EXACT_MAX_PIECES:
+        bars = exact_bin_packing(sizes, bar_units)
+    else:
+        bars = best_fit_decreasing(sizes, bar_units)
+    return whole_bars, sizes, cut_pieces, bars
+
+
+def plan_framing(surfaces, bar_lengths=None):
+    """
+    Cut the studs and tracks of ``surfaces`` (load_drywall_surfaces() rows)
+    out of stock bars, one plan per profile type and stud_thickness.
+
+    ``bar_lengths`` maps (profile_type, size) to the stock lengths on offer
+    (load_bar_lengths()); every one over MIN_BAR_LENGTH is tried and the one
+    that needs the least metal wins, DEFAULT_BAR_LENGTH when none is. Each
+    plan has the bar count (whole bars plus bars that get cut), the
+    per-surface estimate it replaces, lengths in m, waste and the cutting
+    plan: identical bars merged into quantity lines with their cuts, offcut
+    and the surfaces they serve.
+    """
+    bar_lengths = bar_lengths or {}
+    sizes_labels = dict(MetalProfile.SIZE_CHOICES)
+
+    groups = defaultdict(list)
+    estimates = defaultdict(int)
+    for surface in surfaces:
+        pieces, estimate = framing_pieces(surface)
+        for profile_type, length in pieces:
+            groups[(profile_type, surface["stud_thickness"])].append((_to_units(length), surface["item"]))
+        for profile_type, bars in estimate.items():
+            estimates[(profile_type, surface["stud_thickness"])] += bars
+
+    plans = []
+    for key in sorted(groups, key=lambda key: [str(part) for part in key]):
+        profile_type, size = key
+        pieces = groups[key]
+
+        best = None
+        listed = [length for length in bar_lengths.get(key, []) if length > MIN_BAR_LENGTH]
+        for bar_length in listed or [DEFAULT_BAR_LENGTH]:
+            bar_units = _to_units(bar_length * 100)
+            whole_bars, sizes, items, bars = _plan_group(pieces, bar_units)
+            stock = (whole_bars + len(bars)) * bar_units
+            if best is None or stock < best[0]:
+                best = (stock, bar_length, bar_units, whole_bars, sizes, items, bars)
+
+        stock, bar_length, bar_units, whole_bars, sizes, items, bars = best
+
+        patterns = {}
+        for bar in bars:
+            cuts = tuple(sorted((sizes[k] for k in bar), reverse=True))
+            line = patterns.get(cuts)
+            if line is None:
+                line = patterns[cuts] = {
+                    "cuts": [units / SCALE for units in cuts],
+                    "remnant": (bar_units - sum(cuts)) / SCALE,
+                    "quantity": 0,
+                    "items": set(),
+                }
+            line["quantity"] += 1
+            line["items"].update(items[k] for k in bar)
+
+        cutting_plan = sorted(patterns.values(), key=lambda line: (line["remnant"], -line["quantity"]))
+        for line in cutting_plan:
+            line["items"] = sorted_numbers(line["items"])
+
+        total_length = sum(units for units, _ in pieces) / SCALE / 100
+        stock_length = stock / SCALE / 100
+
+        plans.append({
+            "profile_type": profile_type,
+            "stud_thickness": sizes_labels.get(size, size),
+            "bar_length": bar_length,
+            "bar_count": whole_bars + len(bars),
+            "whole_bars": whole_bars,
+            "estimate": estimates[key],
+            "piece_count": len(pieces),
+            "total_length": round(total_length, 2),
+            "waste": round(stock_length - total_length, 2),
+            "waste_percent": round((stock_length - total_length) / stock_length * 100, 1) if stock_length else 0,
+            "bars": cutting_plan,
+        })
+
+    return plans
+
+
+def project_framing(project_id):
+    return plan_framing(load_drywall_surfaces(project_id), load_bar_lengths(project_id))
@@ -0,0 +1,136 @@
+import json
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+
+# Versioned table of GIRTH / DEPTH / FRAME_INSIDE / PROFILE_WIDTH per aluminum type
+PROFILE_CONSTANTS_PATH = os.path.join(settings.BASE_DIR, 'accounts', 'data', 'aluminum_profiles.json')
+
+CONSTANT_NAMES = ("GIRTH", "DEPTH", "FRAME_INSIDE", "PROFILE_WIDTH")
+
+
+@lru_cache(maxsize=8)
+def _read_profile_constants(path, mtime):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    types = list(data["profiles"])
+    # One row per aluminum type, plus the default row last for unknown types
+    matrix = np.array(
+        [[data["profiles"][t][name] for name in CONSTANT_NAMES] for t in types]
+        + [[data["default"][name] for name in CONSTANT_NAMES]],
+        dtype=float,
+    )
+    return {
+        "version": data["version"],
+        "types": {t: i for i, t in enumerate(types)},
+        "matrix": matrix,
+    }
+
+
+def load_profile_constants(path=PROFILE_CONSTANTS_PATH):
+    """The profile constants table; re-read only when the file changes."""
+    return _read_profile_constants(path, os.path.getmtime(path))
+
+
+def coerce_opening(item):
+    """
+    Check and convert one raw item (as parsed from the add-aluminum form or
+    the preview API) to numbers. Raises ValueError for items that can't be built.
+    """
+    if item.get("type") not in ('window', 'door'):
+        raise ValueError(f"Unknown item type '{item.get('type')}'")
+    for field in ("subtype", "aluminum_type"):
+        if not item.get(field):
+            raise ValueError(f"Missing {field}")
+
+    sash_count = int(item.get("sash_count", 2))
+    if sash_count < 1:
+        raise ValueError("An opening needs at least one sash")
+
+    heights = [float(h) for h in item["heights"]]
+    widths = [float(w) for w in item["widths"]]
+    if not heights or not widths:
+        raise ValueError("Missing heights or widths")
+    if not all(math.isfinite(v) for v in heights + widths):
+        raise ValueError("Heights and widths must be numbers")
+
+    return {
+        "type": item["type"],
+        "subtype": item["subtype"],
+        "aluminum_type": str(item["aluminum_type"]),
+        "sash_count": sash_count,
+        "min_height": min(heights),
+        "min_width": min(widths),
+    }
+
+
+def compute_openings(openings, constants=None):
+    """
+    Frame, sash and glass dimensions (cm) for a batch of coerced openings,
+    as NumPy arrays of the same length. frame_bottom is NaN where the
+    opening has no bottom frame (multi-bolt doors).
+    """
+    constants = constants or load_profile_constants()
+    count = len(openings)
+
+    default_row = len(constants["types"])
+    rows = np.fromiter(
+        (constants["types"].get(o["aluminum_type"], default_row) for o in openings), dtype=np.intp, count=count
+    )
+    GIRTH, DEPTH, FRAME_INSIDE, PROFILE_WIDTH = constants["matrix"][rows].T
+
+    min_height = np.fromiter((o["min_height"] for o in openings), dtype=float, count=count)
+    min_width = np.fromiter((o["min_width"] for o in openings), dtype=float, count=count)
+    sash_count = np.fromiter((o["sash_count"] for o in openings), dtype=float, count=count)
+    is_door = np.fromiter((o["type"] == 'door' for o in openings), dtype=bool, count=count)
+    is_sliding = np.fromiter((o["subtype"] == 'sliding' for o in openings), dtype=bool, count=count)
+    is_multi_bolt = np.fromiter((o["subtype"] == 'multi_bolt' for o in openings), dtype=bool, count=count)
+
+    frame_side = min_height - 1
+    frame_top = min_width - 1
+    frame_bottom = np.where(is_door & ~is_sliding, np.nan, frame_top)
+
+    # Multi-bolt doors hang their sashes inside the profile; everything else slides
+    multi_bolt_door = is_door & is_multi_bolt
+    sash_side = np.where(
+        multi_bolt_door,
+        min_height - 1 - PROFILE_WIDTH,
+        min_height - FRAME_INSIDE,
+    )
+    sash_top_bottom = np.where(
+        multi_bolt_door,
+        (min_width - 1 - (2 * PROFILE_WIDTH)) / sash_count,
+        (min_width - ((sash_count - 1) * GIRTH)) / sash_count,
+    )
+
+    return {
+        "sash_count": sash_count.astype(int),
+        "frame_side": frame_side,
+        "frame_top": frame_top,
+        "frame_bottom": frame_bottom,
+        "sash_side": sash_side,
+        "sash_top_bottom": sash_top_bottom,
+        "glass_width": sash_top_bottom - DEPTH - 1,
+        "glass_height": sash_side - DEPTH - 1,
+    }
+
+
+def opening_geometry(arrays, k):
+    """Row ``k`` of compute_openings() as plain floats, grouped by part."""
+    frame_bottom = float(arrays["frame_bottom"][k])
+    sash_top_bottom = float(arrays["sash_top_bottom"][k])
+    return {
+        "sash_count": int(arrays["sash_count"][k]),
+        "frame": {
+            "side": float(arrays["frame_side"][k]),
+            "top": float(arrays["frame_top"][k]),
+            "bottom": None if np.isnan(frame_bottom) else frame_bottom,
+        },
+        "sash": {"side": float(arrays["sash_side"][k]), "top": sash_top_bottom, "bottom": sash_top_bottom},
+        "glass": {"height": float(arrays["glass_height"][k]), "width": float(arrays["glass_width"][k])},
+    }
@@ -0,0 +1,226 @@
+from collections import defaultdict
+
+import numpy as np
+
+from .models import WindowSash, DoorSash
+
+
+# Stock glass sheets (width, height) in cm; each glass type is nested on every
+# listed size and the size that needs the least stock area wins
+GLASS_SHEET_SIZES = {
+    'default': [(321, 225)],
+}
+
+# Lengths are packed as integers in mm
+SCALE = 10
+
+
+def _to_units(length):
+    return int(round(float(length) * SCALE))
+
+
+def load_project_panes(project_id):
+    """Every glass pane of a project's windows and doors, in two queries."""
+    panes = []
+    for sash_model, item_type, number_field in (
+        (WindowSash, 'window', 'window_number'),
+        (DoorSash, 'door', 'door_number'),
+    ):
+        rows = sash_model.objects.filter(**{f'{item_type}__room__project_id': project_id}).order_by('id').values(
+            'glass_id', 'glass__glass_type', 'glass__height', 'glass__width', f'{item_type}__{number_field}',
+        )
+        for row in rows:
+            panes.append({
+                "glass_id": row['glass_id'],
+                "item": f"{item_type.title()} {row[f'{item_type}__{number_field}']}",
+                "glass_type": row['glass__glass_type'],
+                "width": row['glass__width'],
+                "height": row['glass__height'],
+            })
+    return panes
+
+
+def guillotine_pack(sizes, sheet_width, sheet_height, rotate=True):
+    """
+    Place (width, height) integer rectangles on as few sheets as possible
+    with guillotine cuts only. Returns (placements, unfit) where placements
+    are (sheet, x, y, width, height, rotated) per rectangle index, or None.
+
+    Rectangles go largest area first into the free rectangle that leaves the
+    least area over (best area fit); the leftover is split along its shorter
+    side. Free rectangles of every open sheet live in NumPy arrays, so each
+    placement is one vectorized scan. A zero or negative size raises
+    ValueError.
+    """
+    if sheet_width <= 0 or sheet_height <= 0:
+        raise ValueError(f"Sheet {sheet_width} x {sheet_height} must be positive")
+    if any(w <= 0 or h <= 0 for w, h in sizes):
+        raise ValueError("Rectangles must have a positive width and height")
+
+    count = len(sizes)
+    order = sorted(range(count), key=lambda k: sizes[k][0] * sizes[k][1], reverse=True)
+
+    # Each placement uses one free rectangle and adds at most two
+    capacity = 2 * count + 1
+    free_x = np.zeros(capacity, dtype=np.int64)
+    free_y = np.zeros(capacity, dtype=np.int64)
+    free_w = np.zeros(capacity, dtype=np.int64)
+    free_h = np.zeros(capacity, dtype=np.int64)
+    free_sheet = np.zeros(capacity, dtype=np.int64)
+    used = 0
+    sheet_count = 0
+
+    placements = [None] * count
+    unfit = []
+
+    def add_free(x, y, w, h, sheet):
+        nonlocal used
+        if w > 0 and h > 0:
+            free_x[used], free_y[used], free_w[used], free_h[used], free_sheet[used] = x, y, w, h, sheet
+            used += 1
+
+    for k in order:
+        w, h = sizes[k]
+        fits_flat = w <= sheet_width and h <= sheet_height
+        fits_rotated = rotate and h <= sheet_width and w <= sheet_height
+        if not (fits_flat or fits_rotated):
+            unfit.append(k)
+            continue
+
+        fw, fh = free_w[:used], free_h[:used]
+        leftover = fw * fh - w * h
+        flat = np.where((fw >= w) & (fh >= h), leftover, np.iinfo(np.int64).max)
+        if rotate:
+            turned = np.where((fw >= h) & (fh >= w), leftover, np.iinfo(np.int64).max)
+        else:
+            turned = flat
+
+        best_flat = int(np.argmin(flat)) if used else -1
+        best_turned = int(np.argmin(turned)) if used else -1
+
+        if used and min(flat[best_flat], turned[best_turned]) < np.iinfo(np.int64).max:
+            rotated = turned[best_turned] < flat[best_flat]
+            r = best_turned if rotated else best_flat
+        else:
+            # Nothing open can take it, start a new sheet
+            add_free(0, 0, sheet_width, sheet_height, sheet_count)
+            sheet_count += 1
+            r = used - 1
+            rotated = not fits_flat
+
+        if rotated:
+            w, h = h, w
+
+        x, y, fw, fh, sheet = (int(free_x[r]), int(free_y[r]), int(free_w[r]),
+                               int(free_h[r]), int(free_sheet[r]))
+
+        # Drop the used rectangle by moving the last one into its slot
+        used -= 1
+        free_x[r], free_y[r], free_w[r], free_h[r], free_sheet[r] = (
+            free_x[used], free_y[used], free_w[used], free_h[used], free_sheet[used]
+        )
+
+        # Split the leftover along its shorter side, keeping the bigger piece whole
+        if fw - w < fh - h:
+            add_free(x + w, y, fw - w, h, sheet)
+            add_free(x, y + h, fw, fh - h, sheet)
+        else:
+            add_free(x + w, y, fw - w, fh, sheet)
+            add_free(x, y + h, w, fh - h, sheet)
+
+        placements[k] = (sheet, x, y, w, h, rotated)
+
+    return placements, unfit
+
+
+def _nest_on_sheet(panes, sizes, sheet_width, sheet_height):
+    sheet_units = (_to_units(sheet_width), _to_units(sheet_height))
+    placements, unfit = guillotine_pack(sizes, *sheet_units)
+
+    sheets = defaultdict(list)
+    for k, placement in enumerate(placements):
+        if placement is not None:
+            sheets[placement[0]].append((k, placement))
+
+    sheet_area = sheet_units[0] * sheet_units[1]
+    layouts = []
+    for number in sorted(sheets):
+        cuts = []
+        used_area = 0
+        for k, (_, x, y, w, h, rotated) in sheets[number]:
+            used_area += w * h
+            cuts.append({
+                "glass_id": panes[k]["glass_id"],
+                "item": panes[k]["item"],
+                "x": x / SCALE,
+                "y": y / SCALE,
+                "width": w / SCALE,
+                "height": h / SCALE,
+                "rotated": bool(rotated),
+            })
+        layouts.append({
+            "number": number + 1,
+            "panes": cuts,
+            "used_area": round(used_area / SCALE ** 2 / 10000, 3),  # m²
+            "waste_percent": round((sheet_area - used_area) / sheet_area * 100, 1),
+        })
+
+    return layouts, [panes[k] for k in unfit]
+
+
+def nest_glass(panes, sheet_sizes=None):
+    """
+    Lay glass panes out on stock sheets, one plan per glass_type.
+
+    ``panes`` are dicts with glass_id, item, glass_type, width and height (cm),
+    as load_project_panes() builds them. Each plan has the chosen sheet size,
+    sheet_count, pane and sheet areas (m²), waste_percent, a per-sheet layout
+    (x, y from the sheet's corner, in cm), the panes bigger than any sheet
+    (``unfit``) and the panes with a zero or negative side, which are not
+    nested (``invalid``).
+    """
+    sheet_sizes = sheet_sizes or GLASS_SHEET_SIZES
+
+    groups = defaultdict(list)
+    invalid = defaultdict(list)
+    for pane in panes:
+        if _to_units(pane["width"]) > 0 and _to_units(pane["height"]) > 0:
+            groups[pane["glass_type"]].append(pane)
+        else:
+            invalid[pane["glass_type"]].append(pane)
+
+    plans = []
+    for glass_type in sorted(groups.keys() | invalid.keys(), key=str):
+        group = groups[glass_type]
+        sizes = [(_to_units(pane["width"]), _to_units(pane["height"])) for pane in group]
+
+        best = None
+        for sheet_width, sheet_height in sheet_sizes.get(glass_type, sheet_sizes['default']):
+            layouts, unfit = _nest_on_sheet(group, sizes, sheet_width, sheet_height)
+            stock_area = len(layouts) * sheet_width * sheet_height
+            if best is None or (len(unfit), stock_area) < (len(best[3]), best[0]):
+                best = (stock_area, (sheet_width, sheet_height), layouts, unfit)
+
+        stock_area, (sheet_width, sheet_height), layouts, unfit = best
+        pane_area = sum(layout["used_area"] for layout in layouts)
+        sheet_area = stock_area / 10000  # m²
+
+        plans.append({
+            "glass_type": glass_type,
+            "sheet_width": sheet_width,
+            "sheet_height": sheet_height,
+            "sheet_count": len(layouts),
+            "pane_count": len(group) - len(unfit),
+            "pane_area": round(pane_area, 3),
+            "sheet_area": round(sheet_area, 3),
+            "waste_percent": round((sheet_area - pane_area) / sheet_area * 100, 1) if sheet_area else 0,
+            "sheets": layouts,
+            "unfit": unfit,
+            "invalid": invalid[glass_type],
+        })
+
+    return plans
+
+
+def project_glass_nesting(project_id, sheet_sizes=None):
+    return nest_glass(load_project_panes(project_id), sheet_sizes)
@@ -0,0 +1,137 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+from .materials_cache import touch_project
+from .models import Glass, GlassPrice, WindowSash, DoorSash
+
+
+BULK_BATCH_SIZE = 500
+
+CENT = Decimal('0.01')
+
+GLASS_KINDS = (
+    # item_type, sash model, number field
+    ('window', WindowSash, 'window_number'),
+    ('door', DoorSash, 'door_number'),
+)
+
+
+def _glass_pane_rows(item_type, sash_model, project_ids):
+    # One sash -> glass join per opening kind; area (m²) and cost come from SQL
+    return sash_model.objects.filter(**{f'{item_type}__room__project_id__in': project_ids}).annotate(
+        area=Round(
+            F('glass__height') * F('glass__width') * Value(Decimal('0.0001')),
+            2,
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        cost=Coalesce(
+            F('glass__price'), Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+def detailed_glass_materials(project_id):
+    glass_details = []
+
+    for kind_order, (item_type, sash_model, number_field) in enumerate(GLASS_KINDS):
+        rows = _glass_pane_rows(item_type, sash_model, [project_id]).values(
+            'id', f'{item_type}_id', f'{item_type}__room_id', f'{item_type}__{number_field}',
+            'glass__glass_type', 'glass__height', 'glass__width', 'area', 'cost',
+        )
+        for row in rows:
+            glass_details.append({
+                'item': f"{item_type.title()} {row[f'{item_type}__{number_field}']}",
+                'glass_type': row['glass__glass_type'],
+                'height': row['glass__height'],
+                'width': row['glass__width'],
+                'area': row['area'].quantize(CENT),
+                'cost': row['cost'].quantize(CENT),
+                # Room by room, windows before doors, like the old nested walk
+                '_order': (row[f'{item_type}__room_id'], kind_order, row[f'{item_type}_id'], row['id']),
+            })
+
+    glass_details.sort(key=lambda g: g.pop('_order'))
+    return glass_details
+
+
+def glass_totals_by_type(project_id):
+    """Pane count, area (m²) and cost per glass_type, summed in SQL per opening kind."""
+    return projects_glass_totals([project_id])
+
+
+def projects_glass_totals(project_ids):
+    """glass_totals_by_type() summed over several projects in the same queries."""
+    totals = {}
+
+    for item_type, sash_model, _ in GLASS_KINDS:
+        rows = _glass_pane_rows(item_type, sash_model, project_ids).values('glass__glass_type').annotate(
+            panes=Count('id'),
+            total_area=Sum('area'),
+            total_cost=Sum('cost'),
+        ).order_by()
+
+        for row in rows:
+            entry = totals.setdefault(row['glass__glass_type'], {
+                'glass_type': row['glass__glass_type'],
+                'panes': 0,
+                'area': Decimal('0.00'),
+                'cost': Decimal('0.00'),
+            })
+            entry['panes'] += row['panes']
+            entry['area'] += Decimal(row['total_area'] or 0).quantize(CENT)
+            entry['cost'] += Decimal(row['total_cost'] or 0).quantize(CENT)
+
+    return [totals[glass_type] for glass_type in sorted(totals, key=str)]
+
+
+
+def load_glass_prices(contractor_id):
+    """The contractor's price per m² for each glass type, in one query."""
+    return dict(GlassPrice.objects.filter(contractor_id=contractor_id).values_list('glass_type', 'price_per_m2'))
+
+
+def pane_price(glass, prices):
+    # Same rule as Glass.save(): area in m² times the type's price, 0.00 without one
+    price_per_m2 = prices.get(glass.glass_type)
+    if price_per_m2 is None:
+        return Decimal('0.00')
+
+    # Price the sizes the database keeps, rounded like DecimalField stores them
+    height = Glass._meta.get_field('height').to_python(glass.height).quantize(CENT)
+    width = Glass._meta.get_field('width').to_python(glass.width).quantize(CENT)
+    return round(height * width / Decimal('10000') * price_per_m2, 2)
+
+
+def project_panes(project_id):
+    """Every Glass row used by a sash of the project's windows or doors."""
+    return Glass.objects.filter(
+        Q(id__in=WindowSash.objects.filter(window__room__project_id=project_id).values('glass_id'))
+        | Q(id__in=DoorSash.objects.filter(door__room__project_id=project_id).values('glass_id'))
+    )
+
+
+def reprice_project_glass(project):
+    """
+    Set every pane price of a project from its contractor's current
+    GlassPrice rows: one read of the price matrix, one read of the panes,
+    and bulk UPDATEs for the panes whose price changed.
+    Returns the number of panes updated.
+    """
+    prices = load_glass_prices(project.contractor_id)
+
+    changed = []
+    for glass in project_panes(project.id).only('id', 'glass_type', 'height', 'width', 'price'):
+        price = pane_price(glass, prices)
+        if glass.price != price:
+            glass.price = price
+            changed.append(glass)
+
+    # bulk_update sends no signals, so mark the cached materials stale here
+    Glass.objects.bulk_update(changed, ['price'], batch_size=BULK_BATCH_SIZE)
+    if changed:
+        touch_project(project.id)
+
+    return len(changed)
@@ -0,0 +1,250 @@
+import random
+import time
+from decimal import Decimal
+from math import ceil
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from accounts.api_views import clock_in_api
+from accounts.aluminum_ingest import ingest_aluminum_items, parse_aluminum_post
+from accounts.clock import clock_in
+from accounts.cutting import BAR_LENGTH, plan_cuts
+from accounts.drywall import calculate_wall_materials, wall_materials_batch
+from accounts.drywall_layout import layout_boards
+from accounts.glass_nesting import nest_glass
+from accounts.models import CustomUser, Project, Room, Wall
+from accounts.pdf_tables import render_pdf
+from accounts.token_auth import forget_token, token_user
+
+
+def scratch_project(project_type):
+    # A throwaway contractor and project; the benchmarks run inside a rolled back transaction
+    contractor = CustomUser.objects.create_user(username='benchmark-contractor', user_type='contractor')
+    return Project.objects.create(
+        project_number='BENCHMARK', address='-', project_type=project_type, contractor=contractor
+    )
+
+
+def aluminum_form(openings, rooms):
+    data = {'room_count': rooms}
+    for i in range(rooms):
+        items = range(i, openings, rooms)
+        data[f'room_name_{i}'] = f'Floor {i}'
+        data[f'item_count_{i}'] = len(items)
+        for j, n in enumerate(items):
+            prefix = f'{i}_{j}'
+            data.update({
+                f'item_type_{prefix}': 'window' if n % 4 else 'door',
+                f'subtype_{prefix}': 'sliding',
+                f'aluminum_type_{prefix}': '7000' if n % 4 else '2200',
+                f'glass_type_{prefix}': 'transparent',
+                f'number_of_sashs_{prefix}': 2,
+                f'height_left_{prefix}': 100 + n % 150, f'height_middle_{prefix}': 100 + n % 150,
+                f'height_right_{prefix}': 100 + n % 150,
+                f'width_top_{prefix}': 80 + n % 200, f'width_middle_{prefix}': 80 + n % 200,
+                f'width_bottom_{prefix}': 80 + n % 200,
+            })
+    return data
+
+
+def bench_ingest(out):
+    """add_aluminum_item: database round trips and time per form size, up to the form field limit."""
+    project = scratch_project('aluminum')
+    for openings in (60, 600, 1800):
+        rooms = parse_aluminum_post(aluminum_form(openings, rooms=40), {})
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            ingest_aluminum_items(project, rooms)
+            seconds = time.perf_counter() - started
+        # One INSERT per table where the backend allows it; SQLite splits every 999 parameters
+        inserts = [query['sql'].split()[2] for query in queries if query['sql'].startswith('INSERT')]
+        out(f"{openings:>6} openings: {len(queries):>3} queries, {len(inserts)} INSERTs into "
+            f"{len(set(inserts))} tables, {seconds:.2f} s")
+
+
+def bench_cutting(out):
+    """plan_cuts: 6 m bars for 20k frame and sash pieces, against ceil(total length / 600)."""
+    rng = random.Random(1)
+    roles = [('frame', 'top'), ('frame', 'bottom'), ('frame', 'side'),
+             ('sash', 'top_bottom'), ('sash', 'handle_side'), ('sash', 'side')]
+    pieces = []
+    for n in range(20000):
+        kind, role = roles[n % len(roles)]
+        pieces.append({
+            'aluminum_type': rng.choice(['1700', '7000', '7300', '9000', '9200']),
+            'kind': kind, 'role': role, 'length': rng.randint(4000, 25000) / 100, 'item_number': f'W-{n}',
+        })
+
+    started = time.perf_counter()
+    plans = plan_cuts(pieces)
+    seconds = time.perf_counter() - started
+
+    bars = sum(plan['bar_count'] for plan in plans)
+    estimate = sum(ceil(plan['total_length'] / BAR_LENGTH) for plan in plans)
+    out(f"{len(pieces)} pieces in {len(plans)} groups: {bars} bars ({estimate} by length alone), {seconds:.2f} s")
+
+
+def bench_nesting(out):
+    """nest_glass: stock sheets for 5000 panes of three glass types, against ceil(pane area / sheet area)."""
+    rng = random.Random(1)
+    panes = [
+        {'glass_id': k, 'item': f'Window {k}', 'glass_type': rng.choice(['transparent', 'anti_sun', 'shadowed']),
+         'width': rng.randint(30, 160), 'height': rng.randint(40, 200)}
+        for k in range(5000)
+    ]
+
+    started = time.perf_counter()
+    plans = nest_glass(panes)
+    seconds = time.perf_counter() - started
+
+    for plan in plans:
+        naive = ceil(plan['pane_area'] / (plan['sheet_width'] * plan['sheet_height'] / 10000))
+        out(f"{plan['glass_type']:>12}: {plan['pane_count']} panes on {plan['sheet_count']} sheets "
+            f"({naive} by area alone), {plan['waste_percent']}% waste")
+    out(f"{len(panes)} panes in {seconds:.2f} s")
+
+
+def bench_drywall(out):
+    """wall_materials_batch against calculate_wall_materials, one wall at a time, on 50k walls."""
+    rng = random.Random(1)
+    room = Room(name='Floor 1')
+    walls = [
+        Wall(
+            id=n, room=room, width=Decimal(rng.randint(5000, 120000)) / 100,
+            height=Decimal(rng.randint(20000, 60000)) / 100, drywall_type='white', stud_thickness='70',
+            number_of_layers=rng.choice([1, 2]), double_sided=rng.choice([True, False]),
+            board_length=Decimal(rng.choice(['2.0', '2.6', '3.0'])),
+        )
+        for n in range(50000)
+    ]
+    # What a values(*WALL_FIELDS) query hands the batch calculator
+    rows = [
+        {'id': wall.id, 'room__name': room.name, 'width': wall.width, 'height': wall.height,
+         'drywall_type': wall.drywall_type, 'stud_thickness': wall.stud_thickness,
+         'number_of_layers': wall.number_of_layers, 'double_sided': wall.double_sided,
+         'board_length': wall.board_length}
+        for wall in walls
+    ]
+
+    started = time.perf_counter()
+    single = [calculate_wall_materials(wall) for wall in walls]
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = wall_materials_batch(rows)
+    batch_seconds = time.perf_counter() - started
+
+    out(f"{len(walls)} walls: {single_seconds:.2f} s one at a time, {batch_seconds:.2f} s batched, "
+        f"{'same' if batch == single else 'DIFFERENT'} results")
+
+
+def bench_layout(out):
+    """layout_boards: boards for 5000 walls of one project, against the per-wall estimate."""
+    rng = random.Random(1)
+    surfaces = []
+    for n in range(5000):
+        width, height = rng.randint(50, 1200), rng.randint(200, 600)
+        board_length = rng.choice([2.0, 2.6, 3.0])
+        copies = rng.choice([1, 2, 4])
+        area = width / 100 * height / 100
+        surfaces.append({
+            'item': f'Wall {n + 1}', 'kind': 'wall', 'room_id': n // 20, 'room': f'Room {n // 20}',
+            'drywall_type': rng.choice(['White', 'Pink (Fire-Resistant)']), 'stud_thickness': '70',
+            'board_length': board_length, 'width': width, 'height': height, 'area': area, 'copies': copies,
+            'estimate': ceil(area / (1.2 * board_length)) * copies,
+        })
+
+    started = time.perf_counter()
+    plans = layout_boards(surfaces)
+    seconds = time.perf_counter() - started
+
+    boards = sum(plan['board_count'] for plan in plans)
+    estimate = sum(plan['estimate'] for plan in plans)
+    waste = sum(plan['board_area'] - plan['piece_area'] for plan in plans) / sum(plan['board_area'] for plan in plans)
+    out(f"{len(surfaces)} walls: {boards} boards ({estimate} estimated per wall), "
+        f"{waste * 100:.1f}% waste, {seconds:.2f} s")
+
+
+def bench_pdf(out):
+    """render_pdf: a 10k-row materials table into an in-memory buffer."""
+    rows = [[f'Window W-{n}', 'Room ' + str(n // 40), f'{n % 300}.5 cm', n % 9, 'חלון הזזה']
+            for n in range(10000)]
+
+    started = time.perf_counter()
+    stream = render_pdf('Benchmark', [('Frames', ['Item', 'Room', 'Length', 'Qty', 'Note'], rows)])
+    seconds = time.perf_counter() - started
+
+    pdf = stream.read()
+    out(f"{len(rows)} rows: {pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages')} pages, "
+        f"{len(pdf) // 1024} KB, {seconds:.2f} s")
+
+
+def bench_token(out):
+    """clock_in_api: queries per clock-in with the token and its user read per request, and from token_user."""
+    workers = 200
+    tokens = [
+        Token.objects.create(user=CustomUser.objects.create_user(username=f'benchmark-worker-{n}', user_type='worker'))
+        for n in range(workers * 3)
+    ]
+    before, cold, warm = tokens[:workers], tokens[workers:2 * workers], tokens[2 * workers:]
+
+    def run(tokens, clock):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for token in tokens:
+                clock(token.key)
+            seconds = time.perf_counter() - started
+        return len(queries) / len(tokens), seconds
+
+    def read_per_request(key):
+        # What clock_in_api did before token_user: the token, then token.user
+        clock_in(Token.objects.get(key=key).user.id)
+
+    factory = RequestFactory()
+
+    def view(key):
+        response = clock_in_api(factory.post('/api/clock-in/', {'token': key}))
+        assert response.status_code == 200, response.content
+
+    for token in cold:
+        forget_token(token.key)
+    for token in warm:
+        token_user(token.key)
+
+    for label, tokens, clock in (('token read per request', before, read_per_request),
+                                 ('token_user, cold', cold, view), ('token_user, warm', warm, view)):
+        per_call, seconds = run(tokens, clock)
+        out(f"{label:>22}: {per_call:.0f} queries per clock-in, {workers} clock-ins in {seconds:.2f} s")
+
+
+BENCHMARKS = {
+    'ingest': bench_ingest,
+    'cutting': bench_cutting,
+    'nesting': bench_nesting,
+    'drywall': bench_drywall,
+    'layout': bench_layout,
+    'pdf': bench_pdf,
+    'token': bench_token,
+}
+
+
+class Command(BaseCommand):
+    help = 'Time the batch engines on generated data; database writes are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"❌ Unknown benchmark {', '.join(sorted(unknown))}")
+
+        for name in options['names'] or BENCHMARKS:
+            self.stdout.write(self.style.SUCCESS(f"✅ {name}: {BENCHMARKS[name].__doc__}"))
+            with transaction.atomic():
+                BENCHMARKS[name](self.stdout.write)
+                transaction.set_rollback(True)
@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+from accounts.models import Company
+from accounts.rollup import company_materials, write_rollup_csv
+
+
+class Command(BaseCommand):
+    help = "Aluminum, glass and drywall totals across every project of a company, as CSV or JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', help='Company code')
+        parser.add_argument('--since', help='Only projects created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--format', choices=('csv', 'json'), default='csv')
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(code=options['company']).first()
+        if company is None:
+            raise CommandError(f"❌ No company with code {options['company']}")
+
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("❌ --since must be YYYY-MM-DD")
+
+        rollup = company_materials(company, since)
+
+        stream = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            if options['format'] == 'json':
+                stream.write(json.dumps(rollup, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2))
+            else:
+                write_rollup_csv(rollup, stream)
+        finally:
+            if options['output']:
+                stream.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Materials of {rollup['project_count']} projects written to {options['output']}."
+            ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.clock import attendance_month_rows
+from accounts.models import AttendanceMonth
+
+
+# Run once after the migration that adds AttendanceMonth (makemigrations accounts, then migrate)
+class Command(BaseCommand):
+    help = 'Rebuild the AttendanceMonth totals from the attendance days and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only this worker id')
+        parser.add_argument('--check', action='store_true', help='Only verify, do not write')
+
+    def handle(self, *args, **options):
+        user_ids = [options['user']] if options['user'] else None
+        rows = attendance_month_rows(user_ids)
+
+        stored_months = AttendanceMonth.objects.all()
+        if user_ids:
+            stored_months = stored_months.filter(user_id__in=user_ids)
+        stored = {(m.user_id, m.year, m.month): (m.total_days, m.total_hours) for m in stored_months}
+
+        mismatches = 0
+        for row in rows:
+            key = (row.user_id, row.year, row.month)
+            totals = stored.pop(key, None)
+            if totals is None or totals[0] != row.total_days or round(totals[1], 2) != round(row.total_hours, 2):
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ Worker {row.user_id} {row.month}/{row.year}: stored {totals or 'missing'}, "
+                    f"counted {(row.total_days, round(row.total_hours, 2))}"
+                ))
+        # Months left over have no completed day any more
+        mismatches += len(stored)
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS(f"✅ Checked attendance months, {mismatches} out of date."))
+            return
+
+        with transaction.atomic():
+            stored_months.delete()
+            AttendanceMonth.objects.bulk_create(rows)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(rows)} attendance months rebuilt, {mismatches} were out of date."
+        ))
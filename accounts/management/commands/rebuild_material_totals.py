@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from accounts.material_totals import (
+    ALUMINUM_FIELDS, DRYWALL_FIELDS,
+    compute_aluminum_totals, compute_drywall_totals,
+)
+from accounts.models import Project, AluminumMaterial, DrywallMaterial
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the AluminumMaterial and DrywallMaterial project totals and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, help='Only this project id')
+        parser.add_argument('--check', action='store_true', help='Only verify, do not write')
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by('id')
+        if options['project']:
+            projects = projects.filter(id=options['project'])
+
+        summaries = (
+            (AluminumMaterial, ALUMINUM_FIELDS, compute_aluminum_totals),
+            (DrywallMaterial, DRYWALL_FIELDS, compute_drywall_totals),
+        )
+
+        mismatches = 0
+        for project in projects:
+            for model, fields, compute in summaries:
+                totals = compute(project.id)
+                stored = model.objects.filter(project=project).first()
+
+                if stored is None:
+                    drift = ['missing']
+                else:
+                    drift = [
+                        f"{field} {getattr(stored, field)} != {totals[field]}"
+                        for field in fields if getattr(stored, field) != totals[field]
+                    ]
+
+                if drift:
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"⚠️ {model.__name__} for project {project.project_number}: {', '.join(drift)}"
+                    ))
+
+                if not options['check']:
+                    model.objects.update_or_create(project=project, defaults=totals)
+
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS(f"✅ Checked material totals, {mismatches} out of date."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Material totals rebuilt, {mismatches} were out of date."))
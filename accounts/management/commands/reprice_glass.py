@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from accounts.glass_pricing import reprice_project_glass
+from accounts.models import Project
+
+
+class Command(BaseCommand):
+    help = "Re-price every glass pane of a project from its contractor's current glass prices"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, help='Only this project id')
+        parser.add_argument('--contractor', help='Only projects of this contractor username')
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by('id')
+        if options['project']:
+            projects = projects.filter(id=options['project'])
+        if options['contractor']:
+            projects = projects.filter(contractor__username=options['contractor'])
+
+        total = 0
+        for project in projects:
+            updated = reprice_project_glass(project)
+            total += updated
+            if updated:
+                self.stdout.write(f"Project {project.project_number}: {updated} panes re-priced")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Glass re-priced, {total} panes updated."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import Company
+from accounts.payroll_pdfs import company_worker_logs, store_worker_logs
+from accounts.zip_stream import EXPORT_WORKERS
+
+
+class Command(BaseCommand):
+    help = "Draw the log PDF of every worker of a company into contractors/<username>/workers_log"
+
+    def add_arguments(self, parser):
+        parser.add_argument('company', help='Company code')
+        parser.add_argument('--year', type=int, help='With --month, only workers with a report for that month')
+        parser.add_argument('--month', type=int, choices=range(1, 13), metavar='1-12')
+        parser.add_argument('--workers', type=int, default=EXPORT_WORKERS, help='Processes drawing PDFs')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(code=options['company']).select_related('contractor').first()
+        if company is None:
+            raise CommandError(f"❌ No company with code {options['company']}")
+        if bool(options['year']) != bool(options['month']):
+            raise CommandError("❌ --year and --month go together")
+
+        logs = company_worker_logs(company, company.contractor.username, options['year'], options['month'])
+        drawn = store_worker_logs(logs, max(1, options['workers']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(logs)} worker logs in contractors/{company.contractor.username}/workers_log "
+            f"({drawn} drawn, {len(logs) - drawn} already up to date)."
+        ))
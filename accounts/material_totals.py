@@ -0,0 +1,155 @@
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone
+
+from .drywall import calculate_wall_materials, project_drywall_materials
+from .materials import OPENING_SUBTYPES, load_aluminum_items, load_opening
+from .models import AluminumMaterial, DrywallMaterial, Wall, Ceiling
+
+
+ZERO = Decimal('0')
+
+# AluminumMaterial lengths are kept in cm, like every frame and sash row
+ALUMINUM_FIELDS = (
+    'frame_top_bottom_length',
+    'frame_side_length',
+    'sash_top_bottom_length',
+    'sash_handle_side_length',
+    'sash_side_length',
+)
+
+DRYWALL_FIELDS = ('total_board_count', 'total_stud_length', 'total_track_length')
+
+STUD_LENGTH = Decimal('3')  # studs are bought as 3 m pieces
+
+
+def opening_totals(subtype, frame, sashes):
+    """
+    What one window or door adds to its project's AluminumMaterial row,
+    using the same frame and handle-side rules as sliding_window_materials.
+    """
+    totals = dict.fromkeys(ALUMINUM_FIELDS, ZERO)
+    if subtype not in OPENING_SUBTYPES:
+        return totals
+
+    totals['frame_top_bottom_length'] = (frame['top'] or ZERO) + (frame['bottom'] or ZERO)
+    totals['frame_side_length'] = (frame['side'] or ZERO) * 2
+
+    sash_count = len(sashes)
+    for i, sash in enumerate(sashes):
+        side = sash['side'] or ZERO
+        totals['sash_top_bottom_length'] += (sash['top'] or ZERO) + (sash['bottom'] or ZERO)
+        if subtype == 'sliding' and 0 < i < sash_count - 1:
+            # Middle sliding sash: two interlock sides, no handle side
+            totals['sash_side_length'] += side * 2
+        else:
+            totals['sash_handle_side_length'] += side
+            totals['sash_side_length'] += side
+
+    return totals
+
+
+def drywall_item_totals(item):
+    """What one Wall or Ceiling adds to its project's DrywallMaterial row."""
+    return _drywall_totals(calculate_wall_materials(item))
+
+
+def _drywall_totals(data):
+    return {
+        'total_board_count': data['gypsum_boards'],
+        'total_stud_length': data['stud_count'] * STUD_LENGTH,
+        'total_track_length': Decimal(str(data['track_length'])),
+    }
+
+
+def compute_aluminum_totals(project_id):
+    totals = dict.fromkeys(ALUMINUM_FIELDS, ZERO)
+    for item in load_aluminum_items(project_id):
+        for field, value in opening_totals(item['item_subtype'], item['frame'], item['sashes']).items():
+            totals[field] += value
+    return totals
+
+
+def compute_drywall_totals(project_id):
+    totals = {'total_board_count': 0, 'total_stud_length': ZERO, 'total_track_length': ZERO}
+    for data in project_drywall_materials(project_id):
+        for field, value in _drywall_totals(data).items():
+            totals[field] += value
+    return totals
+
+
+def rebuild_aluminum_totals(project_id):
+    summary, _ = AluminumMaterial.objects.update_or_create(
+        project_id=project_id, defaults=compute_aluminum_totals(project_id)
+    )
+    return summary
+
+
+def rebuild_drywall_totals(project_id):
+    summary, _ = DrywallMaterial.objects.update_or_create(
+        project_id=project_id, defaults=compute_drywall_totals(project_id)
+    )
+    return summary
+
+
+def get_aluminum_totals(project_id):
+    """The project's AluminumMaterial row, built on first use."""
+    return (AluminumMaterial.objects.filter(project_id=project_id).first()
+            or rebuild_aluminum_totals(project_id))
+
+
+def get_drywall_totals(project_id):
+    """The project's DrywallMaterial row, built on first use."""
+    return (DrywallMaterial.objects.filter(project_id=project_id).first()
+            or rebuild_drywall_totals(project_id))
+
+
+# --- Incremental updates (driven by accounts.signals) ---
+
+def item_state(key):
+    """
+    (project_id, totals) that one tracked item currently contributes,
+    or (None, {}) if it's gone or not attached to a project.
+    ``key`` is (kind, pk) with kind window, door, wall or ceiling.
+    """
+    kind, pk = key
+
+    if kind in ('window', 'door'):
+        item = load_opening(kind, pk)
+        if item is None or item['project_id'] is None:
+            return None, {}
+        return item['project_id'], opening_totals(item['item_subtype'], item['frame'], item['sashes'])
+
+    model = Wall if kind == 'wall' else Ceiling
+    item = model.objects.select_related('room').filter(pk=pk).first()
+    if item is None:
+        return None, {}
+    return item.room.project_id, drywall_item_totals(item)
+
+
+def apply_item_change(kind, before, after):
+    """
+    Move a project summary row from an item's ``before`` state to its
+    ``after`` state with one UPDATE ... SET field = field + delta.
+
+    Projects without a summary row are left alone; get_*_totals() builds
+    the row from scratch the first time it's read.
+    """
+    if kind in ('window', 'door'):
+        model, fields = AluminumMaterial, ALUMINUM_FIELDS
+    else:
+        model, fields = DrywallMaterial, DRYWALL_FIELDS
+
+    deltas = {}
+    for sign, (project_id, totals) in ((-1, before), (1, after)):
+        if project_id is None:
+            continue
+        delta = deltas.setdefault(project_id, dict.fromkeys(fields, 0))
+        for field in fields:
+            delta[field] += sign * totals[field]
+
+    for project_id, delta in deltas.items():
+        changed = {field: F(field) + value for field, value in delta.items() if value}
+        if changed:
+            model.objects.filter(project_id=project_id).update(last_calculated=timezone.now(), **changed)
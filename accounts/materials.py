@@ -0,0 +1,163 @@
+from collections import defaultdict
+from math import ceil
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+
+from .cutting import BAR_LENGTH
+from .models import Window, WindowSash, Door, DoorSash
+
+
+# Order the materials tables list openings in
+OPENING_SUBTYPES = ('sliding', 'multi_bolt')
+
+OPENING_KINDS = {
+    # item_type: model, sash model, number field, subtype field, frame relation
+    'window': (Window, WindowSash, 'window_number', 'window_type', 'window_frame'),
+    'door': (Door, DoorSash, 'door_number', 'door_type', 'door_frame'),
+}
+
+
+def _load_openings(item_type, item_filters, sash_filters):
+    model, sash_model, number_field, subtype_field, frame_rel = OPENING_KINDS[item_type]
+    fk = f'{item_type}_id'
+
+    sashes = defaultdict(list)
+    sash_rows = sash_model.objects.filter(**sash_filters).order_by(fk, 'id').values(fk, 'side', 'top', 'bottom')
+    for sash in sash_rows:
+        sashes[sash[fk]].append(sash)
+
+    # Reverse one-to-one in values() is a LEFT JOIN, so frameless items stay
+    rows = model.objects.filter(**item_filters).order_by('id').values(
+        'id', 'room__project_id', number_field, subtype_field, 'aluminum_type',
+        f'{frame_rel}__top', f'{frame_rel}__bottom', f'{frame_rel}__side',
+    )
+
+    return [
+        {
+            "id": row['id'],
+            "project_id": row['room__project_id'],
+            "item_type": item_type,
+            "item_subtype": row[subtype_field],
+            "item_number": row[number_field],
+            "aluminum_type": row['aluminum_type'],
+            "frame": {
+                "top": row[f'{frame_rel}__top'],
+                "bottom": row[f'{frame_rel}__bottom'],
+                "side": row[f'{frame_rel}__side'],
+            },
+            "sashes": sashes.get(row['id'], []),
+        }
+        for row in rows
+    ]
+
+
+def load_aluminum_items(project_id):
+    """
+    All sliding and multi-bolt windows and doors of a project with their
+    frame and sashes, as flat dicts, in a fixed four queries: one items+frame
+    join and one sash listing per opening kind.
+
+    Items come back sliding windows, multi-bolt windows, sliding doors,
+    multi-bolt doors, each group in creation order.
+    """
+    items = []
+
+    for item_type, (_, _, _, subtype_field, _) in OPENING_KINDS.items():
+        kind_items = _load_openings(
+            item_type,
+            {'room__project_id': project_id, f'{subtype_field}__in': OPENING_SUBTYPES},
+            {f'{item_type}__room__project_id': project_id},
+        )
+        kind_items.sort(key=lambda item: OPENING_SUBTYPES.index(item["item_subtype"]))
+        items.extend(kind_items)
+
+    return items
+
+
+def load_opening(item_type, opening_id):
+    """One window or door in the load_aluminum_items() shape, or None if it's gone."""
+    items = _load_openings(item_type, {'id': opening_id}, {f'{item_type}_id': opening_id})
+    return items[0] if items else None
+
+
+def _end_sashes(sash_model, fk):
+    # First and last sash of its opening by id, the same order
+    # sliding_window_materials numbers them in
+    siblings = sash_model.objects.filter(**{fk: OuterRef(fk)})
+    return (Q(id=Subquery(siblings.order_by('id').values('id')[:1]))
+            | Q(id=Subquery(siblings.order_by('-id').values('id')[:1])))
+
+
+def aluminum_profile_totals(project_id):
+    """
+    Frame and sash lengths (cm) and 6 m bar counts per aluminum type and
+    subtype, summed in the database: one GROUP BY over the items+frame join
+    and one over the sashes, per opening kind. No individual rows are loaded.
+
+    Bars here are the plain length / 6 m lower bound; plan_cuts() packs
+    the actual pieces when the rows are loaded anyway.
+    """
+    return projects_profile_totals([project_id])
+
+
+def projects_profile_totals(project_ids):
+    """aluminum_profile_totals() summed over several projects in the same queries."""
+    groups = {}
+
+    def group(aluminum_type, subtype):
+        return groups.setdefault((aluminum_type, subtype), {
+            "aluminum_type": aluminum_type,
+            "item_subtype": subtype,
+            "openings": 0,
+            "sashes": 0,
+            "frame_totals": {"top": 0, "bottom": 0, "side": 0},
+            "sash_totals": {"top_bottom": 0, "handle_side": 0, "side": 0},
+        })
+
+    for item_type, (model, sash_model, _, subtype_field, frame_rel) in OPENING_KINDS.items():
+        frame_rows = model.objects.filter(
+            room__project_id__in=project_ids, **{f'{subtype_field}__in': OPENING_SUBTYPES}
+        ).values('aluminum_type', subtype_field).annotate(
+            openings=Count('id'),
+            top_length=Sum(f'{frame_rel}__top'),
+            bottom_length=Sum(f'{frame_rel}__bottom'),
+            side_length=Sum(f'{frame_rel}__side'),
+        ).order_by()
+
+        for row in frame_rows:
+            totals = group(row['aluminum_type'], row[subtype_field])
+            totals["openings"] += row['openings']
+            totals["frame_totals"]["top"] += float(row['top_length'] or 0)
+            totals["frame_totals"]["bottom"] += float(row['bottom_length'] or 0)
+            totals["frame_totals"]["side"] += float(row['side_length'] or 0) * 2  # both sides
+
+        # Middle sashes of a sliding opening take two interlock sides and no
+        # handle side; every other sash takes one of each
+        middle = Q(**{f'{item_type}__{subtype_field}': 'sliding'}) & ~_end_sashes(sash_model, item_type)
+        sash_rows = sash_model.objects.filter(**{
+            f'{item_type}__room__project_id__in': project_ids,
+            f'{item_type}__{subtype_field}__in': OPENING_SUBTYPES,
+        }).values(f'{item_type}__aluminum_type', f'{item_type}__{subtype_field}').annotate(
+            sashes=Count('id'),
+            top_bottom_length=Sum(F('top') + F('bottom')),
+            side_length=Sum('side'),
+            middle_side_length=Sum('side', filter=middle),
+        ).order_by()
+
+        for row in sash_rows:
+            totals = group(row[f'{item_type}__aluminum_type'], row[f'{item_type}__{subtype_field}'])
+            side = float(row['side_length'] or 0)
+            middle_side = float(row['middle_side_length'] or 0)
+            totals["sashes"] += row['sashes']
+            totals["sash_totals"]["top_bottom"] += float(row['top_bottom_length'] or 0)
+            totals["sash_totals"]["handle_side"] += side - middle_side
+            totals["sash_totals"]["side"] += side + middle_side
+
+    results = sorted(
+        groups.values(),
+        key=lambda g: (str(g["aluminum_type"]), OPENING_SUBTYPES.index(g["item_subtype"])),
+    )
+    for totals in results:
+        totals["frame_bars"] = {role: ceil(round(length, 2) / BAR_LENGTH) for role, length in totals["frame_totals"].items()}
+        totals["sash_bars"] = {role: ceil(round(length, 2) / BAR_LENGTH) for role, length in totals["sash_totals"].items()}
+    return results
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import Project
+
+
+# Results live under (project, version, kind). The version is the project's
+# materials_version column: a change to any room, opening, wall, ceiling or
+# glass of the project bumps it in the same transaction, so every process
+# sees the new version together with the change, old entries are simply
+# never read again and expire on their own.
+MATERIALS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def project_version(project_id):
+    """The project's materials_version, or None when there is no such project."""
+    return Project.objects.filter(id=project_id).values_list('materials_version', flat=True).first()
+
+
+def touch_project(*project_ids):
+    """Mark the materials results of these projects stale, in one UPDATE."""
+    project_ids = {project_id for project_id in project_ids if project_id is not None}
+    if project_ids:
+        Project.objects.filter(id__in=project_ids).update(materials_version=F('materials_version') + 1)
+
+
+def cached_materials(project_id, kind, compute):
+    """
+    compute() for this project, cached until the project next changes. The
+    version is read before compute() runs, so data changed in between is
+    at worst cached under a version that is already out of date.
+    """
+    version = project_version(project_id)
+    if version is None:
+        return compute()
+
+    key = f"materials:{project_id}:{version}:{kind}"
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, MATERIALS_CACHE_TIMEOUT)
+    return result
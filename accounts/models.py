@@ -53,7 +53,7 @@ class Company(models.Model):
 
 class Attendance(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    date = models.DateField(default=timezone.localdate)  # clock.attendance_date(); set explicitly for synced events
     clock_in = models.DateTimeField(null=True, blank=True)
     clock_out = models.DateTimeField(null=True, blank=True)
     total_hours = models.FloatField(default=0)
@@ -63,9 +63,48 @@ class Attendance(models.Model):
     clock_out_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     clock_out_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
 
+    class Meta:
+        unique_together = ('user', 'date')  # one row per worker per day, see accounts/clock.py
+
     def __str__(self):
         return f"{self.user.username} - {self.date}"
 
+class AttendanceMonth(models.Model):
+    # Completed days and hours per worker and month, added to at every clock-out (accounts/clock.py)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='attendance_months')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    total_days = models.IntegerField(default=0)
+    total_hours = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'year', 'month')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month}/{self.year}"
+
+class ClockEvent(models.Model):
+    # A clock-in/out the worker app queued offline, kept so a resent batch is applied once
+    KINDS = [
+        ('clock_in', 'Clock in'),
+        ('clock_out', 'Clock out'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='clock_events')
+    key = models.CharField(max_length=64)  # idempotency key made by the app
+    kind = models.CharField(max_length=10, choices=KINDS)
+    device_time = models.DateTimeField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    applied = models.BooleanField(default=False)  # False when it was rejected
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind} {self.device_time}"
+
 class PasswordResetCode(models.Model):
     user = models.ForeignKey("CustomUser", on_delete=models.CASCADE)
     code = models.CharField(max_length=6)
@@ -118,6 +157,11 @@ class Project(models.Model):
     project_type = models.CharField(max_length=20, choices=PROJECT_TYPES)
     blueprints = models.FileField(upload_to='blueprints/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped with every change to the project's rooms, openings, glass, walls
+    # and ceilings; keys the cached materials results (accounts/materials_cache.py)
+    materials_version = models.PositiveIntegerField(default=0, editable=False)
+    # When the aluminum was cut and the yard updated (record_cuts); a project is cut once
+    cuts_recorded_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     contractor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -132,6 +176,15 @@ class Project(models.Model):
         limit_choices_to={'user_type': 'worker'}
     )
 
+    def save(self, *args, **kwargs):
+        # Edits must not write back a materials_version read before a later bump
+        if self.pk and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'materials_version'
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Project {self.project_number}"
 
@@ -159,6 +212,9 @@ class Glass(models.Model):
     height = models.DecimalField(max_digits=7, decimal_places=2)
     width = models.DecimalField(max_digits=7, decimal_places=2)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Set by add_aluminum_item's bulk insert to read the new panes back on MySQL, which
+    # returns no ids from a bulk INSERT; a pane has no project or other key to find it by
+    ingest_batch = models.CharField(max_length=32, blank=True, null=True, db_index=True)
 
     def save(self, *args, **kwargs):
         if self.price is None:
@@ -397,11 +453,11 @@ class DrywallMaterial(models.Model):
 class AluminumMaterial(models.Model):
     project = models.OneToOneField('Project', on_delete=models.CASCADE, related_name='aluminum_material')
 
-    # Frame totals (meters)
+    # Frame totals (cm, kept up to date by accounts.signals)
     frame_top_bottom_length = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     frame_side_length = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
 
-    # Sash totals (meters)
+    # Sash totals (cm)
     sash_side_length = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     sash_top_bottom_length = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     sash_handle_side_length = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
@@ -411,6 +467,30 @@ class AluminumMaterial(models.Model):
     def __str__(self):
         return f"Aluminum Material Summary for Project {self.project.project_number}"
 
+class Remnant(models.Model):
+    # Offcut left in the company's yard, used before opening new bars
+    KIND_CHOICES = [
+        ('frame', 'Frame'),
+        ('sash', 'Sash'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='remnants')
+    aluminum_type = models.CharField(max_length=10)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    role = models.CharField(max_length=20)  # same roles as the cutting plan
+    length = models.DecimalField(max_digits=7, decimal_places=2)  # cm
+    source_project = models.ForeignKey('Project', on_delete=models.SET_NULL, null=True, blank=True, related_name='remnants')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Best-fit lookups are range queries on length within one profile
+            models.Index(fields=['company', 'aluminum_type', 'kind', 'role', 'length']),
+        ]
+
+    def __str__(self):
+        return f"{self.aluminum_type} {self.kind} {self.role} remnant {self.length} cm"
+
 class AluminumProfile(models.Model):
     PROFILE_TYPE_CHOICES = [
         ('1700', '1700'), ('7000', '7000'), ('7300', '7300'),
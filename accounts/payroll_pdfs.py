@@ -0,0 +1,91 @@
+import os
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+
+from .models import CustomUser, MonthlyReport
+from .pdf_cache import pdf_digest, stored_pdf, stored_pdf_path
+from .pdf_tables import render_pdf
+from .zip_stream import EXPORT_WORKERS, worker_pool
+
+
+FOLDER = 'workers_log'
+TITLE = "Worker Log Summary"
+HEADERS = ["Year", "Month", "Days", "Hours", "Salary", "Payroll"]
+
+REPORT_FIELDS = ('worker_id', 'year', 'month', 'total_days', 'total_hours', 'payroll_file')
+
+
+def worker_log(worker, reports, company_name, contractor_username):
+    """
+    (file name, digest, draw) of a worker's log PDF: one row per monthly
+    report (REPORT_FIELDS dicts, oldest first) with the salary at the
+    worker's current wage.
+    """
+    rows = []
+    for report in reports:
+        salary = Decimal(str(report['total_hours'])) * worker.hourly_wage
+        rows.append([
+            report['year'],
+            report['month'],
+            report['total_days'],
+            f"{report['total_hours']:.2f}",
+            f"{salary:.2f} ₪",
+            "✔" if report['payroll_file'] else "❌",
+        ])
+
+    lines = [
+        f"Company: {company_name}",
+        f"Contractor: {contractor_username}",
+        f"Worker: {worker.username}",
+    ]
+
+    # The rows are small, so they are hashed themselves
+    return (
+        f"{worker.username}_log.pdf",
+        pdf_digest('worker_log', worker.id, lines, rows),
+        partial(render_pdf, TITLE, [(None, HEADERS, rows)], lines),
+    )
+
+
+def company_worker_logs(company, contractor_username, year=None, month=None):
+    """
+    The log PDF of every worker of ``company`` as (worker, file name, path,
+    make) — make() draws the file at path if it isn't there yet and
+    returns it. Reports and wages come in two queries. With ``year`` and
+    ``month`` only workers with a report for that month are included.
+    """
+    workers = CustomUser.objects.filter(company=company, user_type='worker').order_by('username').only(
+        'id', 'username', 'hourly_wage'
+    )
+
+    reports = defaultdict(list)
+    for report in MonthlyReport.objects.filter(
+        worker__company=company, worker__user_type='worker'
+    ).order_by('year', 'month').values(*REPORT_FIELDS):
+        reports[report['worker_id']].append(report)
+
+    logs = []
+    for worker in workers:
+        worker_reports = reports[worker.id]
+        if year and month and not any(r['year'] == year and r['month'] == month for r in worker_reports):
+            continue
+
+        filename, digest, draw = worker_log(worker, worker_reports, company.name, contractor_username)
+        logs.append((
+            worker,
+            filename,
+            stored_pdf_path(contractor_username, FOLDER, filename, digest),
+            partial(stored_pdf, contractor_username, FOLDER, filename, digest, draw),
+        ))
+    return logs
+
+
+def store_worker_logs(logs, workers=EXPORT_WORKERS):
+    """Draw the company_worker_logs() PDFs not stored yet in a process pool; returns how many were drawn."""
+    missing = [make for _, _, path, make in logs if not os.path.exists(path)]
+    if missing:
+        with worker_pool(min(workers, len(missing), os.cpu_count() or 1)) as pool:
+            for future in [pool.submit(make) for make in missing]:
+                future.result()
+    return len(missing)
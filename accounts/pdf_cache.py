@@ -0,0 +1,88 @@
+import glob
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from .pdf_tables import RENDER_VERSION
+
+
+DIGEST_LENGTH = 20
+
+
+def pdf_digest(*parts):
+    """Hash of everything a PDF is drawn from, plus the renderer's layout version."""
+    digest = hashlib.sha256()
+    for part in (RENDER_VERSION,) + parts:
+        digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()[:DIGEST_LENGTH]
+
+
+def stored_pdf_path(username, folder, filename, digest):
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(settings.BASE_DIR, 'contractors', username, folder, f'{stem}.{digest}{ext}')
+
+
+def _store_pdf(path, render):
+    # Render next to the final name and move it in, so no reader sees half a file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}.{threading.get_ident()}.part'
+    with open(partial, 'w+b') as stream:
+        render(stream)
+    os.replace(partial, path)
+
+    # Older versions of the same export are never served again
+    stem = path.rsplit('.', 2)[0]
+    for old in glob.glob(f'{glob.escape(stem)}.{"[0-9a-f]" * DIGEST_LENGTH}.pdf'):
+        if old != path:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+
+
+def stored_pdf(username, folder, filename, digest, render):
+    """Path of the stored PDF for ``digest``, drawn with render(stream) first if there is none."""
+    path = stored_pdf_path(username, folder, filename, digest)
+    if not os.path.exists(path):
+        _store_pdf(path, render)
+    return path
+
+
+def cached_pdf_response(request, username, folder, filename, digest, render, as_attachment=False):
+    """
+    Serve the PDF for ``digest`` from contractors/<username>/<folder>,
+    calling render(stream) to draw and store it only when no file for that
+    digest exists yet.
+
+    The digest is the ETag, so a client that already has this version gets
+    a 304 from If-None-Match (or If-Modified-Since) without a file being
+    opened. Responses are private and revalidated on every use.
+    """
+    etag = quote_etag(digest)
+    path = stored_pdf_path(username, folder, filename, digest)
+
+    try:
+        last_modified = int(os.path.getmtime(path))
+    except OSError:
+        last_modified = None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if last_modified is None:
+            _store_pdf(path, render)
+            last_modified = int(os.path.getmtime(path))
+        response = FileResponse(
+            open(path, 'rb'), content_type='application/pdf', as_attachment=as_attachment, filename=filename
+        )
+
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
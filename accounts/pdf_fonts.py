@@ -0,0 +1,48 @@
+import os
+import re
+from functools import lru_cache
+
+from bidi.algorithm import get_display
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+# DejaVu Sans has the Hebrew letters Helvetica lacks; see fonts/LICENSE_DEJAVU
+FONT_DIR = os.path.join(os.path.dirname(__file__), 'fonts')
+FONT = "DejaVuSans"
+BOLD_FONT = "DejaVuSans-Bold"
+
+_FONT_FILES = {
+    FONT: 'DejaVuSans.ttf',
+    BOLD_FONT: 'DejaVuSans-Bold.ttf',
+}
+
+# Hebrew letters, points and presentation forms
+_RTL = re.compile('[\u0590-\u05ff\ufb1d-\ufb4f]')
+
+
+def register_fonts():
+    """
+    Load the export fonts into reportlab, once per process (from
+    AccountsConfig.ready()). The parsed fonts stay registered, so every
+    PDF only subsets the glyphs it uses.
+    """
+    registered = pdfmetrics.getRegisteredFontNames()
+    for name, filename in _FONT_FILES.items():
+        if name not in registered:
+            pdfmetrics.registerFont(TTFont(name, os.path.join(FONT_DIR, filename)))
+
+
+@lru_cache(maxsize=4096)
+def _visual_order(text):
+    return get_display(text)
+
+
+def shape(text):
+    """
+    ``text`` in the order it is drawn: reportlab writes left to right, so
+    Hebrew runs are reversed by the bidi algorithm ("Side (שולב)" keeps
+    its English part as is). Text without Hebrew is returned unchanged.
+    """
+    text = str(text)
+    return _visual_order(text) if _RTL.search(text) else text
@@ -0,0 +1,154 @@
+import heapq
+import tempfile
+
+from django.http import FileResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .pdf_fonts import BOLD_FONT, FONT, shape
+
+
+# Bump when the layout changes, so PDFs stored by pdf_cache are drawn again
+RENDER_VERSION = 2
+
+FONT_SIZE = 10
+MIN_FONT_SIZE = 6  # wide tables shrink down to this before running off the page
+TITLE_SIZE = 14
+HEADING_SIZE = 12
+LINE_SIZE = 11
+
+MARGIN = 2 * cm
+CELL_PADDING = 0.3 * cm
+
+# PDFs up to this size stay in memory, bigger ones spill to a temp file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Column widths are measured on this many of the longest cells per column
+MEASURED_CELLS = 50
+
+
+class _TablePages:
+    # Page state while drawing: the cursor, the page number and a footer per page.
+    # All text of a page goes into one text object, far cheaper than a
+    # drawString() per cell on big tables.
+
+    def __init__(self, stream, title):
+        self.canvas = canvas.Canvas(stream, pagesize=A4, initialFontName=FONT)
+        self.canvas.setTitle(title)  # metadata keeps logical order
+        self.width, self.height = A4
+        self.title = title
+        self.page = 1
+        self.y = self.height - MARGIN
+        self.text_object = self.canvas.beginText()
+
+    def room_for(self, height):
+        return self.y - height >= MARGIN
+
+    def end_page(self):
+        self.text_object.setFont(FONT, 8)
+        footer = shape(f"{self.title} - page {self.page}")
+        self.text_object.setTextOrigin(self.width - MARGIN - stringWidth(footer, FONT, 8), MARGIN / 2)
+        self.text_object.textOut(footer)
+        self.canvas.drawText(self.text_object)
+        self.canvas.showPage()
+
+    def new_page(self):
+        self.end_page()
+        self.page += 1
+        self.y = self.height - MARGIN
+        self.text_object = self.canvas.beginText()
+
+    def text(self, value, font, size, gap):
+        if not self.room_for(size + gap):
+            self.new_page()
+        self.text_object.setFont(font, size)
+        self.text_object.setTextOrigin(MARGIN, self.y - size)
+        self.text_object.textOut(shape(value))
+        self.y -= size + gap
+
+    def row(self, cells, columns, font, size):
+        text_object = self.text_object
+        text_object.setFont(font, size)
+        baseline = self.y - size
+        for cell, x in zip(cells, columns):
+            text_object.setTextOrigin(x, baseline)
+            text_object.textOut(cell)
+        self.y -= size * 1.4
+
+
+def _column_layout(headers, rows, available):
+    # Natural widths at FONT_SIZE, scaled down together when the table is too wide
+    widths = []
+    for i, header in enumerate(headers):
+        longest = heapq.nlargest(MEASURED_CELLS, (row[i] for row in rows if i < len(row)), key=len)
+        widths.append(max([stringWidth(header, BOLD_FONT, FONT_SIZE)]
+                          + [stringWidth(cell, FONT, FONT_SIZE) for cell in longest]))
+
+    total = sum(widths) + CELL_PADDING * len(widths)
+    size = FONT_SIZE
+    if total > available:
+        size = max(MIN_FONT_SIZE, FONT_SIZE * available / total)
+
+    scale = size / FONT_SIZE
+    columns, x = [], MARGIN
+    for width in widths:
+        columns.append(x)
+        x += (width + CELL_PADDING) * scale
+    return columns, size
+
+
+def render_pdf(title, tables, lines=(), stream=None):
+    """
+    Draw a titled A4 document of ``tables`` into ``stream`` (a spooled
+    temporary file by default) and return the stream rewound to its start.
+
+    ``tables`` are (heading or None, headers, rows). Rows are laid out in
+    aligned columns sized to their content; a table that runs past the page
+    continues on the next one under its header row again, and every page
+    gets a numbered footer. ``lines`` are printed under the title.
+    """
+    stream = stream or tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    pages = _TablePages(stream, title)
+    available = pages.width - 2 * MARGIN
+
+    pages.text(title, BOLD_FONT, TITLE_SIZE, 0.5 * cm)
+    for line in lines:
+        pages.text(line, FONT, LINE_SIZE, 0.2 * cm)
+    if lines:
+        pages.y -= 0.3 * cm
+
+    for heading, headers, rows in tables:
+        headers = [shape(header) for header in headers]
+        rows = [["" if cell is None else shape(cell) for cell in row] for row in rows]
+        columns, size = _column_layout(headers, rows, available)
+        line_height = size * 1.4
+
+        if heading:
+            # Keep a heading on the same page as its header row and first row
+            if not pages.room_for(HEADING_SIZE + 0.3 * cm + 2 * line_height):
+                pages.new_page()
+            pages.text(heading, BOLD_FONT, HEADING_SIZE, 0.3 * cm)
+        elif not pages.room_for(2 * line_height):
+            pages.new_page()
+
+        pages.row(headers, columns, BOLD_FONT, size)
+        for row in rows:
+            if not pages.room_for(line_height):
+                pages.new_page()
+                pages.row(headers, columns, BOLD_FONT, size)
+            pages.row(row, columns, FONT, size)
+
+        pages.y -= 0.6 * cm
+
+    pages.end_page()
+    pages.canvas.save()
+
+    stream.seek(0)
+    return stream
+
+
+def pdf_response(stream, filename, as_attachment=False):
+    """Stream a render_pdf() result to the client in chunks; the buffer is closed after."""
+    return FileResponse(stream, content_type='application/pdf', as_attachment=as_attachment, filename=filename)
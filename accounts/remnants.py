@@ -0,0 +1,92 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Q
+
+from .materials_cache import touch_project
+from .models import Company, Project, Remnant
+
+
+MIN_REMNANT_LENGTH = 30  # cm; shorter offcuts go to scrap
+
+
+def project_company_id(project_id):
+    """The company of the project's contractor, or None."""
+    return Company.objects.filter(contractor__owned_projects=project_id).values_list('id', flat=True).first()
+
+
+def touch_company(company_id):
+    # Every plan of the company's projects can change with its yard
+    touch_project(*Project.objects.filter(contractor__owned_company=company_id).values_list('id', flat=True))
+
+
+def load_remnants(company_id, pieces, project_id=None, lock=False):
+    """
+    The company's remnants that can take at least one of ``pieces``, keyed
+    by (aluminum_type, kind, role) like plan_cuts() expects.
+
+    Each group is a range query on the (company, profile, length) index,
+    starting at its shortest piece, all sent as one query. Offcuts of
+    ``project_id`` itself are left out, they come from cutting these pieces.
+    """
+    shortest = {}
+    for piece in pieces:
+        key = (piece["aluminum_type"], piece["kind"], piece["role"])
+        shortest[key] = min(shortest.get(key, piece["length"]), piece["length"])
+
+    if company_id is None or not shortest:
+        return {}
+
+    match = Q()
+    for (aluminum_type, kind, role), length in shortest.items():
+        match |= Q(aluminum_type=aluminum_type, kind=kind, role=role, length__gte=round(length, 2))
+
+    rows = Remnant.objects.filter(match, company_id=company_id)
+    if project_id is not None:
+        rows = rows.exclude(source_project_id=project_id)
+    if lock:
+        rows = rows.select_for_update()
+
+    remnants = defaultdict(list)
+    for row in rows.values('id', 'aluminum_type', 'kind', 'role', 'length'):
+        remnants[(row['aluminum_type'], row['kind'], row['role'])].append(
+            {"id": row['id'], "length": row['length']}
+        )
+    return remnants
+
+
+def store_offcuts(company_id, project_id, plans):
+    """
+    Apply a cutting plan to the yard: the remnants it cuts from are taken out
+    and every offcut of MIN_REMNANT_LENGTH or more goes back in.
+    Returns (remnants used, offcuts stored).
+
+    Remnants are only written here, which is what keeps the cached
+    materials of the company's projects in step with the yard.
+    """
+    used_ids = []
+    offcuts = []
+
+    for plan in plans:
+        used_ids.extend(remnant["id"] for remnant in plan["remnants"])
+        if plan["aluminum_type"] is None:
+            continue
+
+        for stock in plan["bars"] + plan["remnants"]:
+            # Separating the offcut takes one more cut
+            length = round(stock["remnant"] - plan["kerf"], 2)
+            if length >= MIN_REMNANT_LENGTH:
+                offcuts.append(Remnant(
+                    company_id=company_id,
+                    aluminum_type=plan["aluminum_type"],
+                    kind=plan["kind"],
+                    role=plan["role"],
+                    length=Decimal(str(length)),
+                    source_project_id=project_id,
+                ))
+
+    Remnant.objects.filter(id__in=used_ids, company_id=company_id).delete()
+    Remnant.objects.bulk_create(offcuts)
+    touch_company(company_id)
+
+    return len(used_ids), len(offcuts)
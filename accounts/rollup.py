@@ -0,0 +1,101 @@
+import csv
+
+from .cutting import FRAME_ROLES, SASH_ROLES
+from .drywall import projects_drywall_totals
+from .glass_pricing import projects_glass_totals
+from .materials import projects_profile_totals
+from .models import Project
+
+
+ROLLUP_COLUMNS = ('material', 'type', 'detail', 'quantity', 'unit', 'length_m', 'area_m2', 'cost')
+
+
+def company_project_ids(company, since=None):
+    """Ids of every project of the company's contractor, created on or after ``since`` if given."""
+    projects = Project.objects.filter(contractor__owned_company=company)
+    if since:
+        projects = projects.filter(created_at__date__gte=since)
+    return list(projects.order_by('id').values_list('id', flat=True))
+
+
+def company_materials(company, since=None):
+    """
+    Aluminum, glass and drywall totals over every project of a company.
+    Everything is summed in grouped SQL over all the projects at once, plus
+    one vectorized pass over the drywall rows, so the query count does not
+    grow with the number of projects.
+    """
+    project_ids = company_project_ids(company, since)
+    return {
+        'company': company.name,
+        'since': since.isoformat() if since else None,
+        'project_count': len(project_ids),
+        'aluminum': projects_profile_totals(project_ids),
+        'glass': projects_glass_totals(project_ids),
+        'drywall': projects_drywall_totals(project_ids),
+    }
+
+
+def rollup_rows(rollup):
+    """company_materials() flattened into ROLLUP_COLUMNS rows for CSV."""
+    rows = []
+
+    for totals in rollup['aluminum']:
+        for kind, lengths, bars, roles in (
+            ('frame', totals['frame_totals'], totals['frame_bars'], FRAME_ROLES),
+            ('sash', totals['sash_totals'], totals['sash_bars'], SASH_ROLES),
+        ):
+            for role in roles:
+                rows.append({
+                    'material': 'aluminum',
+                    'type': totals['aluminum_type'],
+                    'detail': f"{totals['item_subtype']} {kind} {role}",
+                    'quantity': bars[role],
+                    'unit': 'bars',
+                    'length_m': round(lengths[role] / 100, 2),
+                })
+
+    for totals in rollup['glass']:
+        rows.append({
+            'material': 'glass',
+            'type': totals['glass_type'],
+            'quantity': totals['panes'],
+            'unit': 'panes',
+            'area_m2': totals['area'],
+            'cost': totals['cost'],
+        })
+
+    for board in rollup['drywall']['boards']:
+        rows.append({
+            'material': 'drywall board',
+            'type': board['drywall_type'],
+            'detail': f"{board['board_length']} m",
+            'quantity': board['gypsum_boards'],
+            'unit': 'boards',
+            'area_m2': board['area'],
+        })
+
+    for profile in rollup['drywall']['framing']:
+        rows.append({
+            'material': 'stud',
+            'type': profile['stud_thickness'],
+            'detail': '3 m',
+            'quantity': profile['stud_count'],
+            'unit': 'bars',
+        })
+        rows.append({
+            'material': 'track',
+            'type': profile['stud_thickness'],
+            'detail': '3 m',
+            'quantity': profile['track_count'],
+            'unit': 'bars',
+            'length_m': profile['track_length'],
+        })
+
+    return rows
+
+
+def write_rollup_csv(rollup, stream):
+    writer = csv.DictWriter(stream, fieldnames=ROLLUP_COLUMNS, restval='')
+    writer.writeheader()
+    writer.writerows(rollup_rows(rollup))
@@ -0,0 +1,127 @@
+import threading
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from .material_totals import item_state, apply_item_change
+from .materials_cache import touch_project
+from .models import (Room, Glass, Window, WindowFrame, WindowSash, Door, DoorFrame, DoorSash, Wall, Ceiling,
+                     MetalProfile, Order, Project)
+
+
+# Each tracked change is applied as a delta between an item's state before
+# the write (taken in pre_*) and after it (read in post_*). A cascade delete
+# sends every pre_delete before the first row goes, then one post_delete per
+# row, so snapshots are counted and the same item can be flushed in steps.
+# Each save or delete of a tracked row reads its item twice (item_state),
+# a fixed number of queries whatever the project's size.
+_local = threading.local()
+
+TRACKED_MODELS = (Window, WindowFrame, WindowSash, Door, DoorFrame, DoorSash, Wall, Ceiling)
+
+
+def _snapshots():
+    if not hasattr(_local, 'snapshots'):
+        _local.snapshots = {}
+    return _local.snapshots
+
+
+def _take_snapshots(keys):
+    snapshots = _snapshots()
+    for key in keys:
+        _, pending = snapshots.get(key, (None, 0))
+        snapshots[key] = (item_state(key), pending + 1)
+
+
+def _flush_snapshots(keys):
+    snapshots = _snapshots()
+    for key in keys:
+        if key not in snapshots:
+            continue
+        before, pending = snapshots[key]
+        after = item_state(key)
+        apply_item_change(key[0], before, after)
+        touch_project(before[0], after[0])
+        if pending > 1:
+            snapshots[key] = (after, pending - 1)
+        else:
+            del snapshots[key]
+
+
+def _tracked_keys(sender, instance):
+    if sender in (Window, Door, Wall, Ceiling):
+        return [(sender.__name__.lower(), instance.pk)] if instance.pk else []
+    if sender in (WindowFrame, WindowSash):
+        return [('window', instance.window_id)]
+    if sender in (DoorFrame, DoorSash):
+        return [('door', instance.door_id)]
+    # Room: its windows and doors are SET_NULL on delete, which sends no signals
+    return ([('window', pk) for pk in Window.objects.filter(room=instance).values_list('pk', flat=True)]
+            + [('door', pk) for pk in Door.objects.filter(room=instance).values_list('pk', flat=True)])
+
+
+def snapshot_material_items(sender, instance, **kwargs):
+    instance._material_keys = _tracked_keys(sender, instance)
+    _take_snapshots(instance._material_keys)
+
+
+def update_material_totals(sender, instance, created=False, **kwargs):
+    keys = instance.__dict__.pop('_material_keys', None)
+    if keys is None:
+        return
+
+    if created and sender in (Wall, Ceiling):
+        # A new wall had no pk to snapshot, so it counts from nothing
+        key = _tracked_keys(sender, instance)[0]
+        after = item_state(key)
+        apply_item_change(key[0], (None, {}), after)
+        touch_project(after[0])
+        return
+
+    _flush_snapshots(keys)
+
+
+def touch_room_project(sender, instance, **kwargs):
+    touch_project(instance.project_id)
+
+
+def touch_glass_projects(sender, instance, **kwargs):
+    # A new pane has no sash yet; the sash save touches its project
+    touch_project(
+        *Window.objects.filter(window_sashes__glass=instance).values_list('project_id', flat=True),
+        *Door.objects.filter(door_sashes__glass=instance).values_list('project_id', flat=True),
+    )
+
+
+def touch_framing_projects(sender, instance, **kwargs):
+    # Stud and track plans pick their bar length from the profiles of the
+    # suppliers a contractor orders from (accounts/framing.py)
+    touch_project(*Project.objects.filter(
+        project_type='drywall', contractor__order__supplier=instance.supplier_id
+    ).values_list('id', flat=True).distinct())
+
+
+def touch_ordering_contractor_projects(sender, instance, created=True, **kwargs):
+    # A new supplier brings its profile lengths into the contractor's plans;
+    # post_delete sends no "created", so a deleted order always touches
+    if created:
+        touch_project(*Project.objects.filter(
+            project_type='drywall', contractor_id=instance.contractor_id
+        ).values_list('id', flat=True))
+
+
+for model in TRACKED_MODELS:
+    pre_save.connect(snapshot_material_items, sender=model)
+    post_save.connect(update_material_totals, sender=model)
+    pre_delete.connect(snapshot_material_items, sender=model)
+    post_delete.connect(update_material_totals, sender=model)
+
+pre_delete.connect(snapshot_material_items, sender=Room)
+post_delete.connect(update_material_totals, sender=Room)
+
+post_save.connect(touch_room_project, sender=Room)
+post_delete.connect(touch_room_project, sender=Room)
+post_save.connect(touch_glass_projects, sender=Glass)
+post_save.connect(touch_framing_projects, sender=MetalProfile)
+post_delete.connect(touch_framing_projects, sender=MetalProfile)
+post_save.connect(touch_ordering_contractor_projects, sender=Order)
+post_delete.connect(touch_ordering_contractor_projects, sender=Order)
@@ -1,4 +1,6 @@
-from django.contrib.auth.decorators import login_required
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from django.contrib.auth import authenticate, login
@@ -7,6 +9,33 @@ from django.shortcuts import get_object_or_404
 from accounts.forms import ScrewForm, DrywallBoardForm, MetalProfileForm, ProfileSetForm
 from accounts.models import Screw, ProfileSet, MetalProfile, DrywallBoard, Order
 from rest_framework.authtoken.models import Token
+from accounts.token_auth import remember_token, token_user
+
+
+def supplier_api(view):
+    """
+    A supplier API view, for the session of api_supplier_login or the
+    "Authorization: Token <key>" of api_supplier_token_login. Tokens are
+    answered by token_user, so a known one costs no query; the view reads
+    the supplier from request.supplier_id.
+    """
+    @wraps(view)
+    def token_or_session(request, *args, **kwargs):
+        auth_header = request.headers.get('Authorization') or ''
+        if auth_header.startswith("Token "):
+            user = token_user(auth_header[len("Token "):])
+            if user is None:
+                return JsonResponse({"status": "error", "message": "Invalid token"}, status=401)
+        elif request.user.is_authenticated:
+            user = request.user
+        else:
+            return redirect_to_login(request.get_full_path())
+
+        if user.user_type != 'supplier':
+            return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
+        request.supplier_id = user.id
+        return view(request, *args, **kwargs)
+    return token_or_session
 
 
 @csrf_exempt
@@ -30,11 +59,8 @@ def api_supplier_login(request):
         return JsonResponse({"status": "ok", "username": user.username, "user_type": user.user_type})
     return JsonResponse({"status": "error", "message": "Invalid credentials or not a supplier"}, status=401)
 @csrf_exempt
-@login_required
+@supplier_api
 def api_add_screw(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method == "POST":
         try:
             data = json.loads(request.body.decode("utf-8"))
@@ -44,7 +70,7 @@ def api_add_screw(request):
         form = ScrewForm(data)
         if form.is_valid():
             screw = form.save(commit=False)
-            screw.supplier = request.user
+            screw.supplier_id = request.supplier_id
             screw.save()
             return JsonResponse({"status": "ok", "message": "Screw added successfully"})
         else:
@@ -53,17 +79,14 @@ def api_add_screw(request):
     return JsonResponse({"status": "error", "message": "Only POST allowed"}, status=405)
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_add_drywall_board(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method == "POST":
         data = json.loads(request.body.decode("utf-8"))
         form = DrywallBoardForm(data)
         if form.is_valid():
             board = form.save(commit=False)
-            board.supplier = request.user
+            board.supplier_id = request.supplier_id
             board.save()
             return JsonResponse({"status": "ok", "message": "Drywall board added"})
         else:
@@ -71,17 +94,14 @@ def api_add_drywall_board(request):
     return JsonResponse({"status": "error", "message": "Only POST allowed"}, status=405)
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_add_metal_profile(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method == "POST":
         data = json.loads(request.body.decode("utf-8"))
         form = MetalProfileForm(data)
         if form.is_valid():
             metal = form.save(commit=False)
-            metal.supplier = request.user
+            metal.supplier_id = request.supplier_id
             metal.save()
             return JsonResponse({"status": "ok", "message": "Metal profile added"})
         else:
@@ -89,17 +109,14 @@ def api_add_metal_profile(request):
     return JsonResponse({"status": "error", "message": "Only POST allowed"}, status=405)
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_add_profile_set(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method == "POST":
         data = json.loads(request.body.decode("utf-8"))
         form = ProfileSetForm(data)
         if form.is_valid():
             profile_set = form.save(commit=False)
-            profile_set.supplier = request.user
+            profile_set.supplier_id = request.supplier_id
             profile_set.save()
             return JsonResponse({"status": "ok", "message": "Profile set added"})
         else:
@@ -107,12 +124,9 @@ def api_add_profile_set(request):
     return JsonResponse({"status": "error", "message": "Only POST allowed"}, status=405)
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_edit_screw(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    screw = get_object_or_404(Screw, pk=pk, supplier=request.user)
+    screw = get_object_or_404(Screw, pk=pk, supplier_id=request.supplier_id)
 
     if request.method == "PUT":
         try:
@@ -131,12 +145,9 @@ def api_edit_screw(request, pk):
 
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_delete_screw(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    screw = get_object_or_404(Screw, pk=pk, supplier=request.user)
+    screw = get_object_or_404(Screw, pk=pk, supplier_id=request.supplier_id)
 
     if request.method == "DELETE":
         screw.delete()
@@ -146,12 +157,9 @@ def api_delete_screw(request, pk):
 
 # EDIT ProfileSet (PUT)
 @csrf_exempt
-@login_required
+@supplier_api
 def api_edit_profile_set(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    profile = get_object_or_404(ProfileSet, pk=pk, supplier=request.user)
+    profile = get_object_or_404(ProfileSet, pk=pk, supplier_id=request.supplier_id)
 
     if request.method != "PUT":
         return JsonResponse({"status": "error", "message": "Only PUT allowed"}, status=405)
@@ -171,12 +179,9 @@ def api_edit_profile_set(request, pk):
 
 # DELETE ProfileSet (DELETE)
 @csrf_exempt
-@login_required
+@supplier_api
 def api_delete_profile_set(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    profile = get_object_or_404(ProfileSet, pk=pk, supplier=request.user)
+    profile = get_object_or_404(ProfileSet, pk=pk, supplier_id=request.supplier_id)
 
     if request.method != "DELETE":
         return JsonResponse({"status": "error", "message": "Only DELETE allowed"}, status=405)
@@ -185,12 +190,9 @@ def api_delete_profile_set(request, pk):
     return JsonResponse({"status": "ok", "message": "Profile set deleted"})
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_edit_metal_profile(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    metal = get_object_or_404(MetalProfile, pk=pk, supplier=request.user)
+    metal = get_object_or_404(MetalProfile, pk=pk, supplier_id=request.supplier_id)
 
     if request.method != "PUT":
         return JsonResponse({"status": "error", "message": "Only PUT allowed"}, status=405)
@@ -208,12 +210,9 @@ def api_edit_metal_profile(request, pk):
 
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_delete_metal_profile(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    metal = get_object_or_404(MetalProfile, pk=pk, supplier=request.user)
+    metal = get_object_or_404(MetalProfile, pk=pk, supplier_id=request.supplier_id)
 
     if request.method != "DELETE":
         return JsonResponse({"status": "error", "message": "Only DELETE allowed"}, status=405)
@@ -222,12 +221,9 @@ def api_delete_metal_profile(request, pk):
     return JsonResponse({"status": "ok", "message": "Metal profile deleted"})
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_edit_drywall_board(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    board = get_object_or_404(DrywallBoard, pk=pk, supplier=request.user)
+    board = get_object_or_404(DrywallBoard, pk=pk, supplier_id=request.supplier_id)
 
     if request.method != "PUT":
         return JsonResponse({"status": "error", "message": "Only PUT allowed"}, status=405)
@@ -245,12 +241,9 @@ def api_edit_drywall_board(request, pk):
 
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_delete_drywall_board(request, pk):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    board = get_object_or_404(DrywallBoard, pk=pk, supplier=request.user)
+    board = get_object_or_404(DrywallBoard, pk=pk, supplier_id=request.supplier_id)
 
     if request.method != "DELETE":
         return JsonResponse({"status": "error", "message": "Only DELETE allowed"}, status=405)
@@ -259,29 +252,23 @@ def api_delete_drywall_board(request, pk):
     return JsonResponse({"status": "ok", "message": "Drywall board deleted"})
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_supplier_inventory(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method != "GET":
         return JsonResponse({"status": "error", "message": "Only GET allowed"}, status=405)
 
     data = {
-        "screws": list(Screw.objects.filter(supplier=request.user).values()),
-        "profile_sets": list(ProfileSet.objects.filter(supplier=request.user).values()),
-        "metal_profiles": list(MetalProfile.objects.filter(supplier=request.user).values()),
-        "drywall_boards": list(DrywallBoard.objects.filter(supplier=request.user).values())
+        "screws": list(Screw.objects.filter(supplier_id=request.supplier_id).values()),
+        "profile_sets": list(ProfileSet.objects.filter(supplier_id=request.supplier_id).values()),
+        "metal_profiles": list(MetalProfile.objects.filter(supplier_id=request.supplier_id).values()),
+        "drywall_boards": list(DrywallBoard.objects.filter(supplier_id=request.supplier_id).values())
     }
     return JsonResponse({"status": "ok", "inventory": data})
 
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_supplier_add_item(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method != "POST":
         return JsonResponse({"status": "error", "message": "Only POST allowed"}, status=405)
 
@@ -304,7 +291,7 @@ def api_supplier_add_item(request):
 
     if form.is_valid():
         obj = form.save(commit=False)
-        obj.supplier = request.user
+        obj.supplier_id = request.supplier_id
         obj.save()
         return JsonResponse({"status": "ok", "message": f"{item_type} added successfully"})
     else:
@@ -314,15 +301,12 @@ def api_supplier_add_item(request):
 
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_supplier_orders(request):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
     if request.method != "GET":
         return JsonResponse({"status": "error", "message": "Only GET allowed"}, status=405)
 
-    orders = Order.objects.filter(supplier=request.user).prefetch_related('items', 'company', 'contractor')
+    orders = Order.objects.filter(supplier_id=request.supplier_id).prefetch_related('items', 'company', 'contractor')
 
     data = []
     for order in orders:
@@ -351,12 +335,9 @@ def api_supplier_orders(request):
 
 
 @csrf_exempt
-@login_required
+@supplier_api
 def api_update_supplier_order(request, order_id):
-    if request.user.user_type != 'supplier':
-        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
-
-    order = get_object_or_404(Order, id=order_id, supplier=request.user)
+    order = get_object_or_404(Order, id=order_id, supplier_id=request.supplier_id)
 
     if request.method != "PUT":
         return JsonResponse({"status": "error", "message": "Only PUT allowed"}, status=405)
@@ -391,6 +372,7 @@ def api_supplier_token_login(request):
         return JsonResponse({"status":"error","message":"Invalid credentials"}, status=401)
 
     token, _ = Token.objects.get_or_create(user=user)
+    remember_token(token.key, user)
     return JsonResponse({"status":"ok","token":token.key,"username":user.username,"user_type":"supplier"})
 
 @csrf_exempt
@@ -404,9 +386,8 @@ def api_supplier_token_logout(request):
     if not token_key:
         return JsonResponse({"status":"error","message":"Token required"}, status=400)
 
-    from rest_framework.authtoken.models import Token
-    try:
-        Token.objects.get(key=token_key).delete()
-        return JsonResponse({"status":"ok","message":"Logged out"})
-    except Token.DoesNotExist:
-        return JsonResponse({"status":"error","message":"Invalid token"}, status=401)
\ No newline at end of file
+    # The delete signal drops the token from the token_user cache too
+    if token_user(token_key) is None:
+        return JsonResponse({"status":"error","message":"Invalid token"}, status=401)
+    Token.objects.filter(key=token_key).delete()
+    return JsonResponse({"status":"ok","message":"Logged out"})
\ No newline at end of file
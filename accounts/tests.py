@@ -1,3 +1,1012 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import zipfile
+from collections import defaultdict
+from decimal import Decimal
+from functools import partial
+from math import ceil
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from .aluminum_ingest import ingest_aluminum_items, parse_aluminum_post
+from .clock import attendance_date, attendance_month_rows, clock_in, clock_out, month_totals
+from .clock_sync import sync_clock_events
+from .cut_lists import consolidate_aluminum, consolidate_glass, short_number_list
+from .cutting import EXACT_MAX_PIECES, best_fit_decreasing, exact_bin_packing, plan_cuts
+from .drywall import calculate_wall_materials, project_drywall_materials
+from .drywall_layout import load_drywall_surfaces, pack_board_pieces, project_board_layout
+from .framing import DEFAULT_BAR_LENGTH, MIN_PIECE_LENGTH, SPLICE_OVERLAP, plan_framing, splice
+from .geometry import (PROFILE_CONSTANTS_PATH, coerce_opening, compute_openings, load_profile_constants,
+                       opening_geometry)
+from .glass_nesting import guillotine_pack, nest_glass
+from .glass_pricing import (detailed_glass_materials, glass_totals_by_type, load_glass_prices, pane_price, project_panes,
+                            reprice_project_glass)
+from .material_totals import (ALUMINUM_FIELDS, DRYWALL_FIELDS, compute_aluminum_totals, compute_drywall_totals,
+                              get_aluminum_totals, get_drywall_totals)
+from .materials import aluminum_profile_totals, load_aluminum_items
+from .materials_cache import cached_materials, touch_project
+from . import views
+from .models import (Attendance, AttendanceMonth, Ceiling, Company, CustomUser, Door, DoorSash, Glass, GlassPrice,
+                     MetalProfile, Order, Project, Remnant, Room, Wall, Window, WindowFrame, WindowSash)
+from .payroll_pdfs import worker_log
+from .pdf_fonts import shape
+from .pdf_tables import render_pdf
+from .rollup import company_materials
+from .token_auth import TokenUser, _TokenCache
+from .views import sliding_window_materials
+from .zip_stream import stream_zip
+
+
+def make_contractor(username='contractor'):
+    return CustomUser.objects.create_user(username=username, password='x', user_type='contractor')
+
+
+def make_project(contractor, project_type='aluminum', number='P-1'):
+    return Project.objects.create(
+        project_number=number, address='Street 1', project_type=project_type, contractor=contractor
+    )
+
+
+def aluminum_form(openings, rooms=2, doors=False):
+    """
+    The POST data of the add-aluminum form with ``openings`` windows spread
+    over ``rooms``; with ``doors`` every third opening is a door instead.
+    """
+    data = {'room_count': rooms}
+    for i in range(rooms):
+        items = range(i, openings, rooms)
+        data[f'room_name_{i}'] = f'Room {i}'
+        data[f'item_count_{i}'] = len(items)
+        for j, n in enumerate(items):
+            prefix = f'{i}_{j}'
+            door = doors and n % 3 == 0
+            data.update({
+                f'item_type_{prefix}': 'door' if door else 'window',
+                f'subtype_{prefix}': ('sliding', 'multi_bolt')[n % 2],
+                f'aluminum_type_{prefix}': '2200' if door else '7000',
+                f'glass_type_{prefix}': 'transparent',
+                f'number_of_sashs_{prefix}': 2,
+                f'height_left_{prefix}': 100 + n, f'height_middle_{prefix}': 100 + n,
+                f'height_right_{prefix}': 100 + n,
+                f'width_top_{prefix}': 150, f'width_middle_{prefix}': 150, f'width_bottom_{prefix}': 150,
+            })
+    return data
+
+
+def per_opening_geometry(item, profiles):
+    """The per-item formulas add_aluminum_item used before geometry.py, kept as the reference."""
+    constants = profiles.get(item["aluminum_type"], {"GIRTH": 1, "DEPTH": 1, "FRAME_INSIDE": 1, "PROFILE_WIDTH": 1})
+    sash_count = int(item["sash_count"])
+    min_height = min(float(h) for h in item["heights"])
+    min_width = min(float(w) for w in item["widths"])
+
+    frame_top = min_width - 1
+    frame_bottom = frame_top
+    if item["type"] == 'door' and item["subtype"] == 'multi_bolt':
+        frame_bottom = None
+        sash_side = min_height - 1 - constants["PROFILE_WIDTH"]
+        sash_top_bottom = (min_width - 1 - (2 * constants["PROFILE_WIDTH"])) / sash_count
+    else:
+        sash_side = min_height - constants["FRAME_INSIDE"]
+        sash_top_bottom = (min_width - ((sash_count - 1) * constants["GIRTH"])) / sash_count
+
+    return {
+        "sash_count": sash_count,
+        "frame": {"side": min_height - 1, "top": frame_top, "bottom": frame_bottom},
+        "sash": {"side": sash_side, "top": sash_top_bottom, "bottom": sash_top_bottom},
+        "glass": {"height": sash_side - constants["DEPTH"] - 1, "width": sash_top_bottom - constants["DEPTH"] - 1},
+    }
+
+
+class GeometryTests(SimpleTestCase):
+    def test_batch_matches_the_per_opening_formulas(self):
+        with open(PROFILE_CONSTANTS_PATH, encoding='utf-8') as f:
+            profiles = json.load(f)["profiles"]
+        rng = random.Random(5)
+        items = [
+            {
+                "type": rng.choice(['window', 'door']), "subtype": rng.choice(['sliding', 'multi_bolt']),
+                "aluminum_type": rng.choice(list(profiles) + ['unknown']), "sash_count": rng.randint(1, 4),
+                "heights": [rng.randint(5000, 30000) / 100 for _ in range(3)],
+                "widths": [rng.randint(4000, 40000) / 100 for _ in range(3)],
+            }
+            for _ in range(500)
+        ]
+
+        arrays = compute_openings([coerce_opening(item) for item in items], load_profile_constants())
+        for k, item in enumerate(items):
+            expected = per_opening_geometry(item, profiles)
+            actual = opening_geometry(arrays, k)
+            self.assertEqual(actual["sash_count"], expected["sash_count"])
+            for part in ("frame", "sash", "glass"):
+                for name, value in expected[part].items():
+                    if value is None:
+                        self.assertIsNone(actual[part][name], (k, part, name))
+                    else:
+                        self.assertAlmostEqual(actual[part][name], value, places=9, msg=(k, part, name))
+
+
+class AluminumIngestTests(TestCase):
+    def setUp(self):
+        self.project = make_project(make_contractor())
+
+    def ingest(self, openings):
+        with CaptureQueriesContext(connection) as queries:
+            result = ingest_aluminum_items(self.project, parse_aluminum_post(aluminum_form(openings), {}))
+        return result, len(queries)
+
+    def one_insert_per_table(self):
+        # As on MySQL; SQLite splits an INSERT every 999 parameters
+        return mock.patch.object(type(connection.ops), 'bulk_batch_size', lambda ops, fields, objs: len(objs))
+
+    def test_query_count_does_not_grow_with_openings(self):
+        self.ingest(1)  # the first form also creates the project's AluminumMaterial row
+        with self.one_insert_per_table():
+            _, few = self.ingest(4)
+            _, many = self.ingest(600)
+        self.assertEqual(few, many)
+
+    def test_query_count_does_not_grow_without_returning_support(self):
+        self.ingest(1)
+        with self.one_insert_per_table(), \
+                mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            _, few = self.ingest(4)
+            _, many = self.ingest(600)
+        self.assertEqual(few, many)
+
+    def layout(self, project):
+        # (room name, item) -> its frame and the panes of its sashes, as stored
+        return {
+            (window.room.name, window.window_number.rsplit('-', 1)[1]): (
+                window.window_frame.top,
+                sorted((sash.glass.height, sash.glass.width) for sash in window.window_sashes.all()),
+            )
+            for window in Window.objects.filter(project=project).select_related('room', 'window_frame')
+        }
+
+    def test_rows_are_read_back_without_returning_support(self):
+        self.ingest(30)
+        expected = self.layout(self.project)
+
+        # Plain MySQL: bulk_create sets no primary keys
+        self.project = make_project(self.project.contractor, number='P-2')
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            result, _ = self.ingest(30)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(len(expected), 30)
+        self.assertEqual(self.layout(self.project), expected)
+        self.assertEqual(WindowSash.objects.filter(window__project=self.project).values('glass').distinct().count(), 60)
+
+
+class MaterialsLoaderTests(TestCase):
+    def setUp(self):
+        contractor = make_contractor()
+        self.small = make_project(contractor, number='P-1')
+        self.large = make_project(contractor, number='P-2')
+        ingest_aluminum_items(self.small, parse_aluminum_post(aluminum_form(3, rooms=1, doors=True), {}))
+        ingest_aluminum_items(self.large, parse_aluminum_post(aluminum_form(90, rooms=6, doors=True), {}))
+
+    def test_loader_queries_do_not_depend_on_project_size(self):
+        for project, openings in ((self.small, 3), (self.large, 90)):
+            with self.assertNumQueries(4):
+                items = load_aluminum_items(project.id)
+            self.assertEqual(len(items), openings)
+            self.assertTrue(all(len(item['sashes']) == 2 for item in items))
+
+    def test_sliding_window_materials_queries_do_not_depend_on_project_size(self):
+        counts = []
+        for project in (self.small, self.large):
+            with CaptureQueriesContext(connection) as queries:
+                sliding_window_materials(project.id)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class ProfileTotalsTests(TestCase):
+    def per_item_totals(self, project):
+        # The per-item rule: end sashes of a sliding opening and every other
+        # sash take one side and one handle side; middle sliding sashes two sides
+        groups = {}
+        for item in load_aluminum_items(project.id):
+            totals = groups.setdefault((item['aluminum_type'], item['item_subtype']), defaultdict(float))
+            totals['openings'] += 1
+            totals['frame_top'] += float(item['frame']['top'] or 0)
+            totals['frame_bottom'] += float(item['frame']['bottom'] or 0)
+            totals['frame_side'] += float(item['frame']['side'] or 0) * 2
+            last = len(item['sashes']) - 1
+            for n, sash in enumerate(item['sashes']):
+                side = float(sash['side'])
+                totals['sashes'] += 1
+                totals['sash_top_bottom'] += float(sash['top']) + float(sash['bottom'])
+                if item['item_subtype'] == 'sliding' and 0 < n < last:
+                    totals['sash_side'] += 2 * side
+                else:
+                    totals['sash_side'] += side
+                    totals['sash_handle_side'] += side
+        return groups
+
+    def test_grouped_totals_equal_the_per_item_sum(self):
+        project = make_project(make_contractor())
+        form = aluminum_form(24, rooms=3, doors=True)
+        # One to four sashes, so sliding openings have middle sashes
+        for n, key in enumerate(sorted(key for key in form if key.startswith('number_of_sashs_'))):
+            form[key] = n % 4 + 1
+        form.update({key: ('7000', '9200', '4500')[n % 3]
+                     for n, key in enumerate(sorted(key for key in form if key.startswith('aluminum_type_')))})
+        ingest_aluminum_items(project, parse_aluminum_post(form, {}))
+
+        expected = self.per_item_totals(project)
+        with self.assertNumQueries(4):
+            groups = aluminum_profile_totals(project.id)
+        self.assertEqual(len(groups), len(expected))
+        for group in groups:
+            totals = expected[(group['aluminum_type'], group['item_subtype'])]
+            self.assertEqual(group['openings'], totals['openings'])
+            self.assertEqual(group['sashes'], totals['sashes'])
+            for role in ('top', 'bottom', 'side'):
+                self.assertAlmostEqual(group['frame_totals'][role], totals[f'frame_{role}'], places=6)
+            for role in ('top_bottom', 'handle_side', 'side'):
+                self.assertAlmostEqual(group['sash_totals'][role], totals[f'sash_{role}'], places=6)
+
+
+class GlassPricingTests(TestCase):
+    def setUp(self):
+        self.contractor = make_contractor()
+        self.company = Company.objects.create(name='Company', code='12345', contractor=self.contractor)
+        for glass_type, price in (('transparent', '120.00'), ('anti_sun', '180.50')):
+            GlassPrice.objects.create(contractor=self.contractor, company=self.company, glass_type=glass_type,
+                                      price_per_m2=price)
+
+    def test_prices_are_read_in_one_query(self):
+        with self.assertNumQueries(1):
+            prices = load_glass_prices(self.contractor.id)
+        self.assertEqual(prices, {'transparent': Decimal('120.00'), 'anti_sun': Decimal('180.50')})
+
+    def test_pane_price_matches_glass_save(self):
+        prices = load_glass_prices(self.contractor.id)
+        for glass_type in ('transparent', 'anti_sun', 'shadowed'):
+            saved = Glass(glass_type=glass_type, height=Decimal('123.45'), width=Decimal('67.89'))
+            saved.save(contractor=self.contractor)
+            self.assertEqual(pane_price(saved, prices), saved.price, glass_type)
+
+    def test_ingest_and_reprice_read_the_prices_once(self):
+        small, large = make_project(self.contractor, number='P-1'), make_project(self.contractor, number='P-2')
+        ingest_aluminum_items(small, parse_aluminum_post(aluminum_form(2), {}))
+        ingest_aluminum_items(large, parse_aluminum_post(aluminum_form(60), {}))
+        prices = load_glass_prices(self.contractor.id)
+        for pane in project_panes(large.id):
+            self.assertEqual(pane.price, pane_price(pane, prices))
+
+        GlassPrice.objects.filter(glass_type='transparent').update(price_per_m2='99.90')
+        counts = []
+        for project in (small, large):
+            with CaptureQueriesContext(connection) as queries:
+                updated = reprice_project_glass(project)
+            counts.append(len(queries))
+            self.assertEqual(updated, project_panes(project.id).count())
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(len([q for q in queries if 'accounts_glassprice' in q['sql']]), 1)
+
+
+class GlassReportTests(TestCase):
+    def test_area_and_cost_of_known_panes(self):
+        contractor = make_contractor()
+        company = Company.objects.create(name='Company', code='12345', contractor=contractor)
+        GlassPrice.objects.create(contractor=contractor, company=company, glass_type='transparent', price_per_m2='120')
+        GlassPrice.objects.create(contractor=contractor, company=company, glass_type='anti_sun', price_per_m2='180.50')
+        project = make_project(contractor)
+        room = Room.objects.create(name='Floor 1', project=project)
+
+        # 100 x 80.4 cm is 0.804 m²: rounded, not rounded up, to 0.80; 0.804 x 120 = 96.48
+        pane = Glass(glass_type='transparent', height=Decimal('100'), width=Decimal('80.40'))
+        pane.save(contractor=contractor)
+        window = Window.objects.create(room=room, project=project, window_type='sliding', aluminum_type='7000',
+                                       number_of_sashs=1, window_number='W-1')
+        WindowSash.objects.create(window=window, glass=pane, side=100, top=80, bottom=80)
+
+        # 123.45 x 67.89 cm is 0.83810205 m²: 0.84, and 0.83810205 x 180.50 = 151.28
+        pane = Glass(glass_type='anti_sun', height=Decimal('123.45'), width=Decimal('67.89'))
+        pane.save(contractor=contractor)
+        door = Door.objects.create(room=room, project=project, door_type='sliding', aluminum_type='2200',
+                                   number_of_sashs=1, door_number='D-1')
+        DoorSash.objects.create(door=door, glass=pane, side=120, top=70, bottom=70)
+
+        self.assertEqual(
+            [(g['item'], g['area'], g['cost']) for g in detailed_glass_materials(project.id)],
+            [('Window W-1', Decimal('0.80'), Decimal('96.48')), ('Door D-1', Decimal('0.84'), Decimal('151.28'))],
+        )
+        self.assertEqual(
+            [(t['glass_type'], t['panes'], t['area'], t['cost']) for t in glass_totals_by_type(project.id)],
+            [('anti_sun', 1, Decimal('0.84'), Decimal('151.28')), ('transparent', 1, Decimal('0.80'), Decimal('96.48'))],
+        )
+
+
+class CompanyRollupTests(TestCase):
+    def setUp(self):
+        self.contractor = make_contractor()
+        self.company = Company.objects.create(name='Company', code='12345', contractor=self.contractor)
+        self.projects = []
+        for number, form in (('P-1', aluminum_form(6)), ('P-2', aluminum_form(9, rooms=3, doors=True))):
+            project = make_project(self.contractor, number=number)
+            ingest_aluminum_items(project, parse_aluminum_post(form, {}))
+            self.projects.append(project)
+        # Another contractor's project stays out of the rollup
+        other = make_project(make_contractor('other'), number='P-3')
+        ingest_aluminum_items(other, parse_aluminum_post(aluminum_form(4), {}))
+
+    def test_totals_equal_the_per_project_sum(self):
+        openings = defaultdict(int)
+        glass = defaultdict(lambda: [0, Decimal('0.00')])
+        for project in self.projects:
+            for group in aluminum_profile_totals(project.id):
+                openings[(group['aluminum_type'], group['item_subtype'])] += group['openings']
+            for totals in glass_totals_by_type(project.id):
+                glass[totals['glass_type']][0] += totals['panes']
+                glass[totals['glass_type']][1] += totals['area']
+
+        rollup = company_materials(self.company)
+        self.assertEqual(rollup['project_count'], 2)
+        self.assertEqual({(g['aluminum_type'], g['item_subtype']): g['openings'] for g in rollup['aluminum']},
+                         dict(openings))
+        self.assertEqual({g['glass_type']: [g['panes'], g['area']] for g in rollup['glass']}, dict(glass))
+
+        # Only projects created on or after since
+        Project.objects.filter(id=self.projects[0].id).update(
+            created_at=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+        )
+        rollup = company_materials(self.company, since=datetime.date(2025, 1, 1))
+        self.assertEqual(rollup['project_count'], 1)
+        self.assertEqual(sum(g['openings'] for g in rollup['aluminum']), 9)
+
+    def test_impossible_since_is_turned_down(self):
+        self.client.force_login(self.contractor)
+        for since in ('2024-02-30', 'yesterday'):
+            response = self.client.get('/api/company/materials/', {'since': since})
+            self.assertEqual(response.status_code, 400, since)
+            self.assertEqual(response.json()['message'], 'since must be YYYY-MM-DD')
+
+
+class MaterialTotalsSignalTests(TestCase):
+    def setUp(self):
+        contractor = make_contractor()
+        self.small = make_project(contractor, number='P-1')
+        self.large = make_project(contractor, number='P-2')
+        ingest_aluminum_items(self.small, parse_aluminum_post(aluminum_form(3, rooms=1, doors=True), {}))
+        ingest_aluminum_items(self.large, parse_aluminum_post(aluminum_form(90, rooms=6, doors=True), {}))
+
+    def test_frame_edit_queries_do_not_depend_on_project_size(self):
+        counts = []
+        for project in (self.small, self.large):
+            frame = WindowFrame.objects.filter(window__project=project).first()
+            frame.top += 10
+            with CaptureQueriesContext(connection) as queries:
+                frame.save()
+            counts.append(len(queries))
+            self.assertEqual(
+                {field: getattr(get_aluminum_totals(project.id), field) for field in ALUMINUM_FIELDS},
+                compute_aluminum_totals(project.id),
+            )
+        self.assertEqual(counts[0], counts[1])
+
+    def test_wall_edit_queries_do_not_depend_on_project_size(self):
+        counts = []
+        for walls in (2, 60):
+            project = make_project(self.small.contractor, project_type='drywall', number=f'D-{walls}')
+            drywall_surfaces(Room.objects.create(name='Floor 1', project=project), 1, walls, 2)
+            get_drywall_totals(project.id)
+            wall = Wall.objects.filter(room__project=project).first()
+            wall.width += 1
+            with CaptureQueriesContext(connection) as queries:
+                wall.save()
+            counts.append(len(queries))
+            summary = get_drywall_totals(project.id)
+            self.assertEqual(
+                {field: getattr(summary, field) for field in DRYWALL_FIELDS}, compute_drywall_totals(project.id)
+            )
+        self.assertEqual(counts[0], counts[1])
+
+
+class MaterialsCacheTests(TestCase):
+    def setUp(self):
+        # Test databases hand out the same ids again, so no entry may outlive its test
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.project = make_project(make_contractor())
+        ingest_aluminum_items(self.project, parse_aluminum_post(aluminum_form(2, rooms=1), {}))
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return self.computed
+
+    def read(self, project=None):
+        return cached_materials((project or self.project).id, 'aluminum', self.compute)
+
+    def test_repeated_reads_compute_once(self):
+        self.assertEqual([self.read(), self.read()], [1, 1])
+
+    def test_project_change_is_never_served_stale(self):
+        self.read()
+        frame = WindowFrame.objects.filter(window__project=self.project).first()
+        frame.top += 1
+        frame.save()
+        self.assertEqual(self.read(), 2)
+
+    def test_version_bumped_elsewhere_is_seen(self):
+        self.read()
+        # Another server process bumps the column, this one's cache never hears of it
+        Project.objects.filter(id=self.project.id).update(materials_version=F('materials_version') + 1)
+        self.assertEqual(self.read(), 2)
+
+    def test_editing_a_project_keeps_later_bumps(self):
+        project = Project.objects.get(id=self.project.id)
+        touch_project(project.id)
+        version = Project.objects.get(id=project.id).materials_version
+        project.address = 'Street 2'
+        project.save()
+        self.assertEqual(Project.objects.get(id=project.id).materials_version, version)
+
+    def test_metal_profile_touches_only_its_suppliers_contractors(self):
+        supplier = CustomUser.objects.create_user(username='supplier', password='x', user_type='supplier')
+        ordering = make_project(make_contractor('ordering'), project_type='drywall', number='D-1')
+        other = make_project(make_contractor('other'), project_type='drywall', number='D-2')
+        Order.objects.create(order_number='O-1', contractor=ordering.contractor, supplier=supplier)
+        versions = dict(Project.objects.values_list('id', 'materials_version'))
+
+        MetalProfile.objects.create(
+            supplier=supplier, profile_type='stud', size='70', length_meters=4, quantity=10, price_per_piece=5
+        )
+
+        after = dict(Project.objects.values_list('id', 'materials_version'))
+        self.assertEqual(after[ordering.id], versions[ordering.id] + 1)
+        self.assertEqual(after[other.id], versions[other.id])
+        self.assertEqual(after[self.project.id], versions[self.project.id])
+
+
+class RecordCutsTests(TestCase):
+    def setUp(self):
+        contractor = make_contractor()
+        self.company = Company.objects.create(name='Company', code='12345', contractor=contractor)
+        self.project = make_project(contractor)
+        ingest_aluminum_items(self.project, parse_aluminum_post(aluminum_form(12, rooms=2), {}))
+        # Yard stock from an earlier job, long enough to take frame pieces
+        Remnant.objects.bulk_create(
+            Remnant(company=self.company, aluminum_type='7000', kind='frame', role=role, length=length)
+            for role in ('top', 'bottom', 'side') for length in (160, 250, 400)
+        )
+        self.client.force_login(contractor)
+
+    def yard(self):
+        return sorted(Remnant.objects.values_list('aluminum_type', 'kind', 'role', 'length', 'source_project'))
+
+    def test_second_post_changes_nothing(self):
+        url = f'/materials/{self.project.id}/record-cuts/'
+        self.client.post(url)
+        yard = self.yard()
+        self.assertTrue(Remnant.objects.filter(source_project=self.project).exists())
+        self.assertLess(Remnant.objects.filter(source_project=None).count(), 9)
+
+        response = self.client.post(url, follow=True)
+        self.assertEqual(self.yard(), yard)
+        self.assertIn('already recorded', ' '.join(str(m) for m in response.context['messages']))
+
+
+def drywall_surfaces(room, seed, walls, ceilings):
+    """Random walls and ceilings of ``room`` in every board size, layer and face setup, bulk created."""
+    rng = random.Random(seed)
+    Wall.objects.bulk_create(
+        Wall(
+            room=room, width=Decimal(rng.randint(5000, 120000)) / 100, height=Decimal(rng.randint(20000, 60000)) / 100,
+            drywall_type=rng.choice(['white', 'pink', 'green', 'blue']), stud_thickness=rng.choice(['50', '70', 'f47']),
+            number_of_layers=rng.choice([1, 2]), double_sided=rng.choice([True, False]),
+            board_length=Decimal(rng.choice(['2.0', '2.6', '3.0'])),
+        )
+        for _ in range(walls)
+    )
+    Ceiling.objects.bulk_create(
+        Ceiling(
+            room=room, area=Decimal(rng.randint(50, 8000)) / 100,
+            drywall_type=rng.choice(['white', 'pink']), stud_thickness=rng.choice(['70', 'f47']),
+            board_length=Decimal(rng.choice(['2.0', '2.6', '3.0'])),
+        )
+        for _ in range(ceilings)
+    )
+
+
+class DrywallBatchTests(TestCase):
+    def test_batch_matches_calculate_wall_materials(self):
+        project = make_project(make_contractor(), project_type='drywall')
+        drywall_surfaces(Room.objects.create(name='Hall', project=project), seed=5, walls=400, ceilings=200)
+
+        batch = project_drywall_materials(project.id)
+        single = [calculate_wall_materials(wall) for wall in Wall.objects.order_by('id').select_related('room')]
+        single += [calculate_wall_materials(ceiling) for ceiling in Ceiling.objects.order_by('id').select_related('room')]
+
+        self.assertEqual(len(batch), 600)
+        for batched, expected in zip(batch, single):
+            batched = dict(batched)
+            batched.pop('wall_number', None)
+            batched.pop('ceiling_number', None)
+            self.assertEqual(batched, expected)
+
+
+class BoardLayoutTests(TestCase):
+    def assertBoardsHold(self, boards, pieces, board_width, board_length):
+        # Every piece exactly once, inside its board, clear of the others
+        self.assertEqual(sorted(k for board in boards for k, _, _ in board), list(range(len(pieces))))
+        for board in boards:
+            boxes = [(x, y, x + pieces[k][0], y + pieces[k][1]) for k, x, y in board]
+            for n, (x0, y0, x1, y1) in enumerate(boxes):
+                self.assertTrue(0 <= x0 and 0 <= y0 and x1 <= board_width and y1 <= board_length)
+                for a0, b0, a1, b1 in boxes[n + 1:]:
+                    self.assertTrue(x1 <= a0 or a1 <= x0 or y1 <= b0 or b1 <= y0)
+
+    def test_pieces_are_all_placed_without_overlap(self):
+        rng = random.Random(6)
+        for board_length in (2000, 2600, 3000):
+            pieces = [(rng.choice([1200, rng.randint(50, 1199)]), rng.randint(50, board_length)) for _ in range(400)]
+            self.assertBoardsHold(pack_board_pieces(pieces, 1200, board_length), pieces, 1200, board_length)
+
+    def test_project_layout_covers_every_surface(self):
+        project = make_project(make_contractor(), project_type='drywall')
+        drywall_surfaces(Room.objects.create(name='Hall', project=project), seed=8, walls=150, ceilings=30)
+
+        plans = project_board_layout(project.id)
+        covered = sum(surface['area'] * surface['copies'] for surface in load_drywall_surfaces(project.id))
+        self.assertAlmostEqual(sum(plan['piece_area'] for plan in plans), covered, delta=0.01 * len(plans))
+        for plan in plans:
+            self.assertGreaterEqual(plan['board_area'], plan['piece_area'])
+            self.assertEqual(sum(line['quantity'] for line in plan['cut_list']), plan['cut_boards'])
+
+
+    def test_rooms_of_the_same_name_get_their_own_plans(self):
+        project = make_project(make_contractor(), project_type='drywall')
+        rooms = [Room.objects.create(name='Floor 1', project=project) for _ in range(2)]
+        for seed, room in enumerate(rooms):
+            drywall_surfaces(room, seed=seed, walls=20, ceilings=3)
+
+        plans = project_board_layout(project.id, by_room=True)
+        self.assertEqual({plan['room_id'] for plan in plans}, {room.id for room in rooms})
+        self.assertEqual({plan['room'] for plan in plans}, {'Floor 1'})
+        for room in rooms:
+            own = [surface for surface in load_drywall_surfaces(project.id) if surface['room_id'] == room.id]
+            self.assertEqual(sum(plan['estimate'] for plan in plans if plan['room_id'] == room.id),
+                             sum(surface['estimate'] for surface in own))
+
+class CuttingTests(SimpleTestCase):
+    def assertPacking(self, bins, sizes, capacity):
+        self.assertEqual(sorted(k for b in bins for k in b), list(range(len(sizes))))
+        for b in bins:
+            self.assertLessEqual(sum(sizes[k] for k in b), capacity)
+
+    def test_exact_beats_best_fit_where_it_can(self):
+        sizes = [4, 4, 3, 3, 3, 3]
+        self.assertEqual(len(best_fit_decreasing(sizes, 10)), 3)
+        bins = exact_bin_packing(sizes, 10)
+        self.assertPacking(bins, sizes, 10)
+        self.assertEqual(len(bins), 2)
+
+    def test_exact_is_never_worse_than_best_fit(self):
+        rng = random.Random(2)
+        for _ in range(300):
+            capacity = rng.choice([600, 1000])
+            sizes = [rng.randint(50, capacity) for _ in range(rng.randint(1, EXACT_MAX_PIECES))]
+            bins = exact_bin_packing(sizes, capacity)
+            self.assertPacking(bins, sizes, capacity)
+            self.assertLessEqual(len(bins), len(best_fit_decreasing(sizes, capacity)))
+            self.assertGreaterEqual(len(bins), ceil(sum(sizes) / capacity))
+
+    def test_plan_cuts_fits_every_piece_in_its_bars(self):
+        rng = random.Random(3)
+        pieces = [
+            {'aluminum_type': '7000', 'kind': 'frame', 'role': 'side', 'length': rng.randint(40, 300),
+             'item_number': f'W-{n}'}
+            for n in range(500)
+        ] + [{'aluminum_type': '7000', 'kind': 'frame', 'role': 'side', 'length': 650, 'item_number': 'W-big'}]
+
+        plan, = plan_cuts(pieces, kerf=0.4)
+        self.assertEqual(sum(len(bar['cuts']) for bar in plan['bars']), 500)
+        self.assertEqual([piece['item_number'] for piece in plan['unfit']], ['W-big'])
+        for bar in plan['bars']:
+            kerfs = 0.4 * (len(bar['cuts']) - 1)
+            self.assertAlmostEqual(bar['used'], sum(cut['length'] for cut in bar['cuts']) + kerfs, places=2)
+            self.assertLessEqual(bar['used'], 600)
+
+
+class CutListTests(SimpleTestCase):
+    def test_identical_pieces_merge_into_one_line(self):
+        pieces = [
+            {'aluminum_type': '7000', 'kind': 'frame', 'role': 'top', 'length': length, 'item_number': number}
+            for length, number in ((120.004, 'W-1-2-10'), (120.0, 'W-1-2-9'), (120.001, 'W-1-2-9'), (95.5, 'W-1-1-1'))
+        ] + [{'aluminum_type': '7000', 'kind': 'sash', 'role': 'top', 'length': 120, 'item_number': 'W-1-2-9'}]
+
+        lines = consolidate_aluminum(pieces)
+        self.assertEqual(
+            [(line['kind'], line['length'], line['quantity'], line['item_numbers']) for line in lines],
+            [('frame', 120.0, 3, ['W-1-2-9', 'W-1-2-10']), ('frame', 95.5, 1, ['W-1-1-1']),
+             ('sash', 120.0, 1, ['W-1-2-9'])],
+        )
+        self.assertEqual(sum(line['quantity'] for line in lines), len(pieces))
+
+    def test_identical_panes_merge_with_their_totals(self):
+        pane = {'glass_type': 'transparent', 'height': Decimal('100.00'), 'width': Decimal('80.40'),
+                'area': Decimal('0.80'), 'cost': Decimal('96.48')}
+        panes = [dict(pane, item='Window W-10'), dict(pane, item='Window W-9'), dict(pane, item='Window W-9'),
+                 dict(pane, width=Decimal('80.41'), item='Door D-1')]
+
+        lines = consolidate_glass(panes)
+        self.assertEqual(
+            [(line['width'], line['quantity'], line['total_area'], line['total_cost'], line['items']) for line in lines],
+            [(Decimal('80.41'), 1, Decimal('0.80'), Decimal('96.48'), ['Door D-1']),
+             (Decimal('80.40'), 3, Decimal('2.40'), Decimal('289.44'), ['Window W-9', 'Window W-10'])],
+        )
+
+    def test_short_number_list(self):
+        numbers = [f'W-{n}' for n in range(1, 12)]
+        self.assertEqual(short_number_list([]), '')
+        self.assertEqual(short_number_list(numbers[:8]), 'W-1, W-2, W-3, W-4, W-5, W-6, W-7, W-8')
+        self.assertEqual(short_number_list(numbers), 'W-1, W-2, W-3, W-4, W-5, W-6, W-7, W-8 (+3 more)')
+        self.assertEqual(short_number_list(numbers, limit=2), 'W-1, W-2 (+9 more)')
+
+
+def glass_panes(seed, count, glass_types=('transparent', 'anti_sun')):
+    rng = random.Random(seed)
+    return [
+        {'glass_id': k, 'item': f'Window {k}', 'glass_type': rng.choice(glass_types),
+         'width': rng.randint(30, 160), 'height': rng.randint(40, 200)}
+        for k in range(count)
+    ]
+
+
+class GlassNestingTests(SimpleTestCase):
+    def test_exact_grid_fills_sheets_without_waste(self):
+        panes = [{'glass_id': k, 'item': f'W{k}', 'glass_type': 'transparent', 'width': 107, 'height': 75}
+                 for k in range(18)]
+        plan, = nest_glass(panes, {'default': [(321, 225)]})
+        self.assertEqual(plan['sheet_count'], 2)
+        self.assertEqual(plan['waste_percent'], 0)
+
+    def test_quality_against_area_estimate(self):
+        # Pinned for this input: a change that needs more sheets is a regression
+        plans = {plan['glass_type']: plan for plan in nest_glass(glass_panes(7, 300))}
+        self.assertEqual(plans['anti_sun']['sheet_count'], 26)
+        self.assertEqual(plans['transparent']['sheet_count'], 25)
+        for plan in plans.values():
+            naive = ceil(plan['pane_area'] / (plan['sheet_width'] * plan['sheet_height'] / 10000))
+            self.assertLessEqual(plan['sheet_count'], naive + 2)
+            self.assertLessEqual(plan['waste_percent'], 11)
+
+    def test_layouts_stay_on_the_sheet_and_never_overlap(self):
+        plan, = nest_glass(glass_panes(3, 120, glass_types=('transparent',)))
+        self.assertEqual(sum(len(sheet['panes']) for sheet in plan['sheets']), 120)
+        for sheet in plan['sheets']:
+            boxes = [(p['x'], p['y'], p['x'] + p['width'], p['y'] + p['height']) for p in sheet['panes']]
+            for n, (x0, y0, x1, y1) in enumerate(boxes):
+                self.assertTrue(0 <= x0 and 0 <= y0 and x1 <= plan['sheet_width'] and y1 <= plan['sheet_height'])
+                for a0, b0, a1, b1 in boxes[n + 1:]:
+                    self.assertTrue(x1 <= a0 or a1 <= x0 or y1 <= b0 or b1 <= y0)
+
+    def test_panes_without_area_are_not_nested(self):
+        panes = glass_panes(4, 10, glass_types=('transparent',)) + [
+            {'glass_id': 98, 'item': 'Window 98', 'glass_type': 'transparent', 'width': 0, 'height': 90},
+            {'glass_id': 99, 'item': 'Window 99', 'glass_type': 'shadowed', 'width': 80, 'height': -5},
+        ]
+        plans = {plan['glass_type']: plan for plan in nest_glass(panes)}
+        self.assertEqual(plans['transparent']['pane_count'], 10)
+        self.assertEqual([pane['glass_id'] for pane in plans['transparent']['invalid']], [98])
+        self.assertEqual(plans['shadowed']['sheet_count'], 0)
+        self.assertEqual([pane['glass_id'] for pane in plans['shadowed']['invalid']], [99])
+        with self.assertRaises(ValueError):
+            guillotine_pack([(100, 0)], 3210, 2250)
+
+
+class FramingTests(SimpleTestCase):
+    def test_splices_overlap_and_leave_no_short_pieces(self):
+        bar, overlap, minimum = 30000, SPLICE_OVERLAP * 100, MIN_PIECE_LENGTH * 100  # 1/100 cm
+        for length in range(30001, 150000, 137):
+            whole, cuts = splice(length, bar)
+            joints = whole + len(cuts) - 1
+            self.assertEqual(whole * bar + sum(cuts), length + joints * overlap)
+            self.assertTrue(all(minimum <= cut <= bar for cut in cuts), (length, cuts))
+        self.assertEqual(splice(12000, bar), (0, [12000]))
+
+    def test_tall_wall_studs_are_buildable(self):
+        # 3.2 m studs from 3 m bars: a 20 cm top-up can't be lapped, so 2.9 m + 0.6 m
+        wall = {'kind': 'wall', 'item': 'Wall 1', 'stud_thickness': '70', 'width': 120, 'height': 320}
+        plans = {plan['profile_type']: plan for plan in plan_framing([wall], {('stud', '70'): [3.0]})}
+        studs = plans['stud']
+        cuts = [cut for line in studs['bars'] for cut in line['cuts'] for _ in range(line['quantity'])]
+        self.assertEqual(studs['piece_count'], 4)
+        self.assertEqual(sorted(cuts), [60.0] * 4 + [290.0] * 4)
+        self.assertEqual(studs['bar_count'], 5)  # a 2.9 m cut per bar, the four 0.6 m from one more
+
+
+    def test_bars_too_short_to_splice_are_skipped(self):
+        # 0.3 m is all lap; 0.9 m is one lap plus one minimum piece, nothing to spare
+        with self.assertRaises(ValueError):
+            splice(32000, (SPLICE_OVERLAP + MIN_PIECE_LENGTH) * 100)
+        wall = {'kind': 'wall', 'item': 'Wall 1', 'stud_thickness': '70', 'width': 120, 'height': 320}
+        for listed in ([0.3], [0.2, 0.9], []):
+            plans = plan_framing([wall], {('stud', '70'): listed, ('track', '70'): listed})
+            self.assertEqual({plan['bar_length'] for plan in plans}, {DEFAULT_BAR_LENGTH}, listed)
+        plans = plan_framing([wall], {('stud', '70'): [0.3, 3.6]})
+        self.assertEqual({plan['profile_type']: plan['bar_length'] for plan in plans}, {'stud': 3.6, 'track': 3.0})
+
+class PdfRenderTests(SimpleTestCase):
+    def test_long_tables_break_across_pages(self):
+        rows = [[f'Window {n}', 'side', f'{n % 300} cm', n % 7] for n in range(600)]
+        pdf = render_pdf('Aluminum', [('Frames', ['Item', 'Part', 'Length', 'Qty'], rows)]).read()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        # Some 50 rows fit an A4 page under the title
+        self.assertGreater(len(re.findall(rb'/Type /Page\b', pdf)), 10)
+
+    def test_hebrew_runs_are_drawn_right_to_left(self):
+        # Latin text is left alone; Hebrew runs are reversed, the Latin inside them is not
+        self.assertEqual(shape('Side 120 cm'), 'Side 120 cm')
+        self.assertEqual(shape('Side (שולב)'), 'Side (בלוש)')
+        self.assertEqual(shape('חלון W-1'), 'W-1 ןולח')
+        self.assertEqual(shape(42), '42')
+
+
+def write_export(path, data):
+    # A picklable make() for stream_zip(), run in the export pool
+    with open(path, 'wb') as export:
+        export.write(data)
+    return path
+
+
+class PdfExportTests(TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.base_dir.cleanup)
+        # Stored PDFs go under BASE_DIR/contractors
+        stored_under = override_settings(BASE_DIR=self.base_dir.name)
+        stored_under.enable()
+        self.addCleanup(stored_under.disable)
+
+        contractor = make_contractor()
+        self.project = make_project(contractor)
+        ingest_aluminum_items(self.project, parse_aluminum_post(aluminum_form(6), {}))
+        self.client.force_login(contractor)
+        self.url = f'/export/aluminum/{self.project.id}/'
+
+    def no_render(self):
+        # A stored PDF must be served as is
+        return mock.patch.dict(views.PROJECT_PDF_EXPORTS, {'aluminum': mock.Mock(side_effect=AssertionError)})
+
+    def test_first_download_renders_and_stores(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertTrue(response['ETag'])
+        self.assertTrue(response['Last-Modified'])
+
+    def test_unchanged_export_is_served_without_rendering(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.no_render():
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_changed_project_gets_a_new_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        frame = WindowFrame.objects.filter(window__project=self.project).first()
+        frame.top += 10
+        frame.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_outlives_the_process_cache(self):
+        # Another worker, or this one after a restart, computes the same digest
+        etag = self.client.get(self.url)['ETag']
+        cache.clear()
+        with self.no_render():
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_glass_price_change_gets_a_new_etag(self):
+        url = f'/export/glass/{self.project.id}/'
+        etag = self.client.get(url)['ETag']
+        company = Company.objects.create(name='Company', code='12345', contractor=self.project.contractor)
+        GlassPrice.objects.create(contractor=self.project.contractor, company=company, glass_type='transparent',
+                                  price_per_m2='120.00')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ZipStreamTests(SimpleTestCase):
+    def test_archive_has_every_entry(self):
+        with tempfile.TemporaryDirectory() as folder:
+            entries = []
+            for n in range(3):
+                path = os.path.join(folder, f'stored_{n}.pdf')
+                write_export(path, b'stored %d' % n * 5000)
+                entries.append((f'stored_{n}.pdf', path, None))
+            # Not made yet: drawn in the export pool
+            for n in range(2):
+                path = os.path.join(folder, f'new_{n}.pdf')
+                entries.append((f'new_{n}.pdf', path, partial(write_export, path, b'new %d' % n * 5000)))
+
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip(entries, workers=2))))
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sorted(archive.namelist()), sorted(name for name, _, _ in entries))
+            for name, path, _ in entries:
+                with open(path, 'rb') as export:
+                    self.assertEqual(archive.read(name), export.read())
+
+
+class WorkerLogTests(SimpleTestCase):
+    def test_wage_change_gets_a_new_digest(self):
+        reports = [
+            {'worker_id': 1, 'year': 2026, 'month': 2, 'total_days': 18, 'total_hours': 151.5, 'payroll_file': ''},
+            {'worker_id': 1, 'year': 2026, 'month': 3, 'total_days': 20, 'total_hours': 168.0, 'payroll_file': 'p.pdf'},
+        ]
+        worker = CustomUser(id=1, username='worker', user_type='worker', hourly_wage=Decimal('45.00'))
+        _, digest, _ = worker_log(worker, reports, 'Company', 'contractor')
+        self.assertEqual(worker_log(worker, reports, 'Company', 'contractor')[1], digest)
+
+        worker.hourly_wage = Decimal('47.50')
+        self.assertNotEqual(worker_log(worker, reports, 'Company', 'contractor')[1], digest)
+
+
+class TokenCacheTests(SimpleTestCase):
+    def test_user_index_follows_puts_and_evictions(self):
+        tokens = _TokenCache(size=3, ttl=300)
+        for key, user_id in (('a', 1), ('b', 2), ('c', 1), ('d', 1)):
+            tokens.put(key, TokenUser(user_id, 'worker', None))
+        # 'a' was least recently used and went out with the fourth token
+        self.assertIsNone(tokens.get('a'))
+        self.assertEqual(tokens.user_keys, {1: {'c', 'd'}, 2: {'b'}})
+
+        tokens.discard_user(1)
+        self.assertEqual(list(tokens.entries), ['b'])
+        self.assertEqual(tokens.user_keys, {2: {'b'}})
+        tokens.discard('b')
+        self.assertEqual((tokens.entries, tokens.user_keys), ({}, {}))
+
+
+class SupplierTokenApiTests(TestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(username='supplier', password='x', user_type='supplier')
+        response = self.client.post('/api/supplier/token-login/', {'username': 'supplier', 'password': 'x'},
+                                    content_type='application/json')
+        self.token = response.json()['token']
+
+    def test_token_from_login_needs_no_lookup(self):
+        # One query per inventory table, none for the token or the supplier
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/supplier/inventory/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_other_user_types_are_turned_down(self):
+        token = Token.objects.create(user=make_contractor())
+        response = self.client.get('/api/supplier/inventory/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 403)
+
+    def test_logged_out_token_is_invalid(self):
+        response = self.client.post('/api/supplier/token-logout/', {'token': self.token},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/supplier/inventory/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(response.status_code, 401)
+
+
+class ClockSyncApiTests(TestCase):
+    def test_body_that_is_not_an_object_is_turned_down(self):
+        for body in ('[]', '[{"token": "x"}]', '"token"', '7'):
+            response = self.client.post('/api/worker-clock-sync/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+            self.assertEqual(response.json()['message'], 'JSON object required')
+
+
+class ClockInRaceTests(TransactionTestCase):
+    # Two connections writing at once; SQLite's in-memory test database allows only one
+    @skipUnlessDBFeature('test_db_allows_multiple_connections')
+    def test_two_taps_at_once_give_one_clock_in(self):
+        worker = CustomUser.objects.create_user(username='worker', user_type='worker')
+        both_ready = threading.Barrier(2)
+        results = []
+
+        def tap():
+            try:
+                both_ready.wait()
+                results.append(clock_in(worker.id, '32.1', '34.8'))
+            except Exception as error:
+                results.append((None, repr(error)))
+            finally:
+                connections.close_all()
+
+        taps = [threading.Thread(target=tap) for _ in range(2)]
+        for thread in taps:
+            thread.start()
+        for thread in taps:
+            thread.join()
+
+        self.assertEqual(sorted(error or 'clocked in' for _, error in results),
+                         ['You have already clocked in today', 'clocked in'])
+        self.assertEqual(Attendance.objects.filter(user=worker).count(), 1)
+
+
+class AttendanceDayTests(TestCase):
+    def test_day_after_local_midnight_is_the_new_day(self):
+        # 22:30 UTC on 9 March is 00:30 on the 10th in Jerusalem (UTC+2)
+        worker = CustomUser.objects.create_user(username='worker', user_type='worker')
+        moment = datetime.datetime(2026, 3, 9, 22, 30, tzinfo=datetime.timezone.utc)
+        day = datetime.date(2026, 3, 10)
+        self.assertEqual(attendance_date(moment), day)
+
+        attendance, _ = clock_in(worker.id, moment=moment)
+        self.assertEqual(attendance.date, day)
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            self.assertEqual(Attendance(user=worker).date, day)
+            self.assertEqual(attendance_date(), day)
+
+        # A clock-out synced later finds the same day
+        results = sync_clock_events(worker.id, [
+            {'key': 'out', 'type': 'clock_out', 'timestamp': '2026-03-10T06:30:00+00:00'},
+        ])
+        self.assertEqual(results[0]['status'], 'applied')
+        self.assertEqual(list(Attendance.objects.values_list('date', 'flag')), [(day, 2)])
+        self.assertEqual(month_totals(worker.id, 2026, 3), (1, 8))
+
+
+class AttendanceMonthTests(TestCase):
+    def setUp(self):
+        self.worker = CustomUser.objects.create_user(username='worker', user_type='worker')
+
+    def at(self, day, hour):
+        return datetime.datetime(2026, 3, day, hour, tzinfo=datetime.timezone.utc)
+
+    def assert_matches_recount(self):
+        stored = sorted(AttendanceMonth.objects.values_list('user_id', 'year', 'month', 'total_days', 'total_hours'))
+        counted = sorted((m.user_id, m.year, m.month, m.total_days, m.total_hours) for m in attendance_month_rows())
+        self.assertEqual([row[:4] for row in stored], [row[:4] for row in counted])
+        for stored_row, counted_row in zip(stored, counted):
+            self.assertAlmostEqual(stored_row[4], counted_row[4], places=2)
+
+    def test_rollup_matches_a_recount(self):
+        clock_in(self.worker.id, moment=self.at(2, 7))
+        self.assert_matches_recount()
+        clock_out(self.worker.id, moment=self.at(2, 15))
+        self.assert_matches_recount()
+
+        # Days queued offline, one of them in the month before
+        events = [
+            {'key': 'a', 'type': 'clock_in', 'timestamp': '2026-03-03T06:30:00+00:00'},
+            {'key': 'b', 'type': 'clock_out', 'timestamp': '2026-03-03T14:45:00+00:00'},
+            {'key': 'c', 'type': 'clock_in', 'timestamp': '2026-02-27T08:00:00+00:00'},
+            {'key': 'd', 'type': 'clock_out', 'timestamp': '2026-02-27T12:00:00+00:00'},
+            {'key': 'e', 'type': 'clock_in', 'timestamp': '2026-03-04T07:00:00+00:00'},
+        ]
+        results = sync_clock_events(self.worker.id, events)
+        self.assertEqual({result['status'] for result in results}, {'applied'})
+        self.assert_matches_recount()
+        self.assertEqual(
+            list(AttendanceMonth.objects.order_by('month').values_list('month', 'total_days')), [(2, 1), (3, 2)]
+        )
+
+        # Sent again, nothing is counted twice
+        sync_clock_events(self.worker.id, events)
+        self.assert_matches_recount()
+
+        out = io.StringIO()
+        call_command('rebuild_attendance_months', '--check', stdout=out)
+        self.assertIn('0 out of date', out.getvalue())
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from .models import CustomUser
+
+
+# Tokens remembered per process, least recently used dropped first
+TOKEN_CACHE_SIZE = 10000
+
+# A token deleted in another process keeps working here for at most this long
+TOKEN_CACHE_TTL = 300  # seconds
+
+TokenUser = namedtuple('TokenUser', 'id user_type company_id')
+
+
+class _TokenCache:
+    # Token key -> (TokenUser, expiry), plus user id -> its keys so a
+    # user's tokens are dropped without a scan. Requests run in threads, so
+    # every access holds the lock; they are all dict and set operations.
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.user_keys = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def _drop(self, key):
+        # Caller holds the lock
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            keys = self.user_keys[entry[0].id]
+            keys.discard(key)
+            if not keys:
+                del self.user_keys[entry[0].id]
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._drop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, user):
+        with self.lock:
+            self._drop(key)
+            self.entries[key] = (user, time.monotonic() + self.ttl)
+            self.user_keys[user.id].add(key)
+            while len(self.entries) > self.size:
+                self._drop(next(iter(self.entries)))
+
+    def discard(self, key):
+        with self.lock:
+            self._drop(key)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for key in self.user_keys.pop(user_id, ()):
+                del self.entries[key]
+
+
+_cache = _TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
+def token_user(key):
+    """
+    The (id, user_type, company_id) of the user a token belongs to, or None
+    for an unknown token. Known tokens are answered from memory; a miss is
+    one query for the token and its user together.
+
+    Deleting a token or changing its user clears it in this process only.
+    Other processes keep their cached answer until it expires, so there a
+    logged-out token or an old user_type/company works for up to
+    TOKEN_CACHE_TTL (300 s).
+    """
+    if not key:
+        return None
+
+    user = _cache.get(key)
+    if user is None:
+        row = Token.objects.filter(key=key).values_list('user_id', 'user__user_type', 'user__company_id').first()
+        if row is None:
+            return None
+        user = TokenUser(*row)
+        _cache.put(key, user)
+    return user
+
+
+def remember_token(key, user):
+    """Cache a token just handed out at login, so the app's first call needs no lookup."""
+    _cache.put(key, TokenUser(user.id, user.user_type, user.company_id))
+
+
+def forget_token(key):
+    """Drop a deleted token (a logout) from this process's cache."""
+    _cache.discard(key)
+
+
+def forget_user_tokens(user_id):
+    """Drop the tokens of a user whose user_type or company may have changed."""
+    _cache.discard_user(user_id)
+
+
+def forget_deleted_token(sender, instance, **kwargs):
+    # worker_logout_api, api_supplier_token_logout, the admin or a deleted user
+    forget_token(instance.key)
+
+
+def forget_changed_user(sender, instance, update_fields=None, **kwargs):
+    # Logging in only stamps last_login, nothing token_user() returns
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        forget_user_tokens(instance.pk)
+
+
+post_delete.connect(forget_deleted_token, sender=Token)
+post_save.connect(forget_changed_user, sender=CustomUser)
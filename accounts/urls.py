@@ -56,6 +56,7 @@ urlpatterns = [
 
     path('projects/<int:project_id>/add-drywall-room/', views.add_drywall_room, name='add_drywall_room'),
     path('materials/', views.materials_page, name='materials_page'),
+    path('materials/<int:project_id>/record-cuts/', views.record_cuts, name='record_cuts'),
     path('projects/all/', views.project_list_view, name='all_projects_nested'),
 
     path('worker/work/', views.worker_work_page, name='worker_work_page'),
@@ -63,6 +64,8 @@ urlpatterns = [
     path('export/aluminum/<int:project_id>/', views.export_aluminum_materials_pdf, name='export_aluminum_materials_pdf'),
     path('export/glass/<int:project_id>/', views.export_glass_materials_pdf, name='export_glass_materials_pdf'),
     path('export/worker-log/<int:worker_id>/', views.export_worker_log_pdf, name='export_worker_log_pdf'),
+    path('export/worker-logs/', views.export_company_worker_logs, name='export_company_worker_logs'),
+    path('export/all/', views.export_all_pdfs_zip, name='export_all_pdfs_zip'),
     path('contractor/worker/<int:worker_id>/update-wage/', views.update_worker_wage, name='update_worker_wage'),
     path('supplier/add-screw/', views.add_screw, name='add_screw'),
     path('supplier/add-profile-set/', views.add_profile_set, name='add_profile_set'),
@@ -107,6 +110,7 @@ urlpatterns = [
     path('api/worker-logout/', api_views.worker_logout_api, name='worker_logout_api'),
     path('api/worker-clock-in/', api_views.clock_in_api, name='worker_clock_in_api'),
     path('api/worker-clock-out/', api_views.clock_out_api, name='worker_clock_out_api'),
+    path('api/worker-clock-sync/', api_views.clock_sync_api, name='worker_clock_sync_api'),
     path('api/messages/send/', api_views.send_message_api, name='send_message_api'),
     path('api/messages/inbox/', api_views.inbox_api, name='inbox_api'),
     path('api/messages/<int:message_id>/reply/', api_views.reply_message_api, name='reply_message_api'),
@@ -114,6 +118,11 @@ urlpatterns = [
     path('api/messages/sent/', api_views.sent_messages_api, name='sent_messages_api'),
     path('api/worker/work-page/', api_views.worker_work_page_api, name='worker_work_page_api'),
     path('api/worker-home/', api_views.worker_home_api, name='worker_home_api'),
+    path('api/aluminum/preview/', api_views.aluminum_preview_api, name='aluminum_preview_api'),
+    path('api/projects/<int:project_id>/glass-nesting/', api_views.glass_nesting_api, name='glass_nesting_api'),
+    path('api/projects/<int:project_id>/drywall-layout/', api_views.drywall_layout_api, name='drywall_layout_api'),
+    path('api/projects/<int:project_id>/framing/', api_views.framing_api, name='framing_api'),
+    path('api/company/materials/', api_views.company_materials_api, name='company_materials_api'),
 
     #supplier api urls*****
     path('api/supplier/login/',supplier_views.api_supplier_login, name='api_supplier_login'),
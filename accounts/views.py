@@ -1,26 +1,14 @@
-import traceback
 import uuid
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
 from collections import defaultdict
-from django.db import models, transaction
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate
-from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import mm  # Add to your existing cm import
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from functools import partial
+from django.db import transaction
 from .forms import ScrewForm, ProfileSetForm, MetalProfileForm, DrywallBoardForm, OrderStatusUpdateForm, \
     DeliveryDateForm
 from .models import Screw, ProfileSet, MetalProfile, DrywallBoard, Order, OrderItem, \
     generate_monthly_reports_from_attendance, PasswordResetCode, DrywallMaterial
-import math
 import os
-from math import ceil
-from decimal import Decimal, ROUND_UP
 from django.utils.timezone import now
-from django.http import HttpResponse, HttpResponseForbidden, FileResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
@@ -43,7 +31,7 @@ from .models import Project
 from django.shortcuts import get_object_or_404, redirect
 from .models import Window, WindowSash, Glass
 from django.forms import modelformset_factory
-from .models import Project, Glass, Window, WindowFrame, WindowSash, Door, DoorFrame, DoorSash,Company
+from .models import Project, Glass, Window, WindowSash, Door, Company
 from django.shortcuts import render, redirect
 from .forms import SignUpForm
 from .models import Company
@@ -56,17 +44,31 @@ from .forms import (
 from django.contrib.auth.hashers import make_password
 from datetime import date
 import calendar
-from django.db.models import Sum
 from .forms import PayrollUploadForm
 from django.contrib.auth.models import User
 from django.forms import formset_factory, modelformset_factory
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
 from django.conf import settings
 from django.forms import modelformset_factory
 from twilio.rest import Client
 
+from .aluminum_ingest import parse_aluminum_post, ingest_aluminum_items
+from .clock import attendance_date, attendance_page, clock_in, clock_out, month_totals
+from .cut_lists import consolidate_aluminum, consolidate_glass, short_number_list
+from .cutting import aluminum_pieces, plan_cuts, bars_per_role
+from .drywall import project_drywall_materials
+from .drywall_layout import project_board_layout
+from .framing import project_framing
+from .glass_nesting import project_glass_nesting
+from .glass_pricing import detailed_glass_materials, glass_totals_by_type, load_glass_prices
+from .material_totals import get_drywall_totals
+from .materials import load_aluminum_items, aluminum_profile_totals
+from .materials_cache import cached_materials
+from .payroll_pdfs import REPORT_FIELDS, company_worker_logs, worker_log
+from .pdf_cache import cached_pdf_response, pdf_digest, stored_pdf, stored_pdf_path
+from .pdf_tables import pdf_response, render_pdf
+from .remnants import project_company_id, load_remnants, store_offcuts
+from .zip_stream import stream_zip
+
 
 
 RoomFormSet = modelformset_factory(Room, form=RoomForm, extra=1)
@@ -268,27 +270,24 @@ def home_page(request):
 @login_required
 def worker_page(request):
     user = request.user
-    now = timezone.now()
-    current_month = now.month
-    current_year = now.year
-
-    # Filter attendance for the current month
-    monthly_attendance = Attendance.objects.filter(
-        user=user,
-        date__year=current_year,
-        date__month=current_month
-    ).order_by('-date')
+    today = attendance_date()
 
-    # Count only fully completed days (flag = 2)
-    total_days = monthly_attendance.filter(flag=2).count()
+    # Completed days and hours of the current month, kept up to date at every clock-out
+    total_days, total_hours = month_totals(user.id, today.year, today.month)
 
-    # Sum total_hours for all completed days
-    total_hours = monthly_attendance.filter(flag=2).aggregate(
-        total=models.Sum('total_hours')
-    )['total'] or 0
+    # Today's status comes from the latest day; the records table only when asked for (?page=N)
+    latest = Attendance.objects.filter(user=user).order_by('-date').first()
+    page = request.GET.get('page', '')
+    attendances, has_next = None, False
+    if page:
+        page = int(page) if page.isdigit() and int(page) > 0 else 1
+        attendances, has_next = attendance_page(user.id, page)
 
     context = {
-        'attendances': monthly_attendance,
+        'latest': latest,
+        'attendances': attendances,
+        'page': page,
+        'has_next': has_next,
         'total_days': total_days,
         'total_hours': round(total_hours, 2),
         'now': now
@@ -366,65 +365,26 @@ def create_company_view(request):
 
 @login_required
 def clock_in_view(request):
-    user = request.user
-    today = timezone.now().date()  # Get today's date
+    # Coordinates come from the request (later from app or form)
+    attendance, error = clock_in(request.user.id, request.POST.get('latitude'), request.POST.get('longitude'))
 
-    # Get coordinates from request (later from app or form)
-    lat = request.POST.get('latitude')
-    lon = request.POST.get('longitude')
-
-    last_attendance = Attendance.objects.filter(user=user).order_by('-date').first()
-
-    if last_attendance and last_attendance.date == today and last_attendance.clock_in:
-        messages.warning(request, "⚠️ You have already clocked in today.")
+    if error:
+        messages.warning(request, f"⚠️ {error}.")
     else:
-        attendance, created = Attendance.objects.get_or_create(user=user, date=today)
-
-        if created or not attendance.clock_in:
-            attendance.clock_in = timezone.now()
-            attendance.clock_in_latitude = lat if lat else None
-            attendance.clock_in_longitude = lon if lon else None
-            attendance.flag = 1
-            attendance.save()
-
-            messages.success(request, f"✅ Clocked in at {attendance.clock_in.strftime('%H:%M:%S')}")
-        else:
-            messages.warning(request, "⚠️ You have already clocked in today.")
+        messages.success(request, f"✅ Clocked in at {attendance.clock_in.strftime('%H:%M:%S')}")
 
     return redirect('worker_page')
 
 
 @login_required
 def clock_out_view(request):
-    user = request.user
-    now = timezone.now()
-    today = now.date()
-
-    # Get coordinates from request
-    lat = request.POST.get('latitude')
-    lon = request.POST.get('longitude')
-
-    try:
-        attendance = Attendance.objects.get(user=user, date=today)
-    except Attendance.DoesNotExist:
-        messages.error(request, "⚠️ You must clock in before clocking out.")
-        return redirect('worker_page')
-
-    if attendance.flag == 1:
-        attendance.clock_out = now
-        attendance.clock_out_latitude = lat if lat else None
-        attendance.clock_out_longitude = lon if lon else None
-
-        duration = now - attendance.clock_in
-        attendance.total_hours = round(duration.total_seconds() / 3600, 2)
-        attendance.flag = 2
-        attendance.save()
+    attendance, error = clock_out(request.user.id, request.POST.get('latitude'), request.POST.get('longitude'))
 
-        messages.success(request, f"✅ Clocked out at {now.strftime('%H:%M:%S')} on {now.strftime('%d/%m/%Y')}. Total worked: {attendance.total_hours:.2f} hours.")
-    elif attendance.flag == 2:
-        messages.warning(request, "⚠️ You have already clocked out today.")
+    if error:
+        messages.warning(request, f"⚠️ {error}")
     else:
-        messages.error(request, "⚠️ Cannot clock out without clocking in.")
+        now = attendance.clock_out
+        messages.success(request, f"✅ Clocked out at {now.strftime('%H:%M:%S')} on {now.strftime('%d/%m/%Y')}. Total worked: {attendance.total_hours:.2f} hours.")
 
     return redirect('worker_page')
 
@@ -455,34 +415,8 @@ def inbox_view(request):
     return render(request, 'accounts/inbox.html', {
         'messages_received': messages_received
     })
-@login_required
-def clock_in_view(request):
-    user = request.user
-    today = timezone.now().date()  # Get today's date
-
-    # Get coordinates from request (later from app or form)
-    lat = request.POST.get('latitude')
-    lon = request.POST.get('longitude')
 
-    last_attendance = Attendance.objects.filter(user=user).order_by('-date').first()
-
-    if last_attendance and last_attendance.date == today and last_attendance.clock_in:
-        messages.warning(request, "⚠️ You have already clocked in today.")
-    else:
-        attendance, created = Attendance.objects.get_or_create(user=user, date=today)
 
-        if created or not attendance.clock_in:
-            attendance.clock_in = timezone.now()
-            attendance.clock_in_latitude = lat if lat else None
-            attendance.clock_in_longitude = lon if lon else None
-            attendance.flag = 1
-            attendance.save()
-
-            messages.success(request, f"✅ Clocked in at {attendance.clock_in.strftime('%H:%M:%S')}")
-        else:
-            messages.warning(request, "⚠️ You have already clocked in today.")
-
-    return redirect('worker_page')
 def reply_message_view(request, message_id):
     original = Message.objects.get(id=message_id)
     form = MessageForm(initial={'recipient_username': original.sender.username})
@@ -876,172 +810,12 @@ def contractor_company_view(request):
 def add_aluminum_item(request, project_id):
     project = get_object_or_404(Project, id=project_id)
 
-    # Constants per aluminum type
-    ALUMINUM_CONSTANTS = {
-        # --- Sliding windows ---
-        "1700": {"GIRTH": 1.5, "DEPTH": 2,   "FRAME_INSIDE": 1,   "PROFILE_WIDTH": 1.2},
-        "7000": {"GIRTH": 2.0, "DEPTH": 2.5, "FRAME_INSIDE": 1.2, "PROFILE_WIDTH": 1.5},
-        "7300": {"GIRTH": 2.2, "DEPTH": 3,   "FRAME_INSIDE": 1.3, "PROFILE_WIDTH": 1.6},
-        "9000": {"GIRTH": 2.5, "DEPTH": 3.2, "FRAME_INSIDE": 1.4, "PROFILE_WIDTH": 1.8},
-        "9200": {"GIRTH": 2.7, "DEPTH": 3.5, "FRAME_INSIDE": 1.5, "PROFILE_WIDTH": 2.0},
-
-        # --- Multi-bolt windows ---
-        "4400": {"GIRTH": 1.8, "DEPTH": 2.2, "FRAME_INSIDE": 1.1, "PROFILE_WIDTH": 1.3},
-        "4300": {"GIRTH": 1.9, "DEPTH": 2.3, "FRAME_INSIDE": 1.1, "PROFILE_WIDTH": 1.3},
-        "4500": {"GIRTH": 2.0, "DEPTH": 2.4, "FRAME_INSIDE": 1.2, "PROFILE_WIDTH": 1.4},
-        "9400": {"GIRTH": 2.3, "DEPTH": 2.8, "FRAME_INSIDE": 1.3, "PROFILE_WIDTH": 1.5},
-
-        # --- Sliding doors ---
-        "2200": {"GIRTH": 2.0, "DEPTH": 2.5, "FRAME_INSIDE": 1.2, "PROFILE_WIDTH": 1.5},
-        # Reuses 7300, 9200, 9400 (already defined above) for sliding doors too
-
-        # --- Multi-bolt doors ---
-        "2000": {"GIRTH": 1.7, "DEPTH": 2.0, "FRAME_INSIDE": 1.0, "PROFILE_WIDTH": 1.2},
-        # Reuses 4500, 4400 (already defined above) for multi-bolt doors too
-    }
-
     if request.method == 'POST':
-        room_count = int(request.POST.get("room_count", 0))
+        rooms = parse_aluminum_post(request.POST, request.FILES)
+        result = ingest_aluminum_items(project, rooms)
 
-        for i in range(room_count):
-            room_name = request.POST.get(f"room_name_{i}", f"Room {i}")
-            room_file = request.FILES.get(f"room_file_{i}")
-
-            # Create Room
-            room = Room.objects.create(
-                name=room_name,
-                project=project,
-                blueprint=room_file
-            )
-
-            item_count = int(request.POST.get(f'item_count_{i}', 0))
-
-            for j in range(item_count):
-                try:
-                    prefix = f'{i}_{j}'
-                    item_type = request.POST.get(f'item_type_{prefix}')
-                    subtype = request.POST.get(f'subtype_{prefix}')
-                    aluminum_type = request.POST.get(f'aluminum_type_{prefix}')
-                    glass_type = request.POST.get(f'glass_type_{prefix}')
-                    sash_count = int(request.POST.get(f'number_of_sashs_{prefix}', 2))
-
-                    # Load constants for this aluminum type
-                    constants = ALUMINUM_CONSTANTS.get(
-                        aluminum_type,
-                        {"GIRTH": 1, "DEPTH": 1, "FRAME_INSIDE": 1, "PROFILE_WIDTH": 1}
-                    )
-                    GIRTH = constants["GIRTH"]
-                    DEPTH = constants["DEPTH"]
-                    FRAME_INSIDE = constants["FRAME_INSIDE"]
-                    PROFILE_WIDTH = constants["PROFILE_WIDTH"]
-
-                    height_values = [
-                        float(request.POST.get(f'height_left_{prefix}', 0)),
-                        float(request.POST.get(f'height_middle_{prefix}', 0)),
-                        float(request.POST.get(f'height_right_{prefix}', 0)),
-                    ]
-                    width_values = [
-                        float(request.POST.get(f'width_top_{prefix}', 0)),
-                        float(request.POST.get(f'width_middle_{prefix}', 0)),
-                        float(request.POST.get(f'width_bottom_{prefix}', 0)),
-                    ]
-
-                    min_height = min(height_values) if height_values else 0
-                    min_width = min(width_values) if width_values else 0
-
-                    if item_type == 'window':
-                        window_number = f"W-{project.id}-{room.id}-{j}"
-
-                        frame_side = min_height - 1
-                        frame_top = min_width - 1
-                        frame_bottom = min_width - 1
-
-                        sash_side = min_height - FRAME_INSIDE
-                        sash_top_bottom = (min_width - ((sash_count - 1) * GIRTH)) / sash_count
-                        glass_width = sash_top_bottom - DEPTH - 1
-                        glass_height = sash_side - DEPTH - 1
-
-                        window = Window.objects.create(
-                            room=room,
-                            project=project,
-                            window_type=subtype,
-                            aluminum_type=aluminum_type,
-                            number_of_sashs=sash_count,
-                            window_number=window_number
-                        )
-
-                        WindowFrame.objects.create(
-                            window=window,
-                            side=frame_side,
-                            top=frame_top,
-                            bottom=frame_bottom
-                        )
-
-                        for _ in range(sash_count):
-                            glass = Glass.objects.create(
-                                glass_type=glass_type,
-                                height=glass_height,
-                                width=glass_width
-                            )
-                            WindowSash.objects.create(
-                                window=window,
-                                side=sash_side,
-                                top=sash_top_bottom,
-                                bottom=sash_top_bottom,
-                                glass=glass
-                            )
-
-                    elif item_type == 'door':
-                        door_number = f"D-{project.id}-{room.id}-{j}"
-
-                        door = Door.objects.create(
-                            room=room,
-                            project=project,
-                            door_type=subtype,
-                            aluminum_type=aluminum_type,
-                            number_of_sashs=sash_count,
-                            door_number=door_number
-                        )
-
-                        frame_side = min_height - 1
-                        frame_top = min_width - 1
-                        frame_bottom = frame_top if subtype == 'sliding' else None
-
-                        DoorFrame.objects.create(
-                            door=door,
-                            side=frame_side,
-                            top=frame_top,
-                            bottom=frame_bottom
-                        )
-
-                        if subtype == 'multi_bolt':
-                            sash_side = min_height - 1 - PROFILE_WIDTH
-                            sash_top_bottom = (min_width - 1 - (2 * PROFILE_WIDTH)) / sash_count
-                        else:  # sliding
-                            sash_side = min_height - FRAME_INSIDE
-                            sash_top_bottom = (min_width - ((sash_count - 1) * GIRTH)) / sash_count
-
-                        glass_width = sash_top_bottom - DEPTH - 1
-                        glass_height = sash_side - DEPTH - 1
-
-                        for _ in range(sash_count):
-                            glass = Glass.objects.create(
-                                glass_type=glass_type,
-                                height=glass_height,
-                                width=glass_width
-                            )
-                            DoorSash.objects.create(
-                                door=door,
-                                side=sash_side,
-                                top=sash_top_bottom,
-                                bottom=sash_top_bottom,
-                                glass=glass
-                            )
-
-                except Exception as e:
-                    print(f"❌ Error in Room '{room.name}', Item {j}: {e}")
-                    traceback.print_exc()
-                    continue
+        for error in result["errors"]:
+            messages.warning(request, f"⚠️ Room '{error['room']}', item {error['item'] + 1} was skipped: {error['error']}")
 
         return redirect('project_detail', project_id=project.id)
 
@@ -1218,12 +992,9 @@ def add_drywall_room(request, project_id):
         'rooms': rooms
     })
 
-def sliding_window_materials(project_id):
-    # Get all windows and doors for the project
-    sliding_windows = Window.objects.filter(room__project_id=project_id, window_type='sliding')
-    multi_bolt_windows = Window.objects.filter(room__project_id=project_id, window_type='multi_bolt')
-    sliding_doors = Door.objects.filter(room__project_id=project_id, door_type='sliding')
-    multi_bolt_doors = Door.objects.filter(room__project_id=project_id, door_type='multi_bolt')
+def sliding_window_materials(project_id, lock_remnants=False):
+    # Get all windows and doors for the project with their frames and sashes
+    items = load_aluminum_items(project_id)
 
     # Initialize data structures
     frame_data = []
@@ -1241,97 +1012,87 @@ def sliding_window_materials(project_id):
         "side": 0          # שולב
     }
 
-    # Helper function to process items (windows or doors)
-    def process_items(items, item_type):
-        for item in items:
-            # Get frame and sashes based on item type
-            if item_type == 'window':
-                frame = item.window_frame
-                sashes = item.window_sashes.all()
-                item_number = item.window_number
-                item_subtype = item.window_type
-            else:  # door
-                frame = item.door_frame
-                sashes = item.door_sashes.all()
-                item_number = item.door_number
-                item_subtype = item.door_type
-
-            sash_count = sashes.count()
-
-            # --- Frame Processing ---
-            top = float(frame.top or 0)
-            bottom = float(frame.bottom or 0)
-            side = float(frame.side or 0) * 2  # both sides
-
-            frame_data.append({
-                "item_type": item_type,
-                "item_subtype": item_subtype,
-                "item_number": item_number,
-                "top": top,
-                "bottom": bottom,
-                "side": side
-            })
+    counts = {
+        "sliding_windows": 0,
+        "multi_bolt_windows": 0,
+        "sliding_doors": 0,
+        "multi_bolt_doors": 0
+    }
 
-            frame_totals["top"] += top
-            frame_totals["bottom"] += bottom
-            frame_totals["side"] += side
-
-            # --- Sashes Processing ---
-            for i, sash in enumerate(sashes):
-                sash_number = i + 1
-                sash_side_length = float(sash.side or 0)
-                sash_top = float(sash.top or 0)
-                sash_bottom = float(sash.bottom or 0)
-
-                handle_side = 0
-                side_profile = 0
-
-                if item_subtype == 'sliding':
-                    # For sliding: first or last sash is handle-side
-                    if i == 0 or i == sash_count - 1:
-                        handle_side = sash_side_length
-                        side_profile = sash_side_length
-                    else:
-                        side_profile = sash_side_length * 2
-                else:  # multi_bolt
-                    # For multi-bolt: all sashes need handle-side profiles
+    for item in items:
+        item_type = item["item_type"]
+        item_subtype = item["item_subtype"]
+        item_number = item["item_number"]
+        frame = item["frame"]
+        sashes = item["sashes"]
+        sash_count = len(sashes)
+
+        counts[f"{item_subtype}_{item_type}s"] += 1
+
+        # --- Frame Processing ---
+        top = float(frame["top"] or 0)
+        bottom = float(frame["bottom"] or 0)
+        side = float(frame["side"] or 0) * 2  # both sides
+
+        frame_data.append({
+            "item_type": item_type,
+            "item_subtype": item_subtype,
+            "item_number": item_number,
+            "aluminum_type": item["aluminum_type"],
+            "top": top,
+            "bottom": bottom,
+            "side": side
+        })
+
+        frame_totals["top"] += top
+        frame_totals["bottom"] += bottom
+        frame_totals["side"] += side
+
+        # --- Sashes Processing ---
+        for i, sash in enumerate(sashes):
+            sash_number = i + 1
+            sash_side_length = float(sash["side"] or 0)
+            sash_top = float(sash["top"] or 0)
+            sash_bottom = float(sash["bottom"] or 0)
+
+            handle_side = 0
+            side_profile = 0
+
+            if item_subtype == 'sliding':
+                # For sliding: first or last sash is handle-side
+                if i == 0 or i == sash_count - 1:
                     handle_side = sash_side_length
                     side_profile = sash_side_length
+                else:
+                    side_profile = sash_side_length * 2
+            else:  # multi_bolt
+                # For multi-bolt: all sashes need handle-side profiles
+                handle_side = sash_side_length
+                side_profile = sash_side_length
 
-                sash_data.append({
-                    "item_type": item_type,
-                    "item_subtype": item_subtype,
-                    "item_number": item_number,
-                    "sash_number": sash_number,
-                    "top": sash_top,
-                    "bottom": sash_bottom,
-                    "handle_side": handle_side,
-                    "side": side_profile
-                })
+            sash_data.append({
+                "item_type": item_type,
+                "item_subtype": item_subtype,
+                "item_number": item_number,
+                "aluminum_type": item["aluminum_type"],
+                "sash_number": sash_number,
+                "top": sash_top,
+                "bottom": sash_bottom,
+                "handle_side": handle_side,
+                "side": side_profile
+            })
 
-                # Accumulate totals
-                sash_totals["top_bottom"] += sash_top + sash_bottom
-                sash_totals["handle_side"] += handle_side
-                sash_totals["side"] += side_profile
-
-    # Process all item types
-    process_items(sliding_windows, 'window')
-    process_items(multi_bolt_windows, 'window')
-    process_items(sliding_doors, 'door')
-    process_items(multi_bolt_doors, 'door')
-
-    # --- Calculate how many 6-meter bars needed ---
-    frame_bars = {
-        "top": ceil(frame_totals["top"] / 600),
-        "bottom": ceil(frame_totals["bottom"] / 600),
-        "side": ceil(frame_totals["side"] / 600)
-    }
+            # Accumulate totals
+            sash_totals["top_bottom"] += sash_top + sash_bottom
+            sash_totals["handle_side"] += handle_side
+            sash_totals["side"] += side_profile
 
-    sash_bars = {
-        "top_bottom": ceil(sash_totals["top_bottom"] / 600),
-        "handle_side": ceil(sash_totals["handle_side"] / 600),
-        "side": ceil(sash_totals["side"] / 600)
-    }
+    # --- Pack every piece into yard remnants, then 6-meter bars (pieces can't be spliced) ---
+    pieces = aluminum_pieces(frame_data, sash_data)
+    remnants = load_remnants(project_company_id(project_id), pieces, project_id, lock=lock_remnants)
+    cutting_plan = plan_cuts(pieces, remnants=remnants)
+    frame_bars = bars_per_role(cutting_plan, "frame")
+    sash_bars = bars_per_role(cutting_plan, "sash")
 
     return {
         "frame_data": frame_data,
@@ -1340,56 +1101,12 @@ def sliding_window_materials(project_id):
         "sash_data": sash_data,
         "sash_totals": sash_totals,
         "sash_bars": sash_bars,
-        "counts": {
-            "sliding_windows": sliding_windows.count(),
-            "multi_bolt_windows": multi_bolt_windows.count(),
-            "sliding_doors": sliding_doors.count(),
-            "multi_bolt_doors": multi_bolt_doors.count()
-        }
+        "cutting_plan": cutting_plan,
+        "cut_list": consolidate_aluminum(pieces),
+        "counts": counts
     }
 
 
-
-def detailed_glass_materials(project_id):
-    project = Project.objects.get(id=project_id)
-    glass_details = []
-
-    for room in project.rooms.all():
-        # Windows
-        for window in room.windows.all():
-            for sash in window.window_sashes.all():
-                glass = sash.glass
-                if glass:
-                    area = (glass.height * glass.width).quantize(Decimal('0.01'), rounding=ROUND_UP)
-                    cost = (area * glass.price).quantize(Decimal('0.01'), rounding=ROUND_UP) if glass.price else Decimal('0.00')
-                    glass_details.append({
-                        'item': f"Window {window.window_number}",
-                        'glass_type': glass.glass_type,
-                        'height': glass.height,
-                        'width': glass.width,
-                        'area': area,
-                        'price': cost
-                    })
-
-        # Doors
-        for door in room.doors.all():
-            for sash in door.door_sashes.all():
-                glass = sash.glass
-                if glass:
-                    area = (glass.height * glass.width).quantize(Decimal('0.01'), rounding=ROUND_UP)
-                    cost = (area * glass.price).quantize(Decimal('0.01'), rounding=ROUND_UP) if glass.price else Decimal('0.00')
-                    glass_details.append({
-                        'item': f"Door {door.door_number}",
-                        'glass_type': glass.glass_type,
-                        'height': glass.height,
-                        'width': glass.width,
-                        'area': area,
-                        'price': cost
-                    })
-
-    return glass_details
-
-
 def get_worker_logs(worker_id, project_id):
     """
     Return logs for a specific worker and project, for completed attendance days (flag == 2).
@@ -1414,48 +1131,17 @@ def get_worker_logs(worker_id, project_id):
 
     return log_list
 
-def generate_pdf(title, headers, rows, output_path):
-
-    c = canvas.Canvas(output_path, pagesize=A4)
-    width, height = A4
-
-    y = height - 2 * cm
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(2 * cm, y, title)
-    y -= 1 * cm
-
-    c.setFont("Helvetica-Bold", 11)
-    header_line = " | ".join(headers)
-    c.drawString(2 * cm, y, header_line)
-    y -= 0.5 * cm
-    c.setFont("Helvetica", 10)
-
-    for row in rows:
-        line = " | ".join(str(item) for item in row)
-        c.drawString(2 * cm, y, line)
-        y -= 0.5 * cm
-        if y < 2 * cm:
-            c.showPage()
-            y = height - 2 * cm
-            c.setFont("Helvetica", 10)
-
-    c.showPage()
-    c.save()
-
-
-@login_required
-def export_drywall_materials_pdf(request, project_id):
-    project = get_object_or_404(Project, id=project_id, contractor=request.user)
-    walls = Wall.objects.filter(room__project=project)
-    ceilings = Ceiling.objects.filter(room__project=project)
+def _draw_drywall_pdf(project, stream):
+    drywall_data = cached_materials(project.id, 'drywall', lambda: project_drywall_materials(project.id))
 
     rows = []
 
     # Process walls
-    for i, wall in enumerate(walls, start=1):
-        wall_data = calculate_wall_materials(wall)
+    for wall_data in drywall_data:
+        if wall_data['item_type'] != 'wall':
+            continue
         rows.append([
-            f"Wall {i}",
+            f"Wall {wall_data['wall_number']}",
             wall_data['room'],
             f"{wall_data['width']:.2f} m",
             f"{wall_data['height']:.2f} m",
@@ -1470,10 +1156,11 @@ def export_drywall_materials_pdf(request, project_id):
         ])
 
     # Process ceilings
-    for i, ceiling in enumerate(ceilings, start=1):
-        ceiling_data = calculate_wall_materials(ceiling)  # Same function handles both
+    for ceiling_data in drywall_data:
+        if ceiling_data['item_type'] != 'ceiling':
+            continue
         rows.append([
-            f"Ceiling {i}",
+            f"Ceiling {ceiling_data['ceiling_number']}",
             ceiling_data['room'],
             "-",  # No width for ceiling
             "-",  # No height for ceiling
@@ -1502,123 +1189,146 @@ def export_drywall_materials_pdf(request, project_id):
         "Gypsum Boards"
     ]
 
-    # Define output PDF path (in contractor folder)
-    output_path = os.path.join(
-        settings.BASE_DIR,
-        'contractors',
-        request.user.username,
-        'materials',
-        f'drywall_materials_project_{project.project_number}.pdf'
-    )
-
-    generate_pdf(f"Drywall Materials for Project {project.project_number}", headers, rows, output_path)
+    render_pdf(f"Drywall Materials for Project {project.project_number}", [(None, headers, rows)], stream=stream)
 
-    return FileResponse(open(output_path, 'rb'), content_type='application/pdf')
 
 @login_required
-def export_aluminum_materials_pdf(request, project_id):
+def export_drywall_materials_pdf(request, project_id):
     project = get_object_or_404(Project, id=project_id, contractor=request.user)
-    aluminum_data = sliding_window_materials(project)
+    return cached_pdf_response(request, request.user.username, 'materials', *_project_pdf('drywall', project))
 
-    headers = ["Window", "Top Frame", "Bottom Frame", "Side Frame"]
-    rows = []
 
-    # Frame rows
-    for frame in aluminum_data['frame_data']:
-        rows.append([
-            f"Window {frame['window_number']}",
-            f"{frame['top']} cm",
-            f"{frame['bottom']} cm",
-            f"{frame['side']} cm"
-        ])
-    rows.append(["TOTAL", aluminum_data['frame_totals']['top'], aluminum_data['frame_totals']['bottom'], aluminum_data['frame_totals']['side']])
-    rows.append(["BARS NEEDED", aluminum_data['frame_bars']['top'], aluminum_data['frame_bars']['bottom'], aluminum_data['frame_bars']['side']])
+def _draw_aluminum_pdf(project, stream):
+    aluminum_data = cached_materials(project.id, 'aluminum', lambda: sliding_window_materials(project.id))
 
-    headers2 = ["Window", "Sash #", "Top", "Bottom", "Handle Side (צד)", "Side (שולב)"]
+    # One line per identical piece: quantity x length, with the windows it's for
+    headers = ["Profile", "Part", "Length", "Qty", "Windows"]
+    rows = []
     rows2 = []
-
-    # Sash rows
-    for sash in aluminum_data['sash_data']:
-        rows2.append([
-            f"Window {sash['window_number']}",
-            sash['sash_number'],
-            f"{sash['top']} cm",
-            f"{sash['bottom']} cm",
-            f"{sash['handle_side']} cm",
-            f"{sash['side']} cm"
+    for line in aluminum_data['cut_list']:
+        (rows if line['kind'] == 'frame' else rows2).append([
+            line['aluminum_type'],
+            line['role'],
+            f"{line['length']} cm",
+            line['quantity'],
+            short_number_list(line['item_numbers'])
         ])
-    rows2.append(["TOTAL", "", aluminum_data['sash_totals']['top_bottom'], "", aluminum_data['sash_totals']['handle_side'], aluminum_data['sash_totals']['side']])
-    rows2.append(["BARS NEEDED", "", aluminum_data['sash_bars']['top_bottom'], "", aluminum_data['sash_bars']['handle_side'], aluminum_data['sash_bars']['side']])
 
-    output_path = os.path.join(
-        settings.BASE_DIR, 'contractors', request.user.username, 'materials',
-        f'aluminum_materials_project_{project.project_number}.pdf'
-    )
+    # Frame totals
+    rows.append(["TOTAL", "top / bottom / side", f"{aluminum_data['frame_totals']['top']} / {aluminum_data['frame_totals']['bottom']} / {aluminum_data['frame_totals']['side']}", "", ""])
+    rows.append(["BARS NEEDED", "top / bottom / side", f"{aluminum_data['frame_bars']['top']} / {aluminum_data['frame_bars']['bottom']} / {aluminum_data['frame_bars']['side']}", "", ""])
+
+    # Sash totals
+    headers2 = headers
+    rows2.append(["TOTAL", "top+bottom / handle side (צד) / side (שולב)", f"{aluminum_data['sash_totals']['top_bottom']} / {aluminum_data['sash_totals']['handle_side']} / {aluminum_data['sash_totals']['side']}", "", ""])
+    rows2.append(["BARS NEEDED", "top+bottom / handle side (צד) / side (שולב)", f"{aluminum_data['sash_bars']['top_bottom']} / {aluminum_data['sash_bars']['handle_side']} / {aluminum_data['sash_bars']['side']}", "", ""])
+
+    render_pdf(f"Aluminum Materials - Project {project.project_number}", [
+        ("Frame Materials", headers, rows),
+        ("Sash Materials", headers2, rows2),
+    ], stream=stream)
 
-    # Create PDF with two tables
-    c = canvas.Canvas(output_path, pagesize=A4)
-    width, height = A4
-    y = height - 2 * cm
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(2 * cm, y, f"Aluminum Frame Materials - Project {project.project_number}")
-    y -= 1 * cm
-
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(2 * cm, y, " | ".join(headers))
-    y -= 0.6 * cm
-    c.setFont("Helvetica", 10)
-    for row in rows:
-        c.drawString(2 * cm, y, " | ".join(str(x) for x in row))
-        y -= 0.5 * cm
-
-    y -= 1 * cm
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(2 * cm, y, f"Sash Materials")
-    y -= 1 * cm
-
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(2 * cm, y, " | ".join(headers2))
-    y -= 0.6 * cm
-    c.setFont("Helvetica", 10)
-    for row in rows2:
-        c.drawString(2 * cm, y, " | ".join(str(x) for x in row))
-        y -= 0.5 * cm
-
-    c.showPage()
-    c.save()
-
-    return FileResponse(open(output_path, 'rb'), content_type='application/pdf')
 
 @login_required
-def export_glass_materials_pdf(request, project_id):
+def export_aluminum_materials_pdf(request, project_id):
     project = get_object_or_404(Project, id=project_id, contractor=request.user)
-    glass_data = detailed_glass_materials(project_id)
+    return cached_pdf_response(request, request.user.username, 'materials', *_project_pdf('aluminum', project))
 
-    headers = ["Window", "Glass Type", "Height (cm)", "Width (cm)", "Area (m²)", "Price (₪)"]
+
+def _draw_glass_pdf(project, stream):
+    glass_lines = cached_materials(
+        project.id, 'glass_cut_list', lambda: consolidate_glass(detailed_glass_materials(project.id))
+    )
+    glass_totals = cached_materials(project.id, 'glass_totals', lambda: glass_totals_by_type(project.id))
+
+    # One line per identical pane
+    headers = ["Glass Type", "Height (cm)", "Width (cm)", "Qty", "Area (m²)", "Price (₪)", "Items"]
     rows = [
         [
-            g['window_number'],
             g['glass_type'],
             g['height'],
             g['width'],
-            g['area'],
-            g['cost']
+            g['quantity'],
+            g['total_area'],
+            g['total_cost'],
+            short_number_list(g['items'])
         ]
-        for g in glass_data
+        for g in glass_lines
     ]
 
-    output_path = os.path.join(
-        settings.BASE_DIR,
-        'contractors',
-        request.user.username,
-        'materials',
-        f'glass_materials_project_{project.project_number}.pdf'
+    # Totals per glass type
+    for t in glass_totals:
+        rows.append([t['glass_type'], "TOTAL", "", t['panes'], t['area'], t['cost'], ""])
+
+    render_pdf(f"Glass Materials for Project {project.project_number}", [(None, headers, rows)], stream=stream)
+
+
+@login_required
+def export_glass_materials_pdf(request, project_id):
+    project = get_object_or_404(Project, id=project_id, contractor=request.user)
+    return cached_pdf_response(request, request.user.username, 'materials', *_project_pdf('glass', project))
+
+
+# Materials PDFs of a project by kind, and the kinds each project type has
+PROJECT_PDF_EXPORTS = {
+    'aluminum': _draw_aluminum_pdf,
+    'glass': _draw_glass_pdf,
+    'drywall': _draw_drywall_pdf,
+}
+
+PROJECT_TYPE_EXPORTS = {
+    'aluminum': ('aluminum', 'glass'),
+    'drywall': ('drywall',),
+}
+
+# Bump when a _draw_*_pdf changes what it puts on the page, so stored PDFs are drawn again
+PDF_TEMPLATE_VERSION = 1
+
+
+def _pdf_price_rows(kind, project):
+    # Only the glass PDF shows money
+    if kind == 'glass':
+        return sorted(load_glass_prices(project.contractor_id).items())
+    return []
+
+
+def _project_pdf(kind, project):
+    """(file name, content digest, draw) of one materials PDF of a project.
+
+    The digest only hashes what is persisted, so every worker and restart agrees on it:
+    the project's materials_version, the price rows drawn and the template version.
+    """
+    return (
+        f'{kind}_materials_project_{project.project_number}.pdf',
+        pdf_digest(
+            kind, PDF_TEMPLATE_VERSION, project.id, project.project_number, project.materials_version,
+            _pdf_price_rows(kind, project),
+        ),
+        partial(PROJECT_PDF_EXPORTS[kind], project),
     )
 
-    generate_pdf(f"Glass Materials for Project {project.project_number}", headers, rows, output_path)
 
-    return FileResponse(open(output_path, 'rb'), content_type='application/pdf')
+@login_required
+def export_all_pdfs_zip(request):
+    # Every materials PDF of the contractor's projects, or of ?project_id=..&project_id=..
+    projects = Project.objects.filter(contractor=request.user).order_by('id')
+    project_ids = [value for value in request.GET.getlist('project_id') if value.isdigit()]
+    if project_ids:
+        projects = projects.filter(id__in=project_ids)
+
+    entries = []
+    for project in projects:
+        for kind in PROJECT_TYPE_EXPORTS.get(project.project_type, ()):
+            filename, digest, draw = _project_pdf(kind, project)
+            entries.append((
+                f'{project.project_number}/{filename}',
+                stored_pdf_path(request.user.username, 'materials', filename, digest),
+                partial(stored_pdf, request.user.username, 'materials', filename, digest, draw),
+            ))
+
+    response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="materials_{request.user.username}.zip"'
+    return response
 
 
 @login_required
@@ -1627,60 +1337,29 @@ def export_worker_log_pdf(request, worker_id):
     contractor = request.user
     company = contractor.company
 
-    reports = MonthlyReport.objects.filter(worker=worker).order_by('year', 'month')
-
-    save_dir = os.path.join(settings.BASE_DIR, 'contractors', contractor.username, 'workers_log')
-    os.makedirs(save_dir, exist_ok=True)
-
-    filename = f"{worker.username}_log.pdf"
-    file_path = os.path.join(save_dir, filename)
-
-    c = canvas.Canvas(file_path, pagesize=A4)
-    width, height = A4
-    y = height - 2 * cm
-
-    # Header
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(2 * cm, y, "Worker Log Summary")
-    y -= 1 * cm
-
-    c.setFont("Helvetica", 11)
-    c.drawString(2 * cm, y, f"Company: {company.name}")
-    y -= 0.5 * cm
-    c.drawString(2 * cm, y, f"Contractor: {contractor.username}")
-    y -= 0.5 * cm
-    c.drawString(2 * cm, y, f"Worker: {worker.username}")
-    y -= 1 * cm
-
-    # Table header
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(1.5 * cm, y, "Year")
-    c.drawString(3.2 * cm, y, "Month")
-    c.drawString(5 * cm, y, "Days")
-    c.drawString(6.5 * cm, y, "Hours")
-    c.drawString(8.5 * cm, y, "Salary")
-    c.drawString(11.5 * cm, y, "Payroll")
-    y -= 0.5 * cm
-    c.setFont("Helvetica", 10)
-
-    # Rows
-    for report in reports:
-        salary = Decimal(str(report.total_hours)) * worker.hourly_wage
-        c.drawString(1.5 * cm, y, str(report.year))
-        c.drawString(3.2 * cm, y, str(report.month))
-        c.drawString(5 * cm, y, str(report.total_days))
-        c.drawString(6.5 * cm, y, f"{report.total_hours:.2f}")
-        c.drawString(8.5 * cm, y, f"{salary:.2f} ₪")
-        c.drawString(11.5 * cm, y, "✔" if report.payroll_file else "❌")
-        y -= 0.5 * cm
+    reports = MonthlyReport.objects.filter(worker=worker).order_by('year', 'month').values(*REPORT_FIELDS)
+    filename, digest, draw = worker_log(worker, reports, company.name, contractor.username)
+    return cached_pdf_response(request, contractor.username, 'workers_log', filename, digest, draw, as_attachment=True)
+
+
+@login_required
+def export_company_worker_logs(request):
+    # Every worker's log PDF of the company in one ZIP, or only the workers paid for ?year=&month=
+    if request.user.user_type != 'contractor' or request.user.company is None:
+        return HttpResponseForbidden("You are not allowed here.")
+
+    year = request.GET.get('year', '')
+    month = request.GET.get('month', '')
+    year = int(year) if year.isdigit() else None
+    month = int(month) if month.isdigit() else None
 
-        if y < 2 * cm:
-            c.showPage()
-            y = height - 2 * cm
-            c.setFont("Helvetica", 10)
+    logs = company_worker_logs(request.user.company, request.user.username, year, month)
+    entries = [(filename, path, make) for _, filename, path, make in logs]
 
-    c.save()
-    return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=filename)
+    response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+    suffix = f'_{year}_{month:02d}' if year and month else ''
+    response['Content-Disposition'] = f'attachment; filename="workers_log{suffix}.zip"'
+    return response
 
 
 @login_required
@@ -1698,7 +1377,9 @@ def worker_work_page(request):
         project_id = request.GET.get('project_id')
         selected_project = get_object_or_404(Project, id=project_id, workers=user)
 
-        aluminum_data = sliding_window_materials(project_id)
+        aluminum_data = cached_materials(
+            selected_project.id, 'aluminum', lambda: sliding_window_materials(selected_project.id)
+        )
 
     return render(request, 'accounts/worker_work_page.html', {
         'projects': projects,
@@ -1707,89 +1388,29 @@ def worker_work_page(request):
     })
 
 
-def calculate_wall_materials(wall):
-    # Check if it's a wall or ceiling
-    if hasattr(wall, 'width'):  # It's a wall
-        # Convert cm to meters
-        width = float(wall.width) / 100  # Convert cm to meters
-        height = float(wall.height) / 100  # Convert cm to meters
-        area = width * height
-        layers = wall.number_of_layers
-        faces = 2 if wall.double_sided else 1
-        item_type = 'wall'
-    else:  # It's a ceiling
-        area = float(wall.area)  # Already in square meters
-        # Assume square-ish ceiling for calculation purposes
-        width = math.sqrt(area)
-        height = area / width
-        layers = 1  # Ceilings typically have 1 layer
-        faces = 1  # Ceilings are single-sided
-        item_type = 'ceiling'
-
-    board_width = 1.2  # standard gypsum board width in meters
-    board_height = float(wall.board_length)  # comes from board_length
-
-    result = {
-        'item_id': wall.id,
-        'item_type': item_type,
-        'room': wall.room.name,
-        'width': width,
-        'height': height,
-        'area': area,
-        'drywall_type': wall.get_drywall_type_display(),
-        'stud_thickness': wall.get_stud_thickness_display(),
-        'board_length': board_height,
-        'layers': layers,
-        'faces': faces,
-    }
-
-    if item_type == 'wall':
-        # Wall calculations
-        # Tracks (top + bottom)
-        track_length = width * 2
-        result['track_length'] = round(track_length, 2)
-        result['track_count'] = math.ceil(track_length / 3)  # 3m standard track lengths
-
-        # Studs
-        stud_spacing = 0.4  # 40cm spacing
-        stud_count = math.ceil(width / stud_spacing) + 1  # +1 for end stud
-
-        # Calculate how many 3m studs needed based on height
-        studs_per_height = math.ceil(height / 3)
-        total_studs = stud_count * studs_per_height
-
-        result['stud_count'] = total_studs
-        result['hangers'] = 0  # Walls don't need hangers
-
-    else:  # ceiling
-        # Ceiling calculations - your simplified method
-        # Calculate approximate length from square root of area
-        length = math.sqrt(area)
-
-        # Track length = length * 2
-        track_length = length * 2
-        result['track_length'] = round(track_length, 2)
-
-        # Track count = track_length / 3 + 1
-        result['track_count'] = math.ceil(track_length / 3) + 1
-
-        # Stud count = length / 0.4 (every 40cm)
-        stud_count = math.ceil(length / 0.4)
-
-        # Calculate how many 3m studs needed based on ceiling height (assume 2.5m standard)
-        ceiling_height = 2.5  # standard ceiling height in meters
-        studs_per_height = math.ceil(ceiling_height / 3)
-        total_studs = stud_count * studs_per_height
-
-        result['stud_count'] = total_studs
-        result['hangers'] = 0  # Not using hangers in your calculation
+@login_required
+def record_cuts(request, project_id):
+    # The project's aluminum was cut: take used remnants out of the yard, store the new offcuts
+    project = get_object_or_404(Project, id=project_id, contractor=request.user)
 
-    # Boards (same calculation for both)
-    board_area = board_width * board_height
-    board_count = math.ceil(area / board_area) * layers * faces
-    result['gypsum_boards'] = board_count
+    if request.method == 'POST':
+        company_id = project_company_id(project.id)
+        if company_id is None:
+            messages.warning(request, "⚠️ Create a company first to keep offcuts.")
+        else:
+            with transaction.atomic():
+                # A second post (double click, resubmit) waits on this lock, then finds the cuts recorded
+                project = Project.objects.select_for_update().get(id=project.id)
+                if project.cuts_recorded_at:
+                    messages.warning(request, f"⚠️ Cuts were already recorded on {project.cuts_recorded_at:%d/%m/%Y %H:%M}.")
+                else:
+                    aluminum_data = sliding_window_materials(project.id, lock_remnants=True)
+                    used, stored = store_offcuts(company_id, project.id, aluminum_data["cutting_plan"])
+                    project.cuts_recorded_at = timezone.now()
+                    project.save(update_fields=['cuts_recorded_at'])
+                    messages.success(request, f"✅ Cuts recorded: {used} remnants used, {stored} offcuts stored.")
 
-    return result
+    return redirect(f"/materials/?project_id={project.id}&action=aluminum")
 
 
 @login_required
@@ -1797,45 +1418,57 @@ def materials_page(request):
     projects = Project.objects.filter(contractor=request.user)
     selected_project = None
     aluminum_data = None
+    profile_totals = None
     glass_data = None
+    glass_totals = None
+    glass_nesting = None
     drywall_data = None
+    drywall_totals = None
+    drywall_layout = None
+    drywall_framing = None
     selected_material = None
 
     project_id = request.GET.get('project_id')
-    action = request.GET.get('action')  # 'aluminum', 'glass', or 'drywall'
+    action = request.GET.get('action')  # 'aluminum', 'aluminum_totals', 'glass', or 'drywall'
 
     if project_id:
         selected_project = get_object_or_404(Project, id=project_id, contractor=request.user)
 
-        if action == 'aluminum':
-            aluminum_data = sliding_window_materials(selected_project)
+        if action in ('aluminum', 'aluminum_totals'):
+            # 'aluminum_totals' only sums per profile type in the database
+            if action == 'aluminum':
+                aluminum_data = cached_materials(
+                    selected_project.id, 'aluminum', lambda: sliding_window_materials(selected_project.id)
+                )
+            profile_totals = cached_materials(
+                selected_project.id, 'profile_totals', lambda: aluminum_profile_totals(selected_project.id)
+            )
             selected_material = 'aluminum'
 
         elif action == 'glass':
-            glass_data = detailed_glass_materials(selected_project.id)
+            glass_data = cached_materials(
+                selected_project.id, 'glass_cut_list',
+                lambda: consolidate_glass(detailed_glass_materials(selected_project.id))
+            )
+            glass_totals = cached_materials(
+                selected_project.id, 'glass_totals', lambda: glass_totals_by_type(selected_project.id)
+            )
+            glass_nesting = cached_materials(
+                selected_project.id, 'glass_nesting', lambda: project_glass_nesting(selected_project.id)
+            )
             selected_material = 'glass'
 
         elif action == 'drywall':
-            walls = Wall.objects.filter(room__project=selected_project)
-            ceilings = Ceiling.objects.filter(room__project=selected_project)
-            drywall_data = []
-
-            # Process walls
-            wall_counter = 1
-            for wall in walls:
-                wall_data = calculate_wall_materials(wall)
-                wall_data['wall_number'] = wall_counter
-                drywall_data.append(wall_data)
-                wall_counter += 1
-
-            # Process ceilings
-            ceiling_counter = 1
-            for ceiling in ceilings:
-                ceiling_data = calculate_wall_materials(ceiling)
-                ceiling_data['ceiling_number'] = ceiling_counter
-                drywall_data.append(ceiling_data)
-                ceiling_counter += 1
-
+            drywall_data = cached_materials(
+                selected_project.id, 'drywall', lambda: project_drywall_materials(selected_project.id)
+            )
+            drywall_totals = get_drywall_totals(selected_project.id)
+            drywall_layout = cached_materials(
+                selected_project.id, 'drywall_layout', lambda: project_board_layout(selected_project.id)
+            )
+            drywall_framing = cached_materials(
+                selected_project.id, 'drywall_framing', lambda: project_framing(selected_project.id)
+            )
             selected_material = 'drywall'
 
     return render(request, 'accounts/materials_page.html', {
@@ -1843,8 +1476,14 @@ def materials_page(request):
         'selected_project': selected_project,
         'selected_material': selected_material,
         'aluminum_data': aluminum_data,
+        'profile_totals': profile_totals,
         'glass_data': glass_data,
+        'glass_totals': glass_totals,
+        'glass_nesting': glass_nesting,
         'drywall_data': drywall_data,
+        'drywall_totals': drywall_totals,
+        'drywall_layout': drywall_layout,
+        'drywall_framing': drywall_framing,
     })
 
 
@@ -2218,60 +1857,29 @@ def contractor_orders_view(request):
     return render(request, 'accounts/contractor_orders.html', {'orders': orders})
 
 def generate_order_pdf(order):
-    folder_path = os.path.join("contractors", order.contractor.username, "orders")
-    os.makedirs(folder_path, exist_ok=True)
-
-    filename = f"order_{order.order_number}.pdf"
-    filepath = os.path.join(folder_path, filename)
-
-    c = canvas.Canvas(filepath, pagesize=A4)
-    width, height = A4
-    y = height - 50
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(50, y, f"Order Number: {order.order_number}")
-    y -= 20
-    c.setFont("Helvetica", 12)
-    c.drawString(50, y, f"Contractor: {order.contractor.name}")
-    y -= 20
-    c.drawString(50, y, f"Company: {order.company.name if order.company else 'N/A'}")
-    y -= 20
-    c.drawString(50, y, f"Supplier: {order.supplier.name}")
-    y -= 20
-    c.drawString(50, y, f"Status: {order.status}")
-    y -= 20
-    c.drawString(50, y, f"Date Created: {order.created_at.strftime('%Y-%m-%d')}")
-    y -= 20
+    lines = [
+        f"Contractor: {order.contractor.name}",
+        f"Company: {order.company.name if order.company else 'N/A'}",
+        f"Supplier: {order.supplier.name}",
+        f"Status: {order.status}",
+        f"Date Created: {order.created_at.strftime('%Y-%m-%d')}",
+    ]
     if order.delivery_date:
-        c.drawString(50, y, f"Delivery Date: {order.delivery_date.strftime('%Y-%m-%d')}")
-        y -= 20
-
-    y -= 20
-    c.setFont("Helvetica-Bold", 13)
-    c.drawString(50, y, "Items:")
-    y -= 20
-    c.setFont("Helvetica", 12)
-    for item in order.items.all():
-        line = f"{item.item_name} — {item.quantity} pcs @ ₪{item.unit_price} = ₪{item.total_price()}"
-        c.drawString(60, y, line)
-        y -= 18
-        if y < 100:
-            c.showPage()
-            y = height - 50
-
-    y -= 10
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(50, y, f"Total Before Tax: ₪{order.total_before_tax():.2f}")
-    y -= 20
-    c.drawString(50, y, f"Total After Tax (18%): ₪{order.total_after_tax():.2f}")
-
-    c.save()
-    return filepath
+        lines.append(f"Delivery Date: {order.delivery_date.strftime('%Y-%m-%d')}")
+
+    headers = ["Item", "Quantity", "Unit Price", "Total"]
+    rows = [
+        [item.item_name, f"{item.quantity} pcs", f"₪{item.unit_price}", f"₪{item.total_price()}"]
+        for item in order.items.all()
+    ]
+    rows.append(["Total Before Tax", "", "", f"₪{order.total_before_tax():.2f}"])
+    rows.append(["Total After Tax (18%)", "", "", f"₪{order.total_after_tax():.2f}"])
+
+    return render_pdf(f"Order Number: {order.order_number}", [("Items", headers, rows)], lines=lines)
 
 @login_required
 def export_order_pdf_view(request, order_id):
     order = get_object_or_404(Order, id=order_id, contractor=request.user)
-    filepath = generate_order_pdf(order)
-    return HttpResponse(f"PDF generated at: {filepath}")
+    return pdf_response(generate_order_pdf(order), f"order_{order.order_number}.pdf")
 
 
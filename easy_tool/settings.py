@@ -162,4 +162,20 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.CustomUser'
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# The add-aluminum form posts ~13 fields per window, so a multi-floor
+# project easily passes Django's default limit of 1000
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 20000
+
+# Project materials results are cached per project version
+# (accounts/materials_cache.py). The version lives in the database, so each
+# server process may keep its own cache and still never serve stale results.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'easy-tool',
+        # A few entries per project, and a bulk export touches every project
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
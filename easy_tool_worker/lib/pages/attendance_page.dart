@@ -35,6 +35,12 @@ class _AttendancePageState extends State<AttendancePage> {
       _isLoading = true;
     });
 
+    try {
+      await ApiService.syncClockEvents();
+    } catch (e) {
+      // Still offline, the queue is sent next time
+    }
+
     try {
       final result = await ApiService.getHomeData();
       if (result['status'] == 'success') {
@@ -69,7 +75,8 @@ class _AttendancePageState extends State<AttendancePage> {
         _showError(result['message']);
       }
     } catch (e) {
-      _showError('Clock in failed');
+      await ApiService.queueClockEvent('clock_in', _currentPosition?.latitude, _currentPosition?.longitude);
+      _showSuccess('No connection - clock in saved, it will be sent when you are back online');
     }
 
     setState(() {
@@ -95,7 +102,8 @@ class _AttendancePageState extends State<AttendancePage> {
         _showError(result['message']);
       }
     } catch (e) {
-      _showError('Clock out failed');
+      await ApiService.queueClockEvent('clock_out', _currentPosition?.latitude, _currentPosition?.longitude);
+      _showSuccess('No connection - clock out saved, it will be sent when you are back online');
     }
 
     setState(() {
@@ -1,4 +1,5 @@
 import 'dart:convert';
+import 'dart:math';
 import 'package:http/http.dart' as http;
 import 'package:shared_preferences/shared_preferences.dart';
 
@@ -24,7 +25,7 @@ class ApiService {
     String? token = prefs.getString('token');
 
     final response = await http.get(
-      Uri.parse('$baseUrl/api/worker-home/'),
+      Uri.parse('$baseUrl/api/worker-home/?attendances=1'),
       headers: {
         'Authorization': 'Token $token',
         'Content-Type': 'application/json',
@@ -65,6 +66,50 @@ class ApiService {
     return jsonDecode(response.body);
   }
 
+  // Clock events made without a connection, kept until the server has them
+  static const String _clockQueueKey = 'clock_queue';
+
+  static Future<void> queueClockEvent(String type, double? lat, double? lon) async {
+    SharedPreferences prefs = await SharedPreferences.getInstance();
+    final queue = prefs.getStringList(_clockQueueKey) ?? [];
+    final now = DateTime.now().toUtc();
+    queue.add(jsonEncode({
+      'key': '${now.microsecondsSinceEpoch}-${Random().nextInt(1 << 32)}',
+      'type': type,
+      'timestamp': now.toIso8601String(),
+      'latitude': lat,
+      'longitude': lon,
+    }));
+    await prefs.setStringList(_clockQueueKey, queue);
+  }
+
+  // Sends the queued events in one request; returns how many were applied
+  static Future<int> syncClockEvents() async {
+    SharedPreferences prefs = await SharedPreferences.getInstance();
+    String? token = prefs.getString('token');
+    final queue = prefs.getStringList(_clockQueueKey) ?? [];
+    if (token == null || queue.isEmpty) return 0;
+
+    final response = await http.post(
+      Uri.parse('$baseUrl/api/worker-clock-sync/'),
+      headers: {
+        'Authorization': 'Token $token',
+        'Content-Type': 'application/json',
+      },
+      body: jsonEncode({'events': queue.map((e) => jsonDecode(e)).toList()}),
+    );
+    final result = jsonDecode(response.body);
+    if (result['status'] != 'success') return 0;
+
+    // Applied, duplicate and rejected events are all done with
+    final done = {for (final r in result['results']) r['key']};
+    final remaining = (prefs.getStringList(_clockQueueKey) ?? [])
+        .where((e) => !done.contains(jsonDecode(e)['key']))
+        .toList();
+    await prefs.setStringList(_clockQueueKey, remaining);
+    return result['results'].where((r) => r['status'] == 'applied').length;
+  }
+
   static Future<Map<String, dynamic>> getProjects() async {
     SharedPreferences prefs = await SharedPreferences.getInstance();
     String? token = prefs.getString('token');